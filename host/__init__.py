@@ -0,0 +1,2 @@
+# -*- coding: utf-8 -*-
+# 主机端工具：OpenMV 运行时替身、帧回放与性能基准
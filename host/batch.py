@@ -0,0 +1,320 @@
+# -*- coding: utf-8 -*-
+# 批量离线分析：把长时间的现场录制按帧切成分片，用进程池并行跑视觉流水线，
+# 按帧序合并结果并逐片写入 JSON Lines 文件
+#
+# 用法（在仓库根目录）：
+#   python -m host.batch rec/ --out rec.jsonl                 # 录制目录（默认最新会话），进程数=CPU核数
+#   python -m host.batch frames/ --out a.jsonl --workers 8 --shard 600 --keyframe 150
+#   python -m host.batch stack.npy --out a.jsonl --verify     # 同时顺序跑一遍，核对分片边界
+#
+# 每帧按 main.py 的分析顺序处理：运动检测 -> 跟踪/检测（含ROI扩张与收缩）-> 穴位计算；
+# 采集、曝光调整、调度器降频、串口发送与叠加显示属于设备端实时行为，离线时不执行，每帧都分析。
+# 推理缓存的有效期按墙钟计时，结果会随机器负载变化，默认关闭（--infer-cache 打开）。
+#
+# 分片边界：跟踪器（位置/速度/置信度）、ROI 与运动检测参考帧都依赖前面的帧，而 α-β 滤波
+# 与 ROI 的相互反馈没有有限记忆，任何长度的预热都不能保证与顺序处理逐帧一致。因此：
+#   * 每 keyframe 帧（按绝对帧号）设一个关键帧：跟踪器、ROI 与推理缓存复位，从整帧完整检测
+#     重新开始。关键帧之间的行为与设备相同；顺序处理同样按关键帧复位，结果与分片方式无关；
+#   * 分片边界对齐到关键帧，跨边界只剩运动检测状态（参考帧、去抖计数、连续报警计数），
+#     每个分片从起点之前 warmup 帧开始处理，预热帧的结果丢弃；
+#   * 合并时比较前一分片末帧与本分片预热末帧的运动检测状态，不一致（例如预热期间一直在报警）
+#     就把预热加倍重新处理该分片，直到一致或预热覆盖到序列开头。
+# 所以输出与 workers=1 的顺序处理逐字节一致，--verify 会实际顺序处理一遍核对。
+#
+# 输出每行一帧：{"frame": 序号, "safe": 是否无运动, "anatomy": {...} 或 null,
+#                "points": [[ID, x, y, x_mm, y_mm, 压力], ...] 或 null}
+# anatomy/points 的字段与 recorder.py 录制的元数据相同。
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+import zlib
+
+import numpy as np
+
+from host import runtime
+
+MOTION_DEBOUNCE = 3  # safety._debounce 需要的连续帧数
+ALERT_RESET = 6      # main.py 连续报警超过5帧时重置运动检测
+
+# 工作进程内的全局状态（由 _init_worker 创建，每个进程一份模型）
+_worker = None
+
+
+def frame_refs(path, session=None):
+    """帧引用列表 [(文件, 下标)]：下标为None表示单帧文件，否则为 .npy 堆叠中的帧号
+
+    路径转为绝对路径（工作进程会切换到仓库根目录）。
+    """
+    from host import frames, recording
+    path = os.path.abspath(path)
+    if recording.is_recording(path):
+        all_sessions = recording.sessions(path)
+        if not all_sessions:
+            return []
+        headers = all_sessions[max(all_sessions) if session is None else session]
+        return [(h['path'], None) for h in headers]
+    if os.path.isdir(path):
+        return [(name, None) for name in frames.list_frames(path)]
+    if path.endswith('.npy'):
+        arr = np.load(path, mmap_mode='r')
+        if arr.ndim == 4:
+            return [(path, i) for i in range(arr.shape[0])]
+    return [(path, None)]
+
+
+class _FrameLoader:
+    """按引用读取帧；.npy 堆叠以内存映射方式打开，每个进程只打开一次"""
+
+    def __init__(self):
+        self._stacks = {}
+
+    def __call__(self, ref):
+        from image import load_array
+        from host import recording
+        path, index = ref
+        if index is not None:
+            stack = self._stacks.get(path)
+            if stack is None:
+                stack = self._stacks[path] = np.load(path, mmap_mode='r')
+            return np.asarray(stack[index])
+        if path.endswith('.rec'):
+            return recording.read_record(path)[2]
+        return load_array(path)
+
+
+def _anatomy_json(anatomy):
+    if not anatomy:
+        return None
+    return {'proximal_point': list(anatomy['proximal_point']),
+            'distal_point': list(anatomy['distal_point']),
+            'is_vertical': anatomy['is_vertical'],
+            'arm_length': anatomy['arm_length'],
+            'tracked': anatomy.get('tracked', False)}
+
+
+def _points_json(points):
+    if not points:
+        return None
+    return [[points['ids'][i], int(points['x'][i]), int(points['y'][i]),
+             int(points['x_mm'][i]), int(points['y_mm'][i]), points['pressure'][i]]
+            for i in range(len(points['ids']))]
+
+
+class FramePipeline:
+    """main.py 主循环中与帧内容有关的分析部分；analyzer（含模型）可在多个分片间复用"""
+
+    def __init__(self, analyzer, keyframe):
+        from config import ROI_SETTINGS, STATS_SETTINGS, TRACK_SETTINGS
+        from framectx import FrameContext
+        from safety import SafetyMonitor
+        from tracker import ArmTracker
+        self.analyzer = analyzer
+        self.keyframe = keyframe
+        self.tracker = ArmTracker(analyzer)
+        self.safety = SafetyMonitor()
+        self.frame_ctx = FrameContext()
+        self.ctx = self.frame_ctx if STATS_SETTINGS['shared'] else None
+        self.use_roi = ROI_SETTINGS['enabled']
+        self.use_tracker = TRACK_SETTINGS['enabled']
+        self.motion_alert_counter = 0
+        self.reset_track()
+
+    def reset_track(self):
+        """关键帧：跟踪器、ROI 与推理缓存回到上电状态"""
+        self.tracker.reset()
+        self.tracker.thresholds = None
+        self.roi = None  # 同 main.py 的初始ROI：整帧
+        self.analyzer.infer_cache = None
+
+    def motion_state(self):
+        """跨关键帧保留的状态（运动检测）的指纹，用于核对分片边界"""
+        alert, alert_duration, ref = self.safety.state()
+        return (alert, alert_duration, self.motion_alert_counter,
+                zlib.crc32(bytes(ref.bytearray())) if ref is not None else None)
+
+    def process(self, img, index):
+        """处理第 index 帧（整个序列中的帧号，决定关键帧位置）"""
+        analyzer = self.analyzer
+        if index % self.keyframe == 0:
+            self.reset_track()
+        self.frame_ctx.begin(img)
+        try:
+            is_safe = self.safety.check_motion(img, self.ctx)
+        except Exception:
+            self.safety.reset()
+            return {'safe': False, 'anatomy': None, 'points': None}
+        if not is_safe:
+            self.motion_alert_counter += 1
+            if self.motion_alert_counter > 5:
+                self.safety.reset()
+                self.motion_alert_counter = 0
+            return {'safe': False, 'anatomy': None, 'points': None}
+        self.motion_alert_counter = 0
+
+        search_roi = self.roi if self.use_roi else None
+        if self.use_tracker:
+            anatomy = self.tracker.process(img, search_roi, self.ctx)
+        else:
+            anatomy = analyzer.detect_anatomy(img, search_roi, self.ctx)
+        if not anatomy:
+            self.roi = analyzer.expand_roi(self.roi, img)
+            return {'safe': True, 'anatomy': None, 'points': None}
+        if 'contour' in anatomy:
+            self.roi = analyzer.roi_from_anatomy(anatomy, img)
+        points = analyzer.calculate_acu_points(anatomy)
+        return {'safe': True, 'anatomy': _anatomy_json(anatomy), 'points': _points_json(points)}
+
+
+def _init_worker(infer_cache):
+    """工作进程初始化：安装替身模块、设置传感器格式，并加载一次模型"""
+    global _worker
+    runtime.install()
+    import config
+    import sensor
+    config.INFER_SETTINGS['cache'] = infer_cache
+    sensor.reset()
+    sensor.set_pixformat(sensor.RGB565)
+    sensor.set_framesize(sensor.HQVGA)  # 同 main.py
+    os.chdir(runtime.REPO_DIR)  # 模型、标签与标定文件按设备上的相对路径读取
+    from vision import ArmAnalyzer
+    _worker = {'analyzer': ArmAnalyzer(), 'load': _FrameLoader()}
+
+
+def _run_shard(job):
+    """处理一个分片，返回 (结果列表, 预热末帧的运动状态, 末帧的运动状态, 耗时秒)
+
+    job 为 (起始帧号, 预热帧数, 帧引用列表, 关键帧间隔)，帧引用包含预热帧。
+    """
+    import sensor
+    start, warmup, refs, keyframe = job
+    pipeline = FramePipeline(_worker['analyzer'], keyframe)
+    load = _worker['load']
+    results = []
+    entry = pipeline.motion_state()
+    t0 = time.perf_counter()
+    for i, ref in enumerate(refs):
+        sensor.set_source([load(ref)])
+        frame = start - warmup + i
+        result = pipeline.process(sensor.snapshot(), frame)
+        if i >= warmup:
+            result['frame'] = frame
+            results.append(result)
+        elif i == warmup - 1:
+            entry = pipeline.motion_state()
+    return results, entry, pipeline.motion_state(), time.perf_counter() - t0
+
+
+def make_shards(refs, shard, warmup, keyframe):
+    """按关键帧对齐切分为 job 列表（见 _run_shard）；第一个分片没有预热帧"""
+    shard = max(1, -(-shard // keyframe)) * keyframe
+    return [_job(refs, start, shard, warmup, keyframe) for start in range(0, len(refs), shard)]
+
+
+def _job(refs, start, shard, warmup, keyframe):
+    w = min(warmup, start)
+    return (start, w, refs[start - w:start + shard], keyframe)
+
+
+def run(refs, out, workers=None, shard=1200, warmup=ALERT_RESET + MOTION_DEBOUNCE,
+        keyframe=300, infer_cache=False):
+    """并行处理 refs 并把结果按帧序写入 out，返回统计字典"""
+    workers = workers or os.cpu_count() or 1
+    jobs = make_shards(refs, shard, warmup, keyframe)
+    stats = {'frames': 0, 'detected': 0, 'unsafe': 0, 'workers': workers, 'shards': len(jobs),
+             'warmup': warmup, 'keyframe': keyframe, 'resynced': 0, 'worker_s': 0.0}
+    t0 = time.perf_counter()
+    cwd = os.getcwd()
+    with open(out, 'w') as f:
+        if workers == 1:
+            _init_worker(infer_cache)
+            try:
+                _merge(f, jobs, (_run_shard(job) for job in jobs), _run_shard, refs, stats)
+            finally:
+                os.chdir(cwd)
+        else:
+            with multiprocessing.Pool(workers, _init_worker, (infer_cache,)) as pool:
+                # imap 按提交顺序返回：先完成的分片在内存中等待前面的分片，再依次写出
+                _merge(f, jobs, pool.imap(_run_shard, jobs), lambda job: pool.apply(_run_shard, (job,)),
+                       refs, stats)
+    stats['elapsed_s'] = round(time.perf_counter() - t0, 3)
+    stats['worker_s'] = round(stats['worker_s'], 3)
+    stats['fps'] = round(stats['frames'] / stats['elapsed_s'], 2) if stats['elapsed_s'] > 0 else 0.0
+    return stats
+
+
+def _merge(f, jobs, stream, rerun, refs, stats):
+    """按分片顺序核对边界并写出；边界状态不一致时加倍预热重新处理该分片"""
+    previous_exit = None
+    for job, (results, entry, exit_state, seconds) in zip(jobs, stream):
+        stats['worker_s'] += seconds
+        start, warmup, shard_refs, keyframe = job
+        shard = len(shard_refs) - warmup
+        while previous_exit is not None and entry != previous_exit and warmup < start:
+            warmup = min(start, max(1, warmup) * 2)
+            results, entry, exit_state, seconds = rerun(_job(refs, start, shard, warmup, keyframe))
+            stats['worker_s'] += seconds
+            stats['resynced'] += 1
+        previous_exit = exit_state
+        for result in results:
+            f.write(json.dumps(dict(frame=result.pop('frame'), **result)) + '\n')
+            stats['frames'] += 1
+            stats['detected'] += 1 if result['anatomy'] else 0
+            stats['unsafe'] += 0 if result['safe'] else 1
+
+
+def diff(path_a, path_b):
+    """逐行比较两个结果文件，返回不一致的帧号列表（一方缺少的行同样计为不一致）"""
+    mismatched = []
+    with open(path_a) as a, open(path_b) as b:
+        for index, (line_a, line_b) in enumerate(itertools.zip_longest(a, b)):
+            if line_a != line_b:
+                try:
+                    mismatched.append(json.loads(line_a or line_b)['frame'])
+                except ValueError:  # 写到一半被截断的行
+                    mismatched.append(index)
+    return mismatched
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='多进程批量离线分析录制帧')
+    parser.add_argument('frames', help='录制目录 / 帧目录 / .npy 帧堆叠')
+    parser.add_argument('--out', required=True, help='结果文件（JSON Lines，每行一帧）')
+    parser.add_argument('--session', type=int, help='录制目录的会话号（默认最新）')
+    parser.add_argument('--workers', type=int, help='进程数（默认CPU核数）')
+    parser.add_argument('--shard', type=int, default=1200, help='每个分片的帧数（向上取整到关键帧间隔的整数倍）')
+    parser.add_argument('--keyframe', type=int, default=300, help='关键帧间隔：跟踪器与ROI每隔该帧数复位一次')
+    parser.add_argument('--warmup', type=int, default=ALERT_RESET + MOTION_DEBOUNCE,
+                        help='每个分片在起点之前预热的帧数（运动检测状态）')
+    parser.add_argument('--infer-cache', action='store_true', help='启用推理缓存（结果与机器负载有关）')
+    parser.add_argument('--verify', action='store_true', help='再顺序处理一遍，报告与并行结果不一致的帧')
+    args = parser.parse_args(argv)
+
+    refs = frame_refs(args.frames, args.session) if os.path.exists(args.frames) else []
+    if not refs:
+        print('没有找到帧: %s' % args.frames, file=sys.stderr)
+        return 1
+    stats = run(refs, args.out, args.workers, args.shard, args.warmup, args.keyframe, args.infer_cache)
+    print('%d 帧  %d 个分片 / %d 进程  关键帧间隔 %d  预热 %d 帧（重新同步 %d 次）  检出 %d  运动 %d' % (
+        stats['frames'], stats['shards'], stats['workers'], stats['keyframe'], stats['warmup'],
+        stats['resynced'], stats['detected'], stats['unsafe']))
+    print('耗时 %.1fs（%.1f 帧/秒，进程累计 %.1fs）-> %s' % (
+        stats['elapsed_s'], stats['fps'], stats['worker_s'], args.out))
+
+    if args.verify:
+        reference = args.out + '.seq'
+        seq = run(refs, reference, 1, len(refs), 0, args.keyframe, args.infer_cache)
+        mismatched = diff(args.out, reference)
+        print('顺序处理 %.1fs，加速 %.2fx；不一致 %d 帧%s' % (
+            seq['elapsed_s'], seq['elapsed_s'] / stats['elapsed_s'] if stats['elapsed_s'] else 0.0,
+            len(mismatched), (': %s' % mismatched[:20]) if mismatched else ''))
+        os.remove(reference)
+        return 1 if mismatched else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+# ProtocolHandler 编码器微基准：验证查表CRC/预分配缓冲与原实现逐字节一致，并比较耗时
+#
+# 用法（在仓库根目录）：
+#   python -m host.bench_comm
+#   python -m host.bench_comm --packets 100000
+import argparse
+import random
+import sys
+import time
+
+from host import runtime
+
+
+class _Capture:
+    """替代 UART，记录每次写入的字节"""
+
+    def __init__(self):
+        self.packets = []
+
+    def write(self, buf):
+        self.packets.append(bytes(buf))
+        return len(buf)
+
+
+class LegacyEncoder:
+    """原始实现（逐位CRC、每包新建bytearray），作为对照基准"""
+
+    def __init__(self):
+        self.uart = _Capture()
+        self.seq_num = 0
+
+    def send_acu_data(self, acu_id, x_mm, y_mm, pressure):
+        x_enc = min(max(x_mm, 0), 4095)
+        y_enc = min(max(y_mm, 0), 4095)
+        payload = bytearray([
+            0xAA,
+            self.seq_num % 256,
+            ord(acu_id[0]), ord(acu_id[1]), ord(acu_id[2]),
+            (x_enc >> 4) & 0xFF,
+            ((x_enc & 0xF) << 4) | ((y_enc >> 8) & 0xF),
+            y_enc & 0xFF,
+            pressure
+        ])
+        crc = self._calc_crc(payload)
+        packet = payload + bytearray([crc])
+        self.uart.write(packet)
+        self.seq_num += 1
+
+    def _calc_crc(self, data):
+        crc = 0
+        for b in data:
+            crc ^= b
+            for _ in range(8):
+                if crc & 0x80:
+                    crc = (crc << 1) ^ 0x07
+                else:
+                    crc <<= 1
+                crc &= 0xFF
+        return crc
+
+
+def make_inputs(count, seed=0):
+    from config import ACU_DB
+    rng = random.Random(seed)
+    ids = list(ACU_DB.keys())
+    inputs = []
+    for _ in range(count):
+        acu_id = rng.choice(ids)
+        # 覆盖越界值以检验钳位
+        inputs.append((acu_id, rng.randint(-100, 4200), rng.randint(-100, 4200),
+                       ACU_DB[acu_id]['pressure'] if rng.random() < 0.5 else rng.randint(0, 255)))
+    return inputs
+
+
+def _run(encoder, inputs):
+    t0 = time.perf_counter()
+    for args in inputs:
+        encoder.send_acu_data(*args)
+    return time.perf_counter() - t0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='ProtocolHandler 编码器微基准')
+    parser.add_argument('--packets', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    runtime.install()
+    from config import COMM_SETTINGS
+    from comm import ProtocolHandler
+
+    # 逐字节对照只针对单点包编码：关闭死区过滤，直接写串口
+    COMM_SETTINGS['deadband_mm'] = 0
+    COMM_SETTINGS['tx_queue'] = False
+
+    inputs = make_inputs(args.packets, args.seed)
+    legacy = LegacyEncoder()
+    handler = ProtocolHandler()
+    handler.uart = _Capture()
+
+    t_legacy = _run(legacy, inputs)
+    t_new = _run(handler, inputs)
+
+    mismatches = [i for i, (a, b) in enumerate(zip(legacy.uart.packets, handler.uart.packets)) if a != b]
+    if len(legacy.uart.packets) != len(handler.uart.packets):
+        mismatches.append(-1)
+
+    print('数据包: %d' % len(inputs))
+    print('原实现: %.2f us/包' % (t_legacy / len(inputs) * 1e6))
+    print('新实现: %.2f us/包  (%.1fx)' % (t_new / len(inputs) * 1e6, t_legacy / t_new))
+    if mismatches:
+        print('输出不一致: %d 个数据包（首个下标 %d）' % (len(mismatches), mismatches[0]))
+        return 1
+    print('输出逐字节一致')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
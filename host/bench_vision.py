@@ -0,0 +1,335 @@
+# -*- coding: utf-8 -*-
+# 离线精度/耗时基准：把标注过的帧逐帧送进 detect_anatomy 与 calculate_acu_points，
+# 比较各检测模式（AI+矩估计、AI+Hough、肤色色块回退等）的误差、检出率与分阶段耗时
+#
+# 用法（在仓库根目录）：
+#   python -m host.bench_vision --make-synthetic data/synth --frames 120    # 生成带标注的合成数据集
+#   python -m host.bench_vision data/synth --json results.json
+#   python -m host.bench_vision data/synth data/field1 --baseline results.json --tolerance 0.2
+#
+# 数据集目录：帧文件（同 host.frames：.npy / .ppm / .pgm）加 annotations.json：
+#   {"frames": {"0000.npy": {"arm": true,
+#                            "proximal_point": [x, y], "distal_point": [x, y],
+#                            "acupoints": {"LI4": [x, y], ...}},        # 可选
+#               "0001.npy": {"arm": false}}}
+# 坐标以帧文件本身的像素为单位，帧与标注都会按比例换算到运行分辨率；没有标注的帧不计入。
+# 合成数据集的穴位标注由真值端点按当前穴位表求出，只反映端点误差对穴位的传递。
+# 每帧独立检测（不经过跟踪器、推理缓存与ROI），端点误差对近端/远端互换不敏感。
+# 有 --baseline 时任何模式的精度或耗时超出容差即以状态码1退出。
+import argparse
+import json
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+from host import runtime
+from host.replay import _summary
+
+ANNOTATIONS = 'annotations.json'
+
+# 检测模式：对配置字典的临时覆盖 + 是否使用模型
+MODES = {
+    'ai-moments': ({'AXIS_SETTINGS': {'method': 'moments', 'refine': False}}, True),
+    'ai-moments-refine': ({'AXIS_SETTINGS': {'method': 'moments', 'refine': True}}, True),
+    'ai-hough': ({'AXIS_SETTINGS': {'method': 'hough'}}, True),
+    'blob': ({}, False),
+    'ai-moments-each': ({'AXIS_SETTINGS': {'method': 'moments', 'refine': False},
+                         'ACUPOINT_SETTINGS': {'batch': False}}, True),
+}
+
+# 所有模式共用的覆盖：逐帧独立评估
+COMMON = {'INFER_SETTINGS': {'cache': False}}
+
+
+def _project():
+    if runtime.PROJECT_DIR not in sys.path:
+        sys.path.append(runtime.PROJECT_DIR)
+    import config
+    import vision
+    import profiler
+    return config, vision, profiler
+
+
+def load_dataset(path):
+    """返回 [(帧文件, 标注)]，按文件名排序"""
+    from host import frames
+    with open(os.path.join(path, ANNOTATIONS)) as f:
+        annotations = json.load(f)['frames']
+    out = []
+    for name in frames.list_frames(path):
+        ann = annotations.get(os.path.basename(name))
+        if ann is not None:
+            out.append((name, ann))
+    return out
+
+
+def _distance(a, b):
+    return math.hypot(a[0] - b[0], a[1] - b[1])
+
+
+def _endpoint_error(anatomy, truth):
+    p, d = anatomy['proximal_point'], anatomy['distal_point']
+    tp, td = truth['proximal_point'], truth['distal_point']
+    return min((_distance(p, tp) + _distance(d, td)) / 2, (_distance(p, td) + _distance(d, tp)) / 2)
+
+
+class _Override:
+    """临时修改配置字典（vision 等模块通过 `from config import *` 共享同一批字典对象）"""
+
+    def __init__(self, config, overrides):
+        self.config = config
+        self.overrides = overrides
+        self.saved = []
+
+    def __enter__(self):
+        for name, values in self.overrides.items():
+            settings = getattr(self.config, name)
+            self.saved.append((settings, dict(settings)))
+            settings.update(values)
+        return self
+
+    def __exit__(self, *exc):
+        for settings, old in reversed(self.saved):
+            settings.clear()
+            settings.update(old)
+
+
+def run_mode(mode, dataset, size, repeat=3):
+    """在数据集上运行一个检测模式，返回该模式的结果字典
+
+    每帧重复检测 repeat 次取最短耗时（检测是确定性的，精度取最后一次结果），
+    正式计时前先对第一帧空跑一次，避免首帧的缓冲分配计入耗时。
+    """
+    config, vision, profiler = _project()
+    import sensor
+    from image import load_array
+    overrides, use_model = MODES[mode]
+    merged = dict(COMMON)
+    merged.update(overrides)
+    with _Override(config, merged):
+        analyzer = vision.ArmAnalyzer()
+        if not use_model:
+            analyzer.net = None
+        prof = profiler.StageProfiler(window=max(1, len(dataset) * repeat))
+        prof.enabled = True
+        vision.profiler = prof
+        scale_mm = analyzer.cm_per_pixel * 10.0
+        if dataset:
+            sensor.set_source([load_array(dataset[0][0])])
+            anatomy = analyzer.detect_anatomy(sensor.snapshot())
+            if anatomy:
+                analyzer.calculate_acu_points(anatomy)
+            prof.reset()
+
+        detect_ms, acu_ms = [], []
+        endpoint_px, acu_px = [], []
+        arm_frames = detected = negatives = false_pos = 0
+        for name, ann in dataset:
+            arr = load_array(name)
+            sx = size[0] / float(arr.shape[1])
+            sy = size[1] / float(arr.shape[0])
+            sensor.set_source([arr])
+            img = sensor.snapshot()  # 与回放相同的缩放与像素格式转换
+
+            best = None
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                anatomy = analyzer.detect_anatomy(img)
+                t1 = time.perf_counter()
+                best = t1 - t0 if best is None else min(best, t1 - t0)
+            detect_ms.append(best * 1000.0)
+            points = None
+            if anatomy:
+                best = None
+                for _ in range(repeat):
+                    t0 = time.perf_counter()
+                    points = analyzer.calculate_acu_points(anatomy)
+                    t1 = time.perf_counter()
+                    best = t1 - t0 if best is None else min(best, t1 - t0)
+                acu_ms.append(best * 1000.0)
+
+            if not ann.get('arm', True):
+                negatives += 1
+                false_pos += 1 if anatomy else 0
+                continue
+            arm_frames += 1
+            if not anatomy:
+                continue
+            detected += 1
+            truth = {k: (ann[k][0] * sx, ann[k][1] * sy) for k in ('proximal_point', 'distal_point')}
+            endpoint_px.append(_endpoint_error(anatomy, truth))
+            if points and ann.get('acupoints'):
+                for i, acu_id in enumerate(points['ids']):
+                    t = ann['acupoints'].get(acu_id)
+                    if t is not None:
+                        acu_px.append(_distance((float(points['x'][i]), float(points['y'][i])),
+                                                (t[0] * sx, t[1] * sy)))
+        vision.profiler = profiler.profiler
+
+    stages = {}
+    for i, stage in enumerate(profiler.STAGE_NAMES):
+        s = prof.stage_stats(i)
+        if s:
+            stages[stage] = {'min': s[0] / 1000.0, 'mean': s[1] / 1000.0, 'p95': s[2] / 1000.0, 'max': s[3] / 1000.0}
+    return {
+        'frames': len(dataset),
+        'arm_frames': arm_frames,
+        'detection_rate': round(detected / arm_frames, 4) if arm_frames else 0.0,
+        'false_positive_rate': round(false_pos / negatives, 4) if negatives else 0.0,
+        'endpoint_error_px': _summary(endpoint_px),
+        'endpoint_error_mm': _summary([e * scale_mm for e in endpoint_px]),
+        'acupoint_error_px': _summary(acu_px),
+        'acupoint_error_mm': _summary([e * scale_mm for e in acu_px]),
+        'latency_ms': {'detect': _summary(detect_ms), 'acupoints': _summary(acu_ms)},
+        'stages_ms': stages,
+    }
+
+
+def run(paths, modes=None, repeat=3):
+    """在若干数据集上运行各模式，返回结果字典 {'datasets': {路径: {模式: 结果}}}"""
+    runtime.install()
+    import sensor
+    sensor.reset()
+    sensor.set_pixformat(sensor.RGB565)
+    sensor.set_framesize(sensor.HQVGA)  # 同 main.py
+    size = (sensor.width(), sensor.height())
+    modes = modes or list(MODES)
+    results = {'size': list(size), 'modes': modes, 'repeat': repeat, 'datasets': {}}
+    cwd = os.getcwd()
+    os.chdir(runtime.REPO_DIR)  # 模型、标签与标定文件按设备上的相对路径读取
+    try:
+        for path in paths:
+            dataset = load_dataset(os.path.join(cwd, path))
+            results['datasets'][path] = {mode: run_mode(mode, dataset, size, repeat) for mode in modes}
+    finally:
+        os.chdir(cwd)
+    return results
+
+
+def compare(results, baseline, tolerance, rate_tolerance=0.02, px_tolerance=0.5, ms_floor=0.05):
+    """与基线比较，返回回退项列表（空列表表示通过）
+
+    精度：检出率下降超过 rate_tolerance，误检率上升超过 rate_tolerance，
+          或误差均值/p95 增加超过 max(旧值×tolerance, px_tolerance)；
+    耗时：detect/acupoints 的均值或中位数超过 旧值×(1+tolerance)（且绝对增量超过 ms_floor）。
+    """
+    failures = []
+    for path, modes in results['datasets'].items():
+        for mode, new in modes.items():
+            old = baseline.get('datasets', {}).get(path, {}).get(mode)
+            if old is None:
+                continue
+            tag = '%s[%s]' % (path, mode)
+            if new['detection_rate'] < old['detection_rate'] - rate_tolerance:
+                failures.append('%s detection_rate: %.3f -> %.3f' % (tag, old['detection_rate'], new['detection_rate']))
+            if new['false_positive_rate'] > old['false_positive_rate'] + rate_tolerance:
+                failures.append('%s false_positive_rate: %.3f -> %.3f' % (
+                    tag, old['false_positive_rate'], new['false_positive_rate']))
+            for metric in ('endpoint_error_px', 'acupoint_error_px'):
+                for key in ('mean', 'p95'):
+                    a, b = old[metric][key], new[metric][key]
+                    if b - a > max(a * tolerance, px_tolerance):
+                        failures.append('%s %s.%s: %.2f -> %.2f' % (tag, metric, key, a, b))
+            for stage in ('detect', 'acupoints'):
+                for key in ('mean', 'p50'):  # p95 受主机调度抖动影响太大，只报告不判定
+                    a, b = old['latency_ms'][stage][key], new['latency_ms'][stage][key]
+                    if a > 0 and b > a * (1.0 + tolerance) and b - a > ms_floor:
+                        failures.append('%s latency_ms.%s.%s: %.3f -> %.3f (+%.0f%%)' % (
+                            tag, stage, key, a, b, (b / a - 1) * 100))
+    return failures
+
+
+def format_results(results):
+    lines = []
+    for path, modes in results['datasets'].items():
+        lines.append('数据集 %s' % path)
+        lines.append('  %-18s %6s %6s %14s %14s %12s %12s' % (
+            '模式', '检出率', '误检率', '端点误差px', '穴位误差mm', '检测ms', '穴位ms'))
+        for mode, r in modes.items():
+            lines.append('  %-18s %6.1f%% %5.1f%% %6.2f/%-7.2f %6.2f/%-7.2f %5.2f/%-6.2f %5.3f/%-6.3f' % (
+                mode, r['detection_rate'] * 100, r['false_positive_rate'] * 100,
+                r['endpoint_error_px']['mean'], r['endpoint_error_px']['p95'],
+                r['acupoint_error_mm']['mean'], r['acupoint_error_mm']['p95'],
+                r['latency_ms']['detect']['mean'], r['latency_ms']['detect']['p95'],
+                r['latency_ms']['acupoints']['mean'], r['latency_ms']['acupoints']['p95']))
+    lines.append('（误差与耗时列为 均值/p95）')
+    return '\n'.join(lines)
+
+
+def make_synthetic(path, count, seed=0, negatives=0.1):
+    """生成合成数据集：frames/NNNN.npy + annotations.json；约 negatives 比例的帧不含手臂"""
+    runtime.install()
+    config, vision, _ = _project()
+    from host import frames
+    os.makedirs(path, exist_ok=True)
+    cwd = os.getcwd()
+    os.chdir(runtime.REPO_DIR)
+    try:
+        analyzer = vision.ArmAnalyzer()
+    finally:
+        os.chdir(cwd)
+    rng = np.random.default_rng(seed)
+    annotations = {}
+    for i in range(count):
+        name = '%04d.npy' % i
+        if rng.random() < negatives:
+            frame = np.clip(rng.normal((230, 235, 245), 4, (160, 240, 3)), 0, 255).astype(np.uint8)
+            annotations[name] = {'arm': False}
+        else:
+            frame, truth = frames.synthetic_scene(i, seed=seed)
+            points = analyzer.calculate_acu_points(dict(truth, is_vertical=True, arm_length=0))
+            annotations[name] = {
+                'arm': True,
+                'proximal_point': list(truth['proximal_point']),
+                'distal_point': list(truth['distal_point']),
+                'acupoints': {points['ids'][k]: [int(points['x'][k]), int(points['y'][k])]
+                              for k in range(len(points['ids']))} if points else {},
+            }
+        np.save(os.path.join(path, name), frame)
+    with open(os.path.join(path, ANNOTATIONS), 'w') as f:
+        json.dump({'frames': annotations}, f, indent=1)
+    return len(annotations)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='离线检测精度/耗时基准')
+    parser.add_argument('datasets', nargs='*', help='带 annotations.json 的帧目录')
+    parser.add_argument('--mode', action='append', choices=sorted(MODES), help='只运行指定模式（可重复）')
+    parser.add_argument('--repeat', type=int, default=3, help='每帧重复检测次数，耗时取最短的一次')
+    parser.add_argument('--json', help='把结果写到该文件')
+    parser.add_argument('--baseline', help='与之前的结果比较，回退时以状态码1退出')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='误差与耗时允许的相对回退幅度')
+    parser.add_argument('--rate-tolerance', type=float, default=0.02, help='检出率/误检率允许的绝对变化')
+    parser.add_argument('--px-tolerance', type=float, default=0.5, help='误差允许的最小绝对增量（像素）')
+    parser.add_argument('--make-synthetic', metavar='DIR', help='生成合成数据集到该目录后退出')
+    parser.add_argument('--frames', type=int, default=120, help='合成数据集的帧数')
+    parser.add_argument('--seed', type=int, default=0, help='合成数据集的随机种子')
+    args = parser.parse_args(argv)
+
+    if args.make_synthetic:
+        n = make_synthetic(args.make_synthetic, args.frames, args.seed)
+        print('生成 %d 帧 -> %s' % (n, args.make_synthetic))
+        return 0
+    if not args.datasets:
+        parser.error('需要至少一个数据集目录')
+
+    results = run(args.datasets, args.mode, args.repeat)
+    print(format_results(results))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=1)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        failures = compare(results, baseline, args.tolerance, args.rate_tolerance, args.px_tolerance)
+        for line in failures:
+            print('回退: ' + line)
+        return 1 if failures else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+# 穴位表构建工具：把 Python 中的穴位定义编译成设备端加载的二进制穴位表
+#
+# 用法（在仓库根目录）：
+#   python -m host.build_acudb                      # 由 config.ACU_DB 生成 acupoints.bin
+#   python -m host.build_acudb --source meridians.py --out acupoints.bin
+#
+# --source 指向定义了 ACU_DB 字典的 Python 文件（格式同 config.py，
+# 每个穴位可带 'segment' 与 'rel_pos'）。修改穴位定义后需重新生成并拷贝到设备。
+# 设备端的串口序号按表中ID排序，host.protocol 会自动读取同一个表文件。
+import argparse
+import os
+import runpy
+import sys
+
+from host import runtime
+
+
+def _project():
+    if runtime.PROJECT_DIR not in sys.path:
+        sys.path.append(runtime.PROJECT_DIR)
+    import acudb
+    import config
+    return acudb, config
+
+
+def build(source=None):
+    """返回由穴位定义构建的 AcuTable"""
+    acudb, config = _project()
+    db = runpy.run_path(source)['ACU_DB'] if source else config.ACU_DB
+    return acudb.AcuTable.from_dict(db)
+
+
+def main(argv=None):
+    acudb, config = _project()
+    parser = argparse.ArgumentParser(description='编译二进制穴位表')
+    parser.add_argument('--source', help='定义 ACU_DB 的 Python 文件（默认 config.py）')
+    parser.add_argument('--out', default=os.path.join(runtime.REPO_DIR, config.ACUPOINT_SETTINGS['table']),
+                        help='输出文件（默认仓库根目录下的 %s）' % config.ACUPOINT_SETTINGS['table'])
+    args = parser.parse_args(argv)
+
+    table = build(args.source)
+    if len(table.ids) > acudb.MAX_IDS:
+        print('穴位数 %d 超过上限 %d（批量数据帧的穴位序号只有1字节）' % (len(table.ids), acudb.MAX_IDS),
+              file=sys.stderr)
+        return 1
+    data = table.pack()
+    with open(args.out, 'wb') as f:
+        f.write(data)
+
+    # 读回校验：编码精度为 0.0001（相对位置）与 0.01cm（偏移、深度）
+    check = acudb.AcuTable.load(args.out)
+    if check.ids != table.ids or check.segments != table.segments:
+        print('校验失败: 读回的穴位表与定义不一致', file=sys.stderr)
+        return 1
+    for name in sorted(table.segments, key=lambda s: table.segments[s][0]):
+        start, count = table.segments[name]
+        print('%-8s %3d 个穴位  [%d, %d)' % (name, count, start, start + count))
+    print('共 %d 个穴位，%d 字节 -> %s' % (len(table.ids), len(data), args.out))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,933 @@
+# -*- coding: utf-8 -*-
+# OpenMV `image` 模块的主机替身（基于NumPy）
+#
+# 只实现本项目用到的接口，语义尽量贴近固件：
+#   RGB565 图像内部保存为 (H, W, 3) uint8，并在写入时量化到 5/6/5 位；
+#   GRAYSCALE 图像保存为 (H, W) uint8。
+# 色彩阈值、统计量均使用 OpenMV 的 LAB 取值范围（L: 0~100, A/B: -128~127）。
+import math
+import numpy as np
+
+GRAYSCALE = 1
+RGB565 = 2
+BINARY = 3
+JPEG = 4
+
+EDGE_CANNY = 0
+EDGE_SIMPLE = 1
+
+SEARCH_EX = 0
+SEARCH_DS = 1
+
+# 缩放提示（与固件相同的位标志）
+AREA = 1
+BILINEAR = 2
+BICUBIC = 4
+
+_FONT_W = 8
+_FONT_H = 10
+
+# 统计：在MicroPython堆上新建图像缓冲的次数与字节数（帧缓冲不计入）
+counters = {'image_allocs': 0, 'image_alloc_bytes': 0}
+
+
+# ------------------ 像素格式工具 ------------------
+def _quantize565(rgb):
+    # 模拟RGB565的精度损失，低位用高位补齐（与固件的展开方式一致）
+    r = rgb[..., 0] & 0xF8
+    g = rgb[..., 1] & 0xFC
+    b = rgb[..., 2] & 0xF8
+    out = np.empty_like(rgb)
+    out[..., 0] = r | (r >> 5)
+    out[..., 1] = g | (g >> 6)
+    out[..., 2] = b | (b >> 5)
+    return out
+
+
+def _rgb_to_gray(rgb):
+    # 与固件相同的整数近似：Y = (38R + 75G + 15B) >> 7
+    r = rgb[..., 0].astype(np.uint16)
+    g = rgb[..., 1].astype(np.uint16)
+    b = rgb[..., 2].astype(np.uint16)
+    return ((38 * r + 75 * g + 15 * b) >> 7).astype(np.uint8)
+
+
+def _lab_f(t):
+    return np.where(t > 0.008856, np.cbrt(t), 7.787 * t + 16.0 / 116.0)
+
+
+def rgb_to_lab(rgb):
+    """RGB(uint8) -> L, A, B 三个int16数组（OpenMV取值范围）"""
+    c = rgb.astype(np.float32) / 255.0
+    lin = np.where(c > 0.04045, ((c + 0.055) / 1.055) ** 2.4, c / 12.92)
+    r, g, b = lin[..., 0], lin[..., 1], lin[..., 2]
+    x = (0.4124 * r + 0.3576 * g + 0.1805 * b) / 0.95047
+    y = 0.2126 * r + 0.7152 * g + 0.0722 * b
+    z = (0.0193 * r + 0.1192 * g + 0.9505 * b) / 1.08883
+    fx, fy, fz = _lab_f(x), _lab_f(y), _lab_f(z)
+    l = np.clip(np.rint(116.0 * fy - 16.0), 0, 100).astype(np.int16)
+    a = np.clip(np.rint(500.0 * (fx - fy)), -128, 127).astype(np.int16)
+    bb = np.clip(np.rint(200.0 * (fy - fz)), -128, 127).astype(np.int16)
+    return l, a, bb
+
+
+def _color_to_rgb(color):
+    if color is None:
+        return (255, 255, 255)
+    if isinstance(color, (tuple, list)):
+        return tuple(int(v) & 0xFF for v in color[:3])
+    color = int(color)
+    if color > 0xFF:
+        # RGB565整数
+        return (((color >> 11) & 0x1F) << 3, ((color >> 5) & 0x3F) << 2, (color & 0x1F) << 3)
+    return (color, color, color)
+
+
+# ------------------ PNM / NPY 读写 ------------------
+def _read_token(data, pos):
+    while data[pos:pos + 1].isspace() or data[pos:pos + 1] == b'#':
+        if data[pos:pos + 1] == b'#':
+            while data[pos:pos + 1] not in (b'\n', b''):
+                pos += 1
+        pos += 1
+    start = pos
+    while not data[pos:pos + 1].isspace():
+        pos += 1
+    return data[start:pos], pos
+
+
+def load_array(path):
+    """读取 .npy / .ppm / .pgm 为 uint8 数组（RGB为HxWx3，灰度为HxW）"""
+    if path.endswith('.npy'):
+        arr = np.load(path)
+    else:
+        with open(path, 'rb') as f:
+            data = f.read()
+        magic, pos = _read_token(data, 0)
+        w, pos = _read_token(data, pos)
+        h, pos = _read_token(data, pos)
+        maxval, pos = _read_token(data, pos)
+        w, h = int(w), int(h)
+        raw = np.frombuffer(data, dtype=np.uint8, offset=pos + 1)
+        if magic == b'P6':
+            arr = raw[:w * h * 3].reshape(h, w, 3)
+        elif magic == b'P5':
+            arr = raw[:w * h].reshape(h, w)
+        else:
+            raise OSError("Unsupported image file: %s" % path)
+    if arr.dtype != np.uint8:
+        arr = np.clip(arr, 0, 255).astype(np.uint8)
+    return arr
+
+
+def save_array(path, arr):
+    """保存为 .npy / .ppm / .pgm"""
+    if path.endswith('.npy'):
+        np.save(path, arr)
+        return
+    h, w = arr.shape[:2]
+    magic = b'P6' if arr.ndim == 3 else b'P5'
+    with open(path, 'wb') as f:
+        f.write(b'%s\n%d %d\n255\n' % (magic, w, h))
+        f.write(np.ascontiguousarray(arr).tobytes())
+
+
+# ------------------ 结果对象 ------------------
+class Statistics:
+    def __init__(self, l, a=None, b=None):
+        self._ch = [self._describe(l),
+                    self._describe(a) if a is not None else (0,) * 8,
+                    self._describe(b) if b is not None else (0,) * 8]
+
+    @staticmethod
+    def _describe(v):
+        # 与固件一样基于直方图计算，避免排序
+        v = v.ravel()
+        if v.size == 0:
+            return (0,) * 8
+        base = int(v.min())
+        hist = np.bincount((v.astype(np.int32) - base))
+        vals = np.arange(len(hist)) + base
+        cdf = np.cumsum(hist)
+        n = float(v.size)
+        mean = float((hist * vals).sum()) / n
+        std = math.sqrt(max(0.0, float((hist * vals * vals).sum()) / n - mean * mean))
+        lq, med, uq = (int(vals[np.searchsorted(cdf, q * n)]) for q in (0.25, 0.5, 0.75))
+        return (int(mean), med, int(vals[int(np.argmax(hist))]), int(std),
+                base, int(vals[-1]), lq, uq)
+
+    def __getitem__(self, i):
+        return self._ch[i // 8][i % 8]
+
+    def __len__(self):
+        return 24
+
+    def __repr__(self):
+        return "{\"mean\":%d, \"median\":%d, \"mode\":%d, \"stdev\":%d, \"min\":%d, \"max\":%d, \"lq\":%d, \"uq\":%d}" % self._ch[0]
+
+    def mean(self): return self._ch[0][0]
+    def median(self): return self._ch[0][1]
+    def mode(self): return self._ch[0][2]
+    def stdev(self): return self._ch[0][3]
+    def min(self): return self._ch[0][4]
+    def max(self): return self._ch[0][5]
+    def lq(self): return self._ch[0][6]
+    def uq(self): return self._ch[0][7]
+
+    l_mean = mean
+    l_median = median
+    l_mode = mode
+    l_stdev = stdev
+    l_min = min
+    l_max = max
+    l_lq = lq
+    l_uq = uq
+
+    def a_mean(self): return self._ch[1][0]
+    def a_median(self): return self._ch[1][1]
+    def a_stdev(self): return self._ch[1][3]
+    def a_min(self): return self._ch[1][4]
+    def a_max(self): return self._ch[1][5]
+    def b_mean(self): return self._ch[2][0]
+    def b_median(self): return self._ch[2][1]
+    def b_stdev(self): return self._ch[2][3]
+    def b_min(self): return self._ch[2][4]
+    def b_max(self): return self._ch[2][5]
+
+
+class Histogram:
+    def __init__(self, bins):
+        self._bins = bins
+
+    def bins(self):
+        return self._bins[0]
+
+    def l_bins(self):
+        return self._bins[0]
+
+    def a_bins(self):
+        return self._bins[1]
+
+    def b_bins(self):
+        return self._bins[2]
+
+    def get_percentile(self, p):
+        cdf = np.cumsum(self._bins[0])
+        return int(np.searchsorted(cdf, p * cdf[-1]))
+
+
+class Line:
+    def __init__(self, x1, y1, x2, y2, magnitude, theta, rho):
+        self._v = (int(x1), int(y1), int(x2), int(y2))
+        self._magnitude = int(magnitude)
+        self._theta = int(theta)
+        self._rho = int(rho)
+
+    def line(self): return self._v
+    def x1(self): return self._v[0]
+    def y1(self): return self._v[1]
+    def x2(self): return self._v[2]
+    def y2(self): return self._v[3]
+    def length(self):
+        return int(math.sqrt((self._v[2] - self._v[0]) ** 2 + (self._v[3] - self._v[1]) ** 2))
+    def magnitude(self): return self._magnitude
+    def theta(self): return self._theta
+    def rho(self): return self._rho
+
+    def __repr__(self):
+        return "{\"x1\":%d, \"y1\":%d, \"x2\":%d, \"y2\":%d, \"length\":%d, \"magnitude\":%d, \"theta\":%d, \"rho\":%d}" % (
+            self._v + (self.length(), self._magnitude, self._theta, self._rho))
+
+
+class Blob:
+    def __init__(self, x0, y0, x1, y1, m, code):
+        # m: [n, sx, sy, sxx, syy, sxy] 一阶/二阶矩
+        self._rect = (int(x0), int(y0), int(x1 - x0 + 1), int(y1 - y0 + 1))
+        self._m = m
+        self._code = code
+        self._count = 1
+
+    def _merge(self, other):
+        x0 = min(self._rect[0], other._rect[0])
+        y0 = min(self._rect[1], other._rect[1])
+        x1 = max(self._rect[0] + self._rect[2], other._rect[0] + other._rect[2]) - 1
+        y1 = max(self._rect[1] + self._rect[3], other._rect[1] + other._rect[3]) - 1
+        self._rect = (x0, y0, x1 - x0 + 1, y1 - y0 + 1)
+        self._m = [a + b for a, b in zip(self._m, other._m)]
+        self._code |= other._code
+        self._count += other._count
+
+    def rect(self): return self._rect
+    def x(self): return self._rect[0]
+    def y(self): return self._rect[1]
+    def w(self): return self._rect[2]
+    def h(self): return self._rect[3]
+    def pixels(self): return int(self._m[0])
+    def cx(self): return int(round(self._m[1] / self._m[0]))
+    def cy(self): return int(round(self._m[2] / self._m[0]))
+    def cxf(self): return self._m[1] / self._m[0]
+    def cyf(self): return self._m[2] / self._m[0]
+    def code(self): return self._code
+    def count(self): return self._count
+    def area(self): return self._rect[2] * self._rect[3]
+    def density(self): return self.pixels() / float(self.area())
+
+    def _central(self):
+        n, sx, sy, sxx, syy, sxy = self._m
+        cx, cy = sx / n, sy / n
+        return sxx / n - cx * cx, syy / n - cy * cy, sxy / n - cx * cy
+
+    def rotation(self):
+        mxx, myy, mxy = self._central()
+        return (0.5 * math.atan2(2 * mxy, mxx - myy)) % math.pi
+
+    rotation_rad = rotation
+
+    def rotation_deg(self):
+        return int(math.degrees(self.rotation()))
+
+    def elongation(self):
+        mxx, myy, mxy = self._central()
+        d = math.sqrt(max(0.0, (mxx - myy) ** 2 + 4 * mxy * mxy))
+        major, minor = (mxx + myy + d) / 2, (mxx + myy - d) / 2
+        return 1.0 - math.sqrt(max(0.0, minor) / major) if major > 0 else 0.0
+
+    def major_axis_line(self):
+        mxx, myy, mxy = self._central()
+        d = math.sqrt(max(0.0, (mxx - myy) ** 2 + 4 * mxy * mxy))
+        half = 2 * math.sqrt(max(0.0, (mxx + myy + d) / 2))
+        t = self.rotation()
+        cx, cy = self.cxf(), self.cyf()
+        return (int(cx - half * math.cos(t)), int(cy - half * math.sin(t)),
+                int(cx + half * math.cos(t)), int(cy + half * math.sin(t)))
+
+    def __getitem__(self, i):
+        return (self._rect + (self.pixels(), self.cx(), self.cy(), self.rotation(), self._code, self._count))[i]
+
+    def __repr__(self):
+        return "{\"x\":%d, \"y\":%d, \"w\":%d, \"h\":%d, \"pixels\":%d, \"cx\":%d, \"cy\":%d}" % (
+            self._rect + (self.pixels(), self.cx(), self.cy()))
+
+
+class Rect:
+    def __init__(self, x, y, w, h, magnitude, corners):
+        self._rect = (int(x), int(y), int(w), int(h))
+        self._magnitude = int(magnitude)
+        self._corners = corners
+
+    def rect(self): return self._rect
+    def x(self): return self._rect[0]
+    def y(self): return self._rect[1]
+    def w(self): return self._rect[2]
+    def h(self): return self._rect[3]
+    def magnitude(self): return self._magnitude
+    def corners(self): return self._corners
+
+
+# ------------------ 连通域 ------------------
+def _runs(mask):
+    """按行提取游程，返回 (y, x0, x1) 列表（x1含）"""
+    h, w = mask.shape
+    padded = np.zeros((h, w + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask
+    d = np.diff(padded, axis=1)
+    ys, xs = np.nonzero(d == 1)
+    ye, xe = np.nonzero(d == -1)
+    return ys, xs, xe - 1
+
+
+def _label_runs(mask, ox, oy, code):
+    ys, xs, xe = _runs(mask)
+    n = len(ys)
+    parent = list(range(n))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    # 相邻两行游程重叠即连通（4连通）
+    row_start = np.searchsorted(ys, np.arange(mask.shape[0] + 1))
+    for y in range(1, mask.shape[0]):
+        a0, a1 = row_start[y - 1], row_start[y]
+        b0, b1 = row_start[y], row_start[y + 1]
+        i, j = a0, b0
+        while i < a1 and j < b1:
+            if xs[i] <= xe[j] and xs[j] <= xe[i]:
+                ri, rj = find(i), find(j)
+                if ri != rj:
+                    parent[rj] = ri
+            if xe[i] < xe[j]:
+                i += 1
+            else:
+                j += 1
+
+    groups = {}
+    for k in range(n):
+        r = find(k)
+        y = int(ys[k]) + oy
+        x0 = int(xs[k]) + ox
+        x1 = int(xe[k]) + ox
+        cnt = x1 - x0 + 1
+        sx = cnt * (x0 + x1) / 2.0
+        sxx = (x1 * (x1 + 1) * (2 * x1 + 1) - (x0 - 1) * x0 * (2 * x0 - 1)) / 6.0
+        g = groups.get(r)
+        if g is None:
+            groups[r] = [x0, y, x1, y, [cnt, sx, cnt * y, sxx, cnt * y * y, sx * y]]
+        else:
+            g[0] = min(g[0], x0)
+            g[2] = max(g[2], x1)
+            g[3] = y
+            m = g[4]
+            m[0] += cnt
+            m[1] += sx
+            m[2] += cnt * y
+            m[3] += sxx
+            m[4] += cnt * y * y
+            m[5] += sx * y
+    return [Blob(g[0], g[1], g[2], g[3], g[4], code) for g in groups.values()]
+
+
+def _rects_touch(a, b, margin):
+    return not (a[0] > b[0] + b[2] - 1 + margin or b[0] > a[0] + a[2] - 1 + margin or
+                a[1] > b[1] + b[3] - 1 + margin or b[1] > a[1] + a[3] - 1 + margin)
+
+
+# ------------------ 卷积工具 ------------------
+def _binomial(size):
+    k = np.array([1.0])
+    for _ in range(2 * size):
+        k = np.convolve(k, [1.0, 1.0])
+    return k / k.sum()
+
+
+def _sep_filter(arr, kernel):
+    r = len(kernel) // 2
+    pad = [(r, r), (r, r)] + [(0, 0)] * (arr.ndim - 2)
+    p = np.pad(arr.astype(np.float32), pad, mode='edge')
+    h, w = arr.shape[:2]
+    tmp = sum(kernel[i] * p[:, i:i + w] for i in range(len(kernel)))
+    return sum(kernel[i] * tmp[i:i + h] for i in range(len(kernel)))
+
+
+def _sobel(gray):
+    p = np.pad(gray.astype(np.float32), 1, mode='edge')
+    gx = (p[:-2, 2:] + 2 * p[1:-1, 2:] + p[2:, 2:]) - (p[:-2, :-2] + 2 * p[1:-1, :-2] + p[2:, :-2])
+    gy = (p[2:, :-2] + 2 * p[2:, 1:-1] + p[2:, 2:]) - (p[:-2, :-2] + 2 * p[:-2, 1:-1] + p[:-2, 2:])
+    return gx, gy
+
+
+# ------------------ Image ------------------
+class Image:
+    def __init__(self, arg=None, height=None, pixformat=None, copy_to_fb=False, _framebuffer=False,
+                 **kwargs):
+        if isinstance(arg, np.ndarray):
+            self._set(arg)
+        elif isinstance(arg, str):
+            self._set(load_array(arg))
+        else:
+            w, h = int(arg), int(height)
+            fmt = RGB565 if pixformat is None else pixformat
+            self._set(np.zeros((h, w, 3) if fmt == RGB565 else (h, w), dtype=np.uint8))
+        if not (_framebuffer or copy_to_fb):
+            counters['image_allocs'] += 1
+            counters['image_alloc_bytes'] += self.size()
+
+    def _set(self, arr):
+        arr = np.ascontiguousarray(arr, dtype=np.uint8)
+        self._a = _quantize565(arr) if arr.ndim == 3 else arr
+
+    # ---- 基本属性 ----
+    def width(self): return self._a.shape[1]
+    def height(self): return self._a.shape[0]
+    def format(self): return RGB565 if self._a.ndim == 3 else GRAYSCALE
+    def size(self): return self._a.shape[0] * self._a.shape[1] * (2 if self._a.ndim == 3 else 1)
+    def is_rgb565(self): return self._a.ndim == 3
+    def is_grayscale(self): return self._a.ndim == 2
+
+    def __repr__(self):
+        return "{\"w\":%d, \"h\":%d, \"type\"=\"%s\", \"size\":%d}" % (
+            self.width(), self.height(), "rgb565" if self._a.ndim == 3 else "grayscale", self.size())
+
+    def to_ndarray(self):
+        """主机专用：返回底层像素数组（不拷贝）"""
+        return self._a
+
+    def bytearray(self):
+        if self._a.ndim == 2:
+            return bytearray(self._a.tobytes())
+        a = self._a.astype(np.uint16)
+        v = ((a[..., 0] >> 3) << 11) | ((a[..., 1] >> 2) << 5) | (a[..., 2] >> 3)
+        return bytearray(v.astype('<u2').tobytes())
+
+    def _roi(self, roi):
+        if roi is None:
+            return 0, 0, self.width(), self.height()
+        x, y, w, h = [int(v) for v in roi]
+        x0, y0 = max(0, x), max(0, y)
+        x1, y1 = min(self.width(), x + w), min(self.height(), y + h)
+        if x1 <= x0 or y1 <= y0:
+            raise ValueError("ROI does not overlap on the image!")
+        return x0, y0, x1 - x0, y1 - y0
+
+    def _gray(self, roi=None):
+        x, y, w, h = self._roi(roi)
+        a = self._a[y:y + h, x:x + w]
+        return _rgb_to_gray(a) if a.ndim == 3 else a
+
+    # ---- 像素访问 ----
+    def get_pixel(self, x, y, rgbtuple=None):
+        if not (0 <= x < self.width() and 0 <= y < self.height()):
+            return None
+        v = self._a[y, x]
+        return tuple(int(c) for c in v) if self._a.ndim == 3 else int(v)
+
+    def set_pixel(self, x, y, color):
+        if 0 <= x < self.width() and 0 <= y < self.height():
+            rgb = _color_to_rgb(color)
+            if self._a.ndim == 3:
+                self._a[y, x] = _quantize565(np.array(rgb, dtype=np.uint8))
+            else:
+                self._a[y, x] = int(_rgb_to_gray(np.array(rgb, dtype=np.uint8)))
+        return self
+
+    # ---- 拷贝/缩放 ----
+    def _resampled(self, roi, x_scale, y_scale, x_size=None, y_size=None, hint=0):
+        x, y, w, h = self._roi(roi)
+        a = self._a[y:y + h, x:x + w]
+        if x_size is not None:
+            x_scale = x_size / float(w)
+            y_scale = y_scale if y_size is None else y_size / float(h)
+            if y_size is None:
+                y_scale = x_scale
+        elif y_size is not None:
+            y_scale = x_scale = y_size / float(h)
+        nw, nh = max(1, int(w * x_scale)), max(1, int(h * y_scale))
+        # 给定目标尺寸时直接使用，避免比例换算的浮点误差少一个像素
+        if x_size is not None:
+            nw = int(x_size)
+            if y_size is None:
+                nh = max(1, int(round(h * x_scale)))
+        if y_size is not None:
+            nh = int(y_size)
+            if x_size is None:
+                nw = max(1, int(round(w * y_scale)))
+        if (hint & AREA) and nw < w and nh < h:
+            # 区域平均缩小：每个目标像素取其覆盖的源像素均值
+            xe = np.minimum((np.arange(nw + 1) / x_scale).astype(np.int32), w)
+            ye = np.minimum((np.arange(nh + 1) / y_scale).astype(np.int32), h)
+            acc = np.add.reduceat(np.add.reduceat(a.astype(np.float32), ye[:-1], axis=0), xe[:-1], axis=1)
+            cnt = np.outer(np.diff(ye), np.diff(xe)).astype(np.float32)
+            if a.ndim == 3:
+                cnt = cnt[..., None]
+            return (acc / np.maximum(cnt, 1) + 0.5).astype(np.uint8)
+        if (nw, nh) != (w, h):
+            xi = np.minimum((np.arange(nw) / x_scale).astype(np.int32), w - 1)
+            yi = np.minimum((np.arange(nh) / y_scale).astype(np.int32), h - 1)
+            a = a[yi][:, xi]
+        return a
+
+    def copy(self, roi=None, x_scale=1.0, y_scale=1.0, hint=0, x_size=None, y_size=None,
+             copy_to_fb=False, **kwargs):
+        return Image(self._resampled(roi, x_scale, y_scale, x_size, y_size, hint).copy(), copy_to_fb=copy_to_fb)
+
+    def crop(self, roi=None, x_scale=1.0, y_scale=1.0, hint=0, x_size=None, y_size=None,
+             copy=False, **kwargs):
+        a = self._resampled(roi, x_scale, y_scale, x_size, y_size, hint).copy()
+        if copy:
+            return Image(a)
+        self._a = a
+        return self
+
+    scale = crop
+
+    def draw_image(self, image, x, y, x_scale=1.0, y_scale=1.0, roi=None, hint=0, x_size=None, y_size=None,
+                   **kwargs):
+        src = image._resampled(roi, x_scale, y_scale, x_size, y_size, hint=hint)
+        if src.ndim != self._a.ndim:
+            src = _rgb_to_gray(src) if src.ndim == 3 else np.repeat(src[..., None], 3, axis=2)
+        h = min(src.shape[0], self.height() - y)
+        w = min(src.shape[1], self.width() - x)
+        if h > 0 and w > 0:
+            self._a[y:y + h, x:x + w] = src[:h, :w]
+        return self
+
+    def to_grayscale(self, copy=False, **kwargs):
+        a = self._gray()
+        if copy:
+            return Image(a.copy())
+        self._a = a.copy()
+        return self
+
+    def to_rgb565(self, copy=False, **kwargs):
+        a = self._a if self._a.ndim == 3 else np.repeat(self._a[..., None], 3, axis=2)
+        if copy:
+            return Image(a.copy())
+        self._set(a)
+        return self
+
+    def mean_pool(self, x_div, y_div):
+        h, w = self.height() // y_div, self.width() // x_div
+        a = self._a[:h * y_div, :w * x_div].astype(np.uint16)
+        if a.ndim == 3:
+            a = a.reshape(h, y_div, w, x_div, 3).mean(axis=(1, 3))
+        else:
+            a = a.reshape(h, y_div, w, x_div).mean(axis=(1, 3))
+        self._a = a.astype(np.uint8)
+        return self
+
+    def mean_pooled(self, x_div, y_div):
+        return self.copy().mean_pool(x_div, y_div)
+
+    def clear(self, mask=None):
+        self._a[...] = 0
+        return self
+
+    # ---- 算术 ----
+    def _other(self, other):
+        if isinstance(other, Image):
+            b = other._a
+        elif isinstance(other, str):
+            b = load_array(other)
+        else:
+            b = np.full_like(self._a, other)
+        if b.ndim != self._a.ndim:
+            b = _rgb_to_gray(b) if b.ndim == 3 else np.repeat(b[..., None], 3, axis=2)
+        if b.shape[:2] != self._a.shape[:2]:
+            raise ValueError("Images must have the same size")
+        return b
+
+    def difference(self, other, mask=None):
+        b = self._other(other)
+        self._a = np.abs(self._a.astype(np.int16) - b.astype(np.int16)).astype(np.uint8)
+        return self
+
+    def sub(self, other, reverse=False, mask=None):
+        b = self._other(other).astype(np.int16)
+        a = self._a.astype(np.int16)
+        self._a = np.clip(b - a if reverse else a - b, 0, 255).astype(np.uint8)
+        return self
+
+    def add(self, other, mask=None):
+        b = self._other(other).astype(np.int16)
+        self._a = np.clip(self._a.astype(np.int16) + b, 0, 255).astype(np.uint8)
+        return self
+
+    def replace(self, other, **kwargs):
+        self._a = self._other(other).copy()
+        return self
+
+    set = replace
+
+    # ---- 滤波/边缘 ----
+    def gaussian(self, size, unsharp=False, mul=None, add=0.0, threshold=False, offset=0,
+                 invert=False, mask=None):
+        blurred = _sep_filter(self._a, _binomial(size))
+        if unsharp:
+            blurred = 2.0 * self._a - blurred
+        self._a = np.clip(np.rint(blurred), 0, 255).astype(np.uint8)
+        return self
+
+    def find_edges(self, edge_type, threshold=(100, 200)):
+        gray = self._gray()
+        gx, gy = _sobel(_sep_filter(gray, _binomial(1)) if edge_type == EDGE_CANNY else gray)
+        mag = np.abs(gx) + np.abs(gy)
+        lo, hi = threshold
+        if edge_type == EDGE_CANNY:
+            # 简化的Canny：方向非极大值抑制 + 双阈值一次膨胀连接
+            ang = (np.rint(np.degrees(np.arctan2(gy, gx)) / 45.0).astype(np.int32)) % 4
+            p = np.pad(mag, 1)
+            h, w = mag.shape
+            offs = {0: (0, 1), 1: (1, 1), 2: (1, 0), 3: (1, -1)}
+            keep = np.zeros(mag.shape, dtype=bool)
+            for k, (dy, dx) in offs.items():
+                n1 = p[1 + dy:1 + dy + h, 1 + dx:1 + dx + w]
+                n2 = p[1 - dy:1 - dy + h, 1 - dx:1 - dx + w]
+                keep |= (ang == k) & (mag >= n1) & (mag >= n2)
+            mag = np.where(keep, mag, 0)
+            strong = mag >= hi
+            weak = mag >= lo
+            s = np.pad(strong, 1)
+            near = np.zeros_like(strong)
+            for dy in (-1, 0, 1):
+                for dx in (-1, 0, 1):
+                    near |= s[1 + dy:1 + dy + h, 1 + dx:1 + dx + w]
+            edges = strong | (weak & near)
+        else:
+            edges = mag >= hi
+        out = np.where(edges, 255, 0).astype(np.uint8)
+        self._a = np.repeat(out[..., None], 3, axis=2) if self._a.ndim == 3 else out
+        return self
+
+    def binary(self, thresholds, invert=False, zero=False, mask=None, to_bitmap=False, copy=False):
+        m = self._threshold_mask(thresholds, None)
+        if invert:
+            m = ~m
+        if zero:
+            a = self._a.copy()
+            a[m] = 0
+        else:
+            out = np.where(m, 255, 0).astype(np.uint8)
+            a = np.repeat(out[..., None], 3, axis=2) if self._a.ndim == 3 else out
+        if copy:
+            return Image(a)
+        self._a = a
+        return self
+
+    # ---- 统计 ----
+    def get_statistics(self, thresholds=None, invert=False, roi=None, bins=None, l_bins=None,
+                       a_bins=None, b_bins=None):
+        x, y, w, h = self._roi(roi)
+        a = self._a[y:y + h, x:x + w]
+        if a.ndim == 2:
+            return Statistics(a)
+        return Statistics(*rgb_to_lab(a))
+
+    get_stats = get_statistics
+    statistics = get_statistics
+
+    def get_histogram(self, thresholds=None, invert=False, roi=None, bins=None, l_bins=None,
+                      a_bins=None, b_bins=None):
+        x, y, w, h = self._roi(roi)
+        a = self._a[y:y + h, x:x + w]
+        if a.ndim == 2:
+            n = bins or 256
+            hist = np.bincount((a.astype(np.int32) * n) // 256, minlength=n)
+            return Histogram([(hist / float(a.size)).tolist(), [], []])
+        l, aa, bb = rgb_to_lab(a)
+        nl, na, nb = l_bins or bins or 101, a_bins or bins or 256, b_bins or bins or 256
+        hl = np.bincount((l.ravel().astype(np.int32) * nl) // 101, minlength=nl)
+        ha = np.bincount(((aa.ravel().astype(np.int32) + 128) * na) // 256, minlength=na)
+        hb = np.bincount(((bb.ravel().astype(np.int32) + 128) * nb) // 256, minlength=nb)
+        total = float(l.size)
+        return Histogram([(hl / total).tolist(), (ha / total).tolist(), (hb / total).tolist()])
+
+    get_hist = get_histogram
+    histogram = get_histogram
+
+    # ---- 特征检测 ----
+    def _threshold_mask(self, thresholds, roi, single=None):
+        x, y, w, h = self._roi(roi)
+        a = self._a[y:y + h, x:x + w]
+        if a.ndim == 3:
+            chans = rgb_to_lab(a)
+            defaults = (0, 100, -128, 127, -128, 127)
+        else:
+            chans = (a,)
+            defaults = (0, 255)
+        masks = []
+        for t in (thresholds if single is None else [single]):
+            t = tuple(t) + defaults[len(t):]
+            m = np.ones(a.shape[:2], dtype=bool)
+            for i, c in enumerate(chans):
+                # 固件会自动交换颠倒的 min/max
+                lo, hi = min(t[2 * i], t[2 * i + 1]), max(t[2 * i], t[2 * i + 1])
+                m &= (c >= lo) & (c <= hi)
+            masks.append(m)
+        if single is not None:
+            return masks[0]
+        out = masks[0]
+        for m in masks[1:]:
+            out = out | m
+        return out
+
+    def find_blobs(self, thresholds, invert=False, roi=None, x_stride=2, y_stride=1,
+                   area_threshold=10, pixels_threshold=10, merge=False, margin=0,
+                   threshold_cb=None, merge_cb=None, **kwargs):
+        x, y, w, h = self._roi(roi)
+        blobs = []
+        for i, t in enumerate(thresholds):
+            m = self._threshold_mask(None, (x, y, w, h), single=t)
+            if invert:
+                m = ~m
+            for b in _label_runs(m, x, y, 1 << i):
+                if b.pixels() >= pixels_threshold and b.area() >= area_threshold:
+                    if threshold_cb is None or threshold_cb(b):
+                        blobs.append(b)
+        if merge:
+            merged = True
+            while merged:
+                merged = False
+                out = []
+                for b in blobs:
+                    for o in out:
+                        if _rects_touch(o.rect(), b.rect(), margin) and (merge_cb is None or merge_cb(o, b)):
+                            o._merge(b)
+                            merged = True
+                            break
+                    else:
+                        out.append(b)
+                blobs = out
+        return blobs
+
+    def find_lines(self, roi=None, x_stride=2, y_stride=1, threshold=1000, theta_margin=25,
+                   rho_margin=25):
+        rx, ry, rw, rh = self._roi(roi)
+        gx, gy = _sobel(self._gray((rx, ry, rw, rh)))
+        mag = np.hypot(gx, gy)
+        sub = np.zeros_like(mag, dtype=bool)
+        sub[::max(1, y_stride), ::max(1, x_stride)] = True
+        ys, xs = np.nonzero((mag > 0) & sub)
+        if len(ys) == 0:
+            return []
+        # 每个像素只按梯度方向投一票（与固件一致）
+        theta = (np.rint(np.degrees(np.arctan2(gy[ys, xs], gx[ys, xs]))).astype(np.int32)) % 180
+        px, py = xs + rx, ys + ry
+        rad = np.radians(theta)
+        rho = np.rint(px * np.cos(rad) + py * np.sin(rad)).astype(np.int32)
+        rho_off = int(math.hypot(self.width(), self.height())) + 1
+        acc = np.zeros((180, 2 * rho_off + 1), dtype=np.float64)
+        np.add.at(acc, (theta, rho + rho_off), mag[ys, xs])
+        # 3x3 局部极大值（theta 方向循环）
+        p = np.pad(acc, ((1, 1), (1, 1)), mode='constant')
+        p[0, 1:-1] = acc[-1]
+        p[-1, 1:-1] = acc[0]
+        peak = acc >= threshold
+        for dy in (-1, 0, 1):
+            for dx in (-1, 0, 1):
+                if dy or dx:
+                    peak &= acc >= p[1 + dy:1 + dy + 180, 1 + dx:1 + dx + acc.shape[1]]
+        ts, rs = np.nonzero(peak)
+        order = np.argsort(-acc[ts, rs])
+        found = []
+        for k in order[:200]:
+            t, r, m = int(ts[k]), int(rs[k]) - rho_off, float(acc[ts[k], rs[k]])
+            for f in found:
+                dt = abs(f[0] - t)
+                dt = min(dt, 180 - dt)
+                if dt <= theta_margin and abs(f[1] - r) <= rho_margin:
+                    break
+            else:
+                found.append((t, r, m))
+        lines = []
+        for t, r, m in found:
+            seg = _clip_hough(t, r, rx, ry, rw, rh)
+            if seg:
+                lines.append(Line(seg[0], seg[1], seg[2], seg[3], m, t, r))
+        return lines
+
+    def find_rects(self, roi=None, threshold=10000):
+        # 近似实现：对亮区域做连通域，用外接矩形代表四边形
+        x, y, w, h = self._roi(roi)
+        gray = self._gray((x, y, w, h))
+        # 取暗/亮两端的中点作为阈值，ROI 紧贴卡片（亮区域占多数）时同样有效
+        lo, hi = np.percentile(gray, (5, 95))
+        level = max(int((lo + hi) / 2) + 1, 1)
+        rects = []
+        for b in _label_runs(gray >= level, x, y, 1):
+            if b.w() < 4 or b.h() < 4 or b.density() < 0.75:
+                continue
+            # 幅值 ≈ 边缘梯度沿周长的累计
+            mag = 2 * (b.w() + b.h()) * 255
+            if mag >= threshold:
+                bx, by, bw, bh = b.rect()
+                rects.append(Rect(bx, by, bw, bh, mag,
+                                  ((bx, by), (bx + bw - 1, by), (bx + bw - 1, by + bh - 1), (bx, by + bh - 1))))
+        return rects
+
+    # ---- 绘制 ----
+    def _paint(self, ys, xs, color):
+        keep = (xs >= 0) & (xs < self.width()) & (ys >= 0) & (ys < self.height())
+        ys, xs = ys[keep], xs[keep]
+        rgb = _color_to_rgb(color)
+        if self._a.ndim == 3:
+            self._a[ys, xs] = _quantize565(np.array(rgb, dtype=np.uint8))
+        else:
+            self._a[ys, xs] = int(_rgb_to_gray(np.array(rgb, dtype=np.uint8)))
+
+    def draw_line(self, x0, y0=None, x1=None, y1=None, color=None, thickness=1):
+        if isinstance(x0, (tuple, list)):
+            if y0 is not None and color is None:
+                color = y0
+            x0, y0, x1, y1 = x0
+        n = int(max(abs(x1 - x0), abs(y1 - y0))) + 1
+        xs = np.rint(np.linspace(x0, x1, n)).astype(np.int32)
+        ys = np.rint(np.linspace(y0, y1, n)).astype(np.int32)
+        r = thickness // 2
+        for d in range(-r, thickness - r):
+            self._paint(ys + d, xs, color)
+            self._paint(ys, xs + d, color)
+        return self
+
+    def draw_rectangle(self, x, y=None, w=None, h=None, color=None, thickness=1, fill=False):
+        if isinstance(x, (tuple, list)):
+            if y is not None and color is None:
+                color = y
+            x, y, w, h = x
+        if fill:
+            ys, xs = np.mgrid[y:y + h, x:x + w]
+            self._paint(ys.ravel(), xs.ravel(), color)
+            return self
+        for t in range(thickness):
+            self.draw_line(x + t, y + t, x + w - 1 - t, y + t, color)
+            self.draw_line(x + t, y + h - 1 - t, x + w - 1 - t, y + h - 1 - t, color)
+            self.draw_line(x + t, y + t, x + t, y + h - 1 - t, color)
+            self.draw_line(x + w - 1 - t, y + t, x + w - 1 - t, y + h - 1 - t, color)
+        return self
+
+    def draw_cross(self, x, y=None, color=None, size=5, thickness=1):
+        if isinstance(x, (tuple, list)):
+            if y is not None and color is None:
+                color = y
+            x, y = x
+        self.draw_line(x - size, y, x + size, y, color, thickness)
+        self.draw_line(x, y - size, x, y + size, color, thickness)
+        return self
+
+    def draw_circle(self, x, y=None, radius=None, color=None, thickness=1, fill=False):
+        if isinstance(x, (tuple, list)):
+            if y is not None and color is None:
+                color = y
+            x, y, radius = x
+        t = np.linspace(0, 2 * math.pi, max(8, int(2 * math.pi * radius)))
+        self._paint(np.rint(y + radius * np.sin(t)).astype(np.int32),
+                    np.rint(x + radius * np.cos(t)).astype(np.int32), color)
+        return self
+
+    def draw_string(self, x, y, text, color=None, scale=1, x_spacing=0, y_spacing=0,
+                    mono_space=True, **kwargs):
+        # 用字符码生成的5x7点阵代替字库，开销与字符数成正比
+        text = str(text)
+        cx, cy = int(x), int(y)
+        s = max(1, int(scale))
+        for ch in text:
+            if ch == '\n':
+                cx, cy = int(x), cy + (_FONT_H + y_spacing) * s
+                continue
+            bits = (ord(ch) * 2654435761) & 0x7FFFFFFFF
+            idx = np.nonzero([(bits >> i) & 1 for i in range(35)])[0]
+            ys = cy + (idx // 5 + 1) * s
+            xs = cx + (idx % 5 + 1) * s
+            self._paint(ys, xs, color)
+            cx += (_FONT_W + x_spacing) * s
+        return self
+
+    # ---- 保存/压缩 ----
+    def save(self, path, roi=None, quality=50):
+        x, y, w, h = self._roi(roi)
+        save_array(path, self._a[y:y + h, x:x + w])
+        return self
+
+
+def _clip_hough(theta, rho, rx, ry, rw, rh):
+    """把 (theta, rho) 直线裁剪到ROI边界内，返回两端点"""
+    t = math.radians(theta)
+    c, s = math.cos(t), math.sin(t)
+    x0, y0, x1, y1 = rx, ry, rx + rw - 1, ry + rh - 1
+    pts = []
+    if abs(s) > 1e-6:
+        for x in (x0, x1):
+            y = (rho - x * c) / s
+            if y0 <= y <= y1:
+                pts.append((x, y))
+    if abs(c) > 1e-6:
+        for y in (y0, y1):
+            x = (rho - y * s) / c
+            if x0 <= x <= x1:
+                pts.append((x, y))
+    if len(pts) < 2:
+        return None
+    a = pts[0]
+    b = max(pts[1:], key=lambda p: (p[0] - a[0]) ** 2 + (p[1] - a[1]) ** 2)
+    return (int(round(a[0])), int(round(a[1])), int(round(b[0])), int(round(b[1])))
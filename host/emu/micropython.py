@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+# MicroPython `micropython` 模块的主机替身
+
+
+def const(x):
+    return x
+
+
+def native(f):
+    return f
+
+
+def viper(f):
+    return f
+
+
+def mem_info(verbose=False):
+    return None
+
+
+def alloc_emergency_exception_buf(size):
+    return None
+
+
+def schedule(func, arg):
+    func(arg)
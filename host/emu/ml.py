@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+# OpenMV `ml` 模块的主机替身：桩模型
+#
+# 从 .tflite 头部读取真实的输入/输出形状与量化参数，
+# 预测结果由简单的肤色占比启发式给出（"arm" 类的置信度），
+# 可选按固定耗时阻塞以模拟设备上的推理开销。
+import os
+import struct
+import time as _time
+import numpy as np
+import image
+
+# 由 host.runtime 配置
+config = {
+    'latency_ms': 0.0,     # 每次推理模拟耗时
+    'arm_index': 0,        # "arm" 在输出向量中的下标（与 labels.txt 顺序一致）
+    'fixed': None,         # 固定输出（例如 [0.9, 0.1]），None 表示使用启发式
+}
+
+counters = {'predict_calls': 0}
+
+
+def _tflite_io(path):
+    """极简 flatbuffer 解析：返回 (inputs, outputs)，每项为 (shape, dtype, scale, zero_point)"""
+    with open(path, 'rb') as f:
+        d = f.read()
+
+    def u32(o): return struct.unpack_from('<I', d, o)[0]
+    def i32(o): return struct.unpack_from('<i', d, o)[0]
+
+    def table(o):
+        vt = o - i32(o)
+        vlen = struct.unpack_from('<H', d, vt)[0]
+
+        def field(i):
+            if 4 + 2 * i >= vlen:
+                return None
+            off = struct.unpack_from('<H', d, vt + 4 + 2 * i)[0]
+            return o + off if off else None
+        return field
+
+    def vec(o):
+        o += u32(o)
+        return o + 4, u32(o)
+
+    def deref(o):
+        return o + u32(o)
+
+    model = table(u32(0))
+    sgv, _ = vec(model(2))
+    sg = table(deref(sgv))
+    tv, _ = vec(sg(0))
+    dtypes = {0: 'float32', 3: 'uint8', 9: 'int8'}
+
+    def tensor(idx):
+        t = table(deref(tv + 4 * idx))
+        sv, sn = vec(t(0))
+        shape = tuple(i32(sv + 4 * k) for k in range(sn))
+        dtype = dtypes.get(d[t(1)] if t(1) else 0, 'float32')
+        scale, zp = 1.0, 0
+        if t(4):
+            q = table(deref(t(4)))
+            if q(2):
+                a, n = vec(q(2))
+                if n:
+                    scale = struct.unpack_from('<f', d, a)[0]
+            if q(3):
+                a, n = vec(q(3))
+                if n:
+                    zp = struct.unpack_from('<q', d, a)[0]
+        return shape, dtype, scale, zp
+
+    def io(field):
+        v, n = vec(sg(field))
+        return [tensor(i32(v + 4 * k)) for k in range(n)]
+
+    return io(1), io(2)
+
+
+class Model:
+    def __init__(self, path, load_to_fb=False):
+        if not os.path.exists(path):
+            raise OSError("Could not find the file")
+        try:
+            inputs, outputs = _tflite_io(path)
+        except Exception:
+            inputs = [((1, 96, 96, 3), 'int8', 1 / 255.0, -128)]
+            outputs = [((1, 2), 'int8', 1 / 256.0, -128)]
+        self.input_shape = [i[0] for i in inputs]
+        self.input_dtype = [i[1] for i in inputs]
+        self.input_scale = [i[2] for i in inputs]
+        self.input_zero_point = [i[3] for i in inputs]
+        self.output_shape = [o[0] for o in outputs]
+        self.output_dtype = [o[1] for o in outputs]
+        self.output_scale = [o[2] for o in outputs]
+        self.output_zero_point = [o[3] for o in outputs]
+        self.len = os.stat(path)[6]
+        self.ram = 0
+
+    def _arm_score(self, img):
+        if config['fixed'] is not None:
+            return None
+        a = img.to_ndarray() if isinstance(img, image.Image) else np.asarray(img)
+        if a.ndim != 3:
+            return 0.0
+        # 粗略的肤色判定：暖色调、中等亮度
+        r, g, b = (a[..., i].astype(np.int16) for i in range(3))
+        skin = (r > 90) & (r > g + 10) & (r > b + 15) & (g > 40)
+        return float(min(1.0, skin.mean() * 8.0))
+
+    def predict(self, inputs, callback=None):
+        counters['predict_calls'] += 1
+        if config['latency_ms']:
+            _time.sleep(config['latency_ms'] / 1000.0)
+        n = self.output_shape[0][-1]
+        if config['fixed'] is not None:
+            out = np.array(config['fixed'], dtype=np.float32)
+        else:
+            p = self._arm_score(inputs[0])
+            rest = (1.0 - p) / max(1, n - 1)
+            out = np.full(n, rest, dtype=np.float32)
+            out[config['arm_index']] = p
+        out = out.reshape(self.output_shape[0])
+        if callback:
+            return callback(self, inputs, [out])
+        return [out]
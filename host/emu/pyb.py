@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+# OpenMV `pyb` 模块的主机替身
+#
+# UART 写入会追加到文件（默认丢弃），并统计字节数；
+# 可选按波特率模拟发送耗时，用于评估串口阻塞对帧延迟的影响。
+import os
+import time as _time
+
+# 由 host.runtime 配置
+config = {
+    'uart_dir': None,        # UART输出目录，None 表示不落盘
+    'uart_realtime': False,  # 是否按波特率阻塞模拟发送耗时
+    'adc_value': 600,        # ADC 固定读数
+}
+
+counters = {'uart_bytes': 0, 'uart_writes': 0}
+
+
+class Pin:
+    IN = 0
+    OUT_PP = 1
+    OUT = 1
+    PULL_NONE = 0
+    PULL_UP = 1
+
+    def __init__(self, name, mode=None, pull=None):
+        self._name = name
+        self._value = 0
+
+    def value(self, v=None):
+        if v is None:
+            return self._value
+        self._value = int(bool(v))
+
+    def high(self):
+        self._value = 1
+
+    def low(self):
+        self._value = 0
+
+    on = high
+    off = low
+
+
+class ADC:
+    def __init__(self, pin):
+        self._pin = pin
+
+    def read(self):
+        return config['adc_value']
+
+
+class LED:
+    def __init__(self, n):
+        self._n = n
+        self._on = False
+
+    def on(self):
+        self._on = True
+
+    def off(self):
+        self._on = False
+
+    def toggle(self):
+        self._on = not self._on
+
+
+class UART:
+    def __init__(self, bus, baudrate=9600, **kwargs):
+        self._bus = bus
+        self._file = None
+        self.init(baudrate, **kwargs)
+
+    def init(self, baudrate=9600, bits=8, parity=None, stop=1, timeout=0, timeout_char=0,
+             flow=0, read_buf_len=64, txbuf=None, **kwargs):
+        self._baud = baudrate
+        self._timeout = timeout
+        self._bits_per_byte = 1 + bits + stop + (0 if parity is None else 1)
+        if config['uart_dir'] and self._file is None:
+            self._file = open(os.path.join(config['uart_dir'], 'uart%d.bin' % self._bus), 'wb')
+
+    def deinit(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def write(self, buf):
+        n = len(buf)
+        if self._file:
+            self._file.write(bytes(buf))
+        counters['uart_bytes'] += n
+        counters['uart_writes'] += 1
+        if config['uart_realtime']:
+            _time.sleep(n * self._bits_per_byte / float(self._baud))
+        return n
+
+    def any(self):
+        return 0
+
+    def read(self, nbytes=None):
+        return None
+
+    def readinto(self, buf, nbytes=None):
+        return None
+
+    def readline(self):
+        return None
+
+
+class USB_VCP:
+    def __init__(self, id=0):
+        pass
+
+    def isconnected(self):
+        return True
+
+    def any(self):
+        return False
+
+    def write(self, buf):
+        os.write(1, bytes(buf))
+        return len(buf)
+
+    def read(self, nbytes=None):
+        return None
+
+    def send(self, data, timeout=5000):
+        return self.write(data)
+
+
+def millis():
+    return int(_time.monotonic() * 1000)
+
+
+def micros():
+    return int(_time.monotonic() * 1000000)
+
+
+def elapsed_millis(start):
+    return millis() - start
+
+
+def elapsed_micros(start):
+    return micros() - start
+
+
+def delay(ms):
+    _time.sleep(ms / 1000.0)
+
+
+def udelay(us):
+    _time.sleep(us / 1000000.0)
+
+
+def freq():
+    return (480000000, 240000000, 120000000, 120000000)
@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+# OpenMV `sensor` 模块的主机替身：从帧源回放录制的画面
+#
+# 帧源由 host.runtime 注入（任意产生 HxWx3 uint8 RGB 数组的迭代器）。
+# 帧源耗尽时 snapshot() 抛出 ReplayFinished，用于结束 main.py 的死循环。
+# 翻转/镜像只记录不执行：录制的画面已经是传感器输出方向。
+#
+# config['capture_fps'] > 0 时按该帧率模拟传感器的曝光与传输（帧源中的每一帧对应一个采集周期）：
+#   1 个帧缓冲    —— snapshot() 阻塞一个完整的采集周期；
+#   2~3 个帧缓冲  —— 后台连续采集，snapshot() 返回最新帧，来不及取的帧被覆盖（计入 dropped_frames）；
+#   4 个及以上    —— 视频FIFO，按顺序返回，队列满时丢弃最旧的帧。
+import time
+import image
+from image import GRAYSCALE, RGB565, JPEG
+
+QQVGA = 0
+HQVGA = 1
+QVGA = 2
+VGA = 3
+B64X64 = 4
+B128X128 = 5
+B240X240 = 6
+
+_FRAMESIZES = {
+    QQVGA: (160, 120),
+    HQVGA: (240, 160),
+    QVGA: (320, 240),
+    VGA: (640, 480),
+    B64X64: (64, 64),
+    B128X128: (128, 128),
+    B240X240: (240, 240),
+}
+
+
+class ReplayFinished(BaseException):
+    """帧源耗尽。继承BaseException，避免被脚本里的 `except Exception` 吞掉"""
+
+
+_state = {
+    'pixformat': RGB565,
+    'framesize': QVGA,
+    'windowing': None,
+    'vflip': False,
+    'hmirror': False,
+    'auto_exposure': True,
+    'auto_gain': True,
+    'auto_whitebal': True,
+    'exposure_us': 10000,
+    'gain_db': 0.0,
+    'framebuffers': 1,
+}
+
+# 统计：快照次数、对传感器寄存器的写入次数、被覆盖/丢弃的采集帧、等待采集的时间
+counters = {'snapshots': 0, 'register_writes': 0, 'dropped_frames': 0, 'capture_wait_ms': 0}
+
+# 仿真参数（由 host.runtime.install 设置）
+config = {'capture_fps': 0}
+
+# 后台采集时间线：_cam_t0 为第0帧开始采集的时刻，_cam_next 为下一个要交付的帧序号
+_cam_t0 = None
+_cam_next = 0
+
+_source = None
+_on_snapshot = None
+
+
+def set_source(frames, on_snapshot=None):
+    """主机专用：设置帧源与每次快照前的回调"""
+    global _source, _on_snapshot, _cam_t0, _cam_next
+    _source = iter(frames)
+    _on_snapshot = on_snapshot
+    _cam_t0 = None
+    _cam_next = 0
+
+
+def _write(key, value):
+    counters['register_writes'] += 1
+    _state[key] = value
+
+
+def _fit(arr):
+    # 把录制帧调整到当前分辨率/窗口（最近邻）
+    w, h = _state['windowing'][2:] if _state['windowing'] else _FRAMESIZES[_state['framesize']]
+    img = image.Image(arr, _framebuffer=True)
+    if (img.width(), img.height()) != (w, h):
+        img.crop(x_scale=w / float(img.width()), y_scale=h / float(img.height()))
+        if (img.width(), img.height()) != (w, h):
+            img.crop(roi=(0, 0, w, h))
+    if _state['pixformat'] == GRAYSCALE and img.is_rgb565():
+        img.to_grayscale()
+    elif _state['pixformat'] == RGB565 and img.is_grayscale():
+        img.to_rgb565()
+    return img
+
+
+def _next_frame():
+    if _source is None:
+        raise ReplayFinished()
+    try:
+        arr = next(_source)
+    except StopIteration:
+        if _on_snapshot:
+            _on_snapshot(None)
+        raise ReplayFinished()
+    return arr
+
+
+def reset():
+    _state['windowing'] = None
+    _write('auto_exposure', True)
+    _write('auto_gain', True)
+
+
+def sleep(enable):
+    _write('sleep', enable)
+
+
+def set_pixformat(fmt):
+    _write('pixformat', fmt)
+
+
+def set_framesize(size):
+    _write('framesize', size)
+
+
+def set_windowing(roi):
+    if len(roi) == 2:
+        fw, fh = _FRAMESIZES[_state['framesize']]
+        roi = ((fw - roi[0]) // 2, (fh - roi[1]) // 2, roi[0], roi[1])
+    _write('windowing', tuple(roi))
+
+
+def get_windowing():
+    w, h = _FRAMESIZES[_state['framesize']]
+    return _state['windowing'] or (0, 0, w, h)
+
+
+def set_vflip(enable):
+    _write('vflip', bool(enable))
+
+
+def set_hmirror(enable):
+    _write('hmirror', bool(enable))
+
+
+def get_vflip():
+    return _state['vflip']
+
+
+def get_hmirror():
+    return _state['hmirror']
+
+
+def set_auto_exposure(enable, exposure_us=None):
+    _write('auto_exposure', bool(enable))
+    if exposure_us is not None:
+        _state['exposure_us'] = int(exposure_us)
+
+
+def set_auto_gain(enable, gain_db=None, gain_db_ceiling=None):
+    _write('auto_gain', bool(enable))
+    if gain_db is not None:
+        _state['gain_db'] = float(gain_db)
+
+
+def set_auto_whitebal(enable, rgb_gain_db=None):
+    _write('auto_whitebal', bool(enable))
+
+
+def get_exposure_us():
+    return _state['exposure_us']
+
+
+def get_gain_db():
+    return _state['gain_db']
+
+
+def set_framebuffers(count):
+    _write('framebuffers', int(count))
+
+
+def get_framebuffers():
+    return _state['framebuffers']
+
+
+def width():
+    return get_windowing()[2]
+
+
+def height():
+    return get_windowing()[3]
+
+
+def get_pixformat():
+    return _state['pixformat']
+
+
+def get_framesize():
+    return _state['framesize']
+
+
+def skip_frames(n=None, time=None):
+    # 回放时不丢弃录制帧，只记录调用
+    return None
+
+
+def _wait_capture():
+    """按采集时间线等待帧就绪，返回需要从帧源中丢弃的帧数"""
+    global _cam_t0, _cam_next
+    period = 1.0 / config['capture_fps']
+    now = time.perf_counter()
+    buffers = _state['framebuffers']
+    if buffers <= 1 or _cam_t0 is None:
+        # 单缓冲（或首帧）：从现在开始采集一整帧
+        time.sleep(period)
+        counters['capture_wait_ms'] += int(period * 1000)
+        _cam_t0 = time.perf_counter() - period
+        _cam_next = 1
+        return 0
+    ready = int((now - _cam_t0) / period)  # 已完成采集的帧数
+    if ready <= _cam_next:
+        wait = _cam_t0 + (_cam_next + 1) * period - now
+        time.sleep(wait)
+        counters['capture_wait_ms'] += int(wait * 1000)
+        ready = _cam_next + 1
+    if buffers <= 3:
+        drop = ready - 1 - _cam_next   # 只交付最新帧
+        _cam_next = ready
+    else:
+        drop = max(0, ready - _cam_next - buffers)  # 队列溢出时丢弃最旧的帧
+        _cam_next += drop + 1
+    return drop
+
+
+def snapshot():
+    if config['capture_fps'] > 0:
+        for _ in range(_wait_capture()):
+            _next_frame()
+            counters['dropped_frames'] += 1
+    arr = _next_frame()
+    if _on_snapshot:
+        _on_snapshot(counters['snapshots'])
+    img = _fit(arr)
+    counters['snapshots'] += 1
+    return img
@@ -0,0 +1,3 @@
+# -*- coding: utf-8 -*-
+# ulab 的主机替身：`from ulab import numpy as np` 得到 NumPy（补上 ulab 特有的名字）
+from . import numpy  # noqa: F401
@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+# ulab.numpy 的替身：NumPy 加上 ulab 的 dtype 别名（np.float 在 NumPy 中已移除）
+import numpy as _np
+from numpy import *  # noqa: F401,F403
+
+float = _np.float64
@@ -0,0 +1,10 @@
+# -*- coding: utf-8 -*-
+# MicroPython `uos` 的主机替身：直接转到 os
+from os import *  # noqa: F401,F403
+from os import stat, listdir, remove, rename, mkdir, getcwd, chdir, sync  # noqa: F401
+
+
+def ilistdir(path='.'):
+    for name in listdir(path):
+        st = stat(path + '/' + name)
+        yield (name, 0x4000 if (st.st_mode & 0o170000) == 0o040000 else 0x8000, 0, st.st_size)
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+# 主机端帧源：读取录制帧或生成合成画面
+#
+# 支持的输入：
+#   目录  —— 按文件名排序的 .npy / .ppm / .pgm 单帧
+#   .npy  —— 形如 (N, H, W, 3) 的帧堆叠，或单帧
+#   .ppm / .pgm —— 单帧
+#   录制目录 —— 设备端 recorder.py 写出的 .rec 槽位文件（最新会话，见 host/recording.py）
+import math
+import os
+import numpy as np
+
+FRAME_EXTS = ('.npy', '.ppm', '.pgm')
+
+
+def list_frames(path):
+    return sorted(os.path.join(path, n) for n in os.listdir(path)
+                  if n.lower().endswith(FRAME_EXTS))
+
+
+def iter_frames(path, loop=1):
+    """逐帧产生 uint8 数组；loop>1 时重复播放"""
+    from image import load_array
+    from host import recording
+    for _ in range(max(1, loop)):
+        if recording.is_recording(path):
+            for frame in recording.iter_frames(path):
+                yield frame
+        elif os.path.isdir(path):
+            for name in list_frames(path):
+                yield load_array(name)
+        else:
+            arr = load_array(path)
+            if arr.ndim == 4:
+                for frame in arr:
+                    yield frame
+            else:
+                yield arr
+
+
+def synthetic_scene(index, size=(240, 160), seed=0, still=0):
+    """合成一帧：浅色台面上的一条肤色手臂，缓慢平移/旋转。
+
+    still>0 时每 still 帧才更新一次姿态，用于模拟静止场景。
+    返回 (frame, truth)，truth 为手臂两端点（近端在上/左）。
+    """
+    w, h = size
+    rng = np.random.default_rng(seed * 100003 + index)
+    t = (index // still * still if still else index) / 15.0
+    cx = w / 2.0 + 0.15 * w * math.sin(0.4 * t)
+    cy = h / 2.0 + 0.08 * h * math.cos(0.3 * t)
+    angle = math.radians(80 + 15 * math.sin(0.25 * t))
+    half = 0.36 * h + 0.05 * h * math.sin(0.2 * t)
+    dx, dy = math.cos(angle) * half, math.sin(angle) * half
+    p0 = (cx - dx, cy - dy)
+    p1 = (cx + dx, cy + dy)
+
+    frame = np.empty((h, w, 3), dtype=np.float32)
+    frame[...] = (230, 235, 245)
+    ys, xs = np.mgrid[0:h, 0:w].astype(np.float32)
+    # 点到线段距离
+    vx, vy = p1[0] - p0[0], p1[1] - p0[1]
+    u = np.clip(((xs - p0[0]) * vx + (ys - p0[1]) * vy) / (vx * vx + vy * vy), 0, 1)
+    dist = np.hypot(xs - (p0[0] + u * vx), ys - (p0[1] + u * vy))
+    radius = 0.09 * h
+    shade = np.clip(1.0 - (dist / radius) ** 2 * 0.1, 0, 1)[..., None]
+    arm = np.array((200, 150, 130), dtype=np.float32) * shade
+    inside = (dist <= radius)[..., None]
+    frame = np.where(inside, arm, frame)
+    frame += rng.normal(0, 4, frame.shape)
+    frame = np.clip(frame, 0, 255).astype(np.uint8)
+
+    if p0[1] > p1[1]:
+        p0, p1 = p1, p0
+    truth = {'proximal_point': (int(p0[0]), int(p0[1])),
+             'distal_point': (int(p1[0]), int(p1[1]))}
+    return frame, truth
+
+
+def synthetic_frames(count, size=(240, 160), seed=0, still=0):
+    for i in range(count):
+        yield synthetic_scene(i, size, seed, still)[0]
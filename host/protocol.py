@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+# 主机端串口协议解码器，与 openmv_project/comm.py 的编码对应
+#
+# 支持两种消息：
+#   单点包 0xAA —— 10字节：头 | seq | 穴位ID(3字节ASCII) | x/y 12位打包(3字节) | 压力 | CRC
+#   批量帧 0xAB —— 头 | seq | len(2) | 表标签(2) | 时间戳ms(4) | N × (序号 | x/y(3) | 压力) | CRC
+#   文本   0xAC —— 头 | 类型(1=性能汇总, 2=日志) | 长度 | UTF-8 文本 | CRC
+# CRC 均为 CRC-8（多项式0x07），覆盖除CRC本身外的全部字节。
+# 校验失败时丢弃一个字节重新同步。
+# 批量帧的表标签（穴位ID的 CRC-16）与本地穴位表不一致时序号无法对应，帧中穴位的ID记为None
+# 并计入 table_errors。
+# 设备端开启死区模式时只发送有变化的穴位，StreamDecoder.latest 保存每个穴位的最新值。
+#
+# 用法（在仓库根目录）：
+#   python -m host.protocol uart3.bin
+#   python -m host.protocol uart3.bin --json
+import argparse
+import json
+import os
+import sys
+
+from host import runtime
+
+POINT_HEADER = 0xAA
+POINT_LEN = 10
+FRAME_HEADER = 0xAB
+FRAME_HEADER_LEN = 10
+FRAME_RECORD_LEN = 5
+TEXT_HEADER = 0xAC
+TEXT_KINDS = {1: 'profile', 2: 'log'}
+
+
+def _make_crc_table():
+    table = []
+    for i in range(256):
+        crc = i
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x07) if crc & 0x80 else (crc << 1)
+            crc &= 0xFF
+        table.append(crc)
+    return table
+
+
+CRC8_TABLE = _make_crc_table()
+
+
+def crc8(data):
+    crc = 0
+    for b in data:
+        crc = CRC8_TABLE[crc ^ b]
+    return crc
+
+
+def table_tag(ids):
+    """与 comm.table_tag 相同：按序号顺序对各ID（ASCII，以0结尾）计算 CRC-16/CCITT"""
+    crc = 0xFFFF
+    for acu_id in ids:
+        for b in acu_id.encode() + b'\0':
+            crc ^= b << 8
+            for _ in range(8):
+                crc = ((crc << 1) ^ 0x1021) if crc & 0x8000 else (crc << 1)
+                crc &= 0xFFFF
+    return crc
+
+
+def acu_ids():
+    """批量帧中的穴位序号 -> 穴位ID（与设备端相同的排序；存在编译穴位表时以表为准）"""
+    if runtime.PROJECT_DIR not in sys.path:
+        sys.path.append(runtime.PROJECT_DIR)
+    from config import ACU_DB, ACUPOINT_SETTINGS
+    from acudb import AcuTable
+    path = os.path.join(runtime.REPO_DIR, ACUPOINT_SETTINGS['table'])
+    if ACUPOINT_SETTINGS['table'] and os.path.exists(path):
+        return sorted(AcuTable.load(path).ids)
+    return sorted(ACU_DB)
+
+
+def _unpack_xy(b0, b1, b2):
+    return (b0 << 4) | (b1 >> 4), ((b1 & 0xF) << 8) | b2
+
+
+class StreamDecoder:
+    """增量解码：feed() 可以接收任意切分的字节流"""
+
+    def __init__(self, ids=None):
+        self.ids = ids if ids is not None else acu_ids()
+        self.table_tag = table_tag(self.ids)
+        self.buf = bytearray()
+        self.crc_errors = 0
+        self.table_errors = 0  # 表标签与本地穴位表不一致的批量帧数
+        self.skipped = 0
+        self.latest = {}  # 穴位ID -> 最近一次收到的 {x_mm, y_mm, pressure, seq}
+
+    def feed(self, data):
+        self.buf.extend(data)
+        out = []
+        buf = self.buf
+        i = 0
+        while i < len(buf):
+            head = buf[i]
+            if head == POINT_HEADER:
+                if len(buf) - i < POINT_LEN:
+                    break
+                pkt = buf[i:i + POINT_LEN]
+                if crc8(pkt[:-1]) != pkt[-1]:
+                    self.crc_errors += 1
+                    i += 1
+                    continue
+                x, y = _unpack_xy(pkt[5], pkt[6], pkt[7])
+                msg = {'type': 'point', 'seq': pkt[1], 'acu_id': bytes(pkt[2:5]).decode('ascii', 'replace'),
+                       'x_mm': x, 'y_mm': y, 'pressure': pkt[8]}
+                self.latest[msg['acu_id']] = {'x_mm': x, 'y_mm': y, 'pressure': pkt[8], 'seq': pkt[1]}
+                out.append(msg)
+                i += POINT_LEN
+            elif head == FRAME_HEADER:
+                if len(buf) - i < FRAME_HEADER_LEN:
+                    break
+                body = (buf[i + 2] << 8) | buf[i + 3]
+                total = 4 + body + 1
+                if body < FRAME_HEADER_LEN - 4 or (body - FRAME_HEADER_LEN + 4) % FRAME_RECORD_LEN:
+                    self.crc_errors += 1
+                    i += 1
+                    continue
+                if len(buf) - i < total:
+                    break
+                pkt = buf[i:i + total]
+                if crc8(pkt[:-1]) != pkt[-1]:
+                    self.crc_errors += 1
+                    i += 1
+                    continue
+                tag = (pkt[4] << 8) | pkt[5]
+                table_ok = tag == self.table_tag
+                if not table_ok:
+                    self.table_errors += 1
+                ts = (pkt[6] << 24) | (pkt[7] << 16) | (pkt[8] << 8) | pkt[9]
+                points = []
+                for k in range(FRAME_HEADER_LEN, total - 1, FRAME_RECORD_LEN):
+                    idx = pkt[k]
+                    x, y = _unpack_xy(pkt[k + 1], pkt[k + 2], pkt[k + 3])
+                    acu_id = self.ids[idx] if table_ok and idx < len(self.ids) else None
+                    points.append({'index': idx, 'acu_id': acu_id,
+                                   'x_mm': x, 'y_mm': y, 'pressure': pkt[k + 4]})
+                    if acu_id is not None:
+                        self.latest[acu_id] = {'x_mm': x, 'y_mm': y, 'pressure': pkt[k + 4], 'seq': pkt[1]}
+                out.append({'type': 'frame', 'seq': pkt[1], 'timestamp_ms': ts, 'table_tag': tag,
+                            'table_ok': table_ok, 'points': points})
+                i += total
+            elif head == TEXT_HEADER:
+                if len(buf) - i < 3:
+                    break
+                total = 3 + buf[i + 2] + 1
+                if buf[i + 1] not in TEXT_KINDS:
+                    self.crc_errors += 1
+                    i += 1
+                    continue
+                if len(buf) - i < total:
+                    break
+                pkt = buf[i:i + total]
+                if crc8(pkt[:-1]) != pkt[-1]:
+                    self.crc_errors += 1
+                    i += 1
+                    continue
+                out.append({'type': 'text', 'kind': TEXT_KINDS[pkt[1]],
+                            'text': bytes(pkt[3:-1]).decode('utf-8', 'replace')})
+                i += total
+            else:
+                self.skipped += 1
+                i += 1
+        del buf[:i]
+        return out
+
+
+def decode(data, ids=None):
+    """一次性解码完整字节串，返回消息列表"""
+    return StreamDecoder(ids).feed(data)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='解码 ProtocolHandler 的串口输出')
+    parser.add_argument('path', help='UART 输出文件（例如 host.replay --uart-dir 生成的 uart3.bin）')
+    parser.add_argument('--json', action='store_true', help='逐行输出JSON')
+    args = parser.parse_args(argv)
+
+    with open(args.path, 'rb') as f:
+        data = f.read()
+    decoder = StreamDecoder()
+    messages = decoder.feed(data)
+    for msg in messages:
+        if args.json:
+            print(json.dumps(msg, ensure_ascii=False))
+        elif msg['type'] == 'text':
+            sys.stdout.write('[%s] %s' % (msg['kind'], msg['text']))
+        elif msg['type'] == 'point':
+            print('#%03d %s x=%dmm y=%dmm p=%d' % (msg['seq'], msg['acu_id'], msg['x_mm'], msg['y_mm'], msg['pressure']))
+        else:
+            pts = ' '.join('%s(%d,%d,%d)' % (p['acu_id'], p['x_mm'], p['y_mm'], p['pressure']) for p in msg['points'])
+            print('#%03d t=%dms %s' % (msg['seq'], msg['timestamp_ms'], pts))
+    print('消息: %d  字节: %d  CRC错误: %d  跳过字节: %d' % (
+        len(messages), len(data), decoder.crc_errors, decoder.skipped), file=sys.stderr)
+    if decoder.table_errors:
+        print('穴位表不一致: %d 个批量帧的表标签与本地穴位表（0x%04X）不同，序号无法对应' % (
+            decoder.table_errors, decoder.table_tag), file=sys.stderr)
+    return 1 if decoder.crc_errors or decoder.table_errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
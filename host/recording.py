@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+# 读取设备端 recorder.py 录制的会话，并可回放进 main.py 的处理流水线
+#
+# 用法（在仓库根目录）：
+#   python -m host.recording rec/                       # 列出会话
+#   python -m host.recording rec/ --show                # 逐帧输出最新会话的检测结果与耗时
+#   python -m host.recording rec/ --session 3 --replay  # 回放指定会话（同 host.replay 的报告）
+#   python -m host.recording rec/ --export s3.npy       # 导出为 (N, H, W, 3) 帧堆叠
+# host.replay --frames 也可以直接指向录制目录（默认最新会话）。
+# 灰度录制回放时三个通道相同；JPEG 录制需要 Pillow 解码。
+import argparse
+import io
+import json
+import os
+import struct
+import sys
+
+import numpy as np
+
+from host import runtime
+
+MAGIC = b'RFRM'
+VERSION = 1
+HEADER_FMT = '<4sBBIIIHHHI'
+HEADER_LEN = struct.calcsize(HEADER_FMT)
+FMT_JPEG = 0
+FMT_GRAY = 1
+FMT_RGB565 = 2
+FORMAT_NAMES = {FMT_JPEG: 'jpeg', FMT_GRAY: 'gray', FMT_RGB565: 'rgb565'}
+
+
+def is_recording(path):
+    return os.path.isdir(path) and any(n.endswith('.rec') for n in os.listdir(path))
+
+
+def read_header(path):
+    with open(path, 'rb') as f:
+        data = f.read(HEADER_LEN)
+    if len(data) < HEADER_LEN:
+        raise ValueError('truncated record: %s' % path)
+    magic, version, fmt, session, seq, ts, w, h, meta_len, payload_len = struct.unpack(HEADER_FMT, data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError('bad record: %s' % path)
+    return {'path': path, 'format': fmt, 'session': session, 'seq': seq, 'timestamp_ms': ts,
+            'width': w, 'height': h, 'meta_len': meta_len, 'payload_len': payload_len}
+
+
+def _decode(fmt, payload, w, h):
+    if fmt == FMT_GRAY:
+        g = np.frombuffer(payload, dtype=np.uint8).reshape(h, w)
+        return np.repeat(g[..., None], 3, axis=2)
+    if fmt == FMT_RGB565:
+        v = np.frombuffer(payload, dtype='<u2').reshape(h, w)
+        r = ((v >> 11) & 0x1F) << 3
+        g = ((v >> 5) & 0x3F) << 2
+        b = (v & 0x1F) << 3
+        return np.stack([r, g, b], axis=-1).astype(np.uint8)
+    try:
+        from PIL import Image
+    except ImportError:
+        raise RuntimeError('解码 JPEG 录制需要 Pillow（pip install pillow）')
+    return np.asarray(Image.open(io.BytesIO(bytes(payload))).convert('RGB'), dtype=np.uint8)
+
+
+def read_record(path):
+    """读取单帧，返回 (头部字典, 元数据字典, HxWx3 uint8 帧)；帧按录制时的（降采样）尺寸返回"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    header = read_header(path)
+    end = HEADER_LEN + header['meta_len'] + header['payload_len']
+    if len(data) < end:
+        raise ValueError('truncated record: %s' % path)
+    meta = json.loads(data[HEADER_LEN:HEADER_LEN + header['meta_len']].decode('utf-8'))
+    frame = _decode(header['format'], data[HEADER_LEN + header['meta_len']:end],
+                    header['width'], header['height'])
+    return header, meta, frame
+
+
+def sessions(path):
+    """{会话号: [头部, ...]}，每个会话内按帧序号排序；损坏或未写完的槽位跳过"""
+    out = {}
+    for name in sorted(os.listdir(path)):
+        if not name.endswith('.rec'):
+            continue
+        try:
+            header = read_header(os.path.join(path, name))
+        except ValueError:
+            continue
+        if os.path.getsize(header['path']) < HEADER_LEN + header['meta_len'] + header['payload_len']:
+            continue
+        out.setdefault(header['session'], []).append(header)
+    for headers in out.values():
+        headers.sort(key=lambda h: h['seq'])
+    return out
+
+
+def iter_session(path, session=None):
+    """按帧序号产生 (头部, 元数据, 帧)；session 为None时取最新会话"""
+    all_sessions = sessions(path)
+    if not all_sessions:
+        return
+    if session is None:
+        session = max(all_sessions)
+    for header in all_sessions.get(session, []):
+        yield read_record(header['path'])
+
+
+def iter_frames(path, session=None):
+    """只产生帧数组，供 host.replay 使用"""
+    for _, _, frame in iter_session(path, session):
+        yield frame
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='读取 / 回放设备录制的会话')
+    parser.add_argument('path', help='录制目录（设备上 RECORD_SETTINGS["dir"] 的拷贝）')
+    parser.add_argument('--session', type=int, help='会话号（默认最新）')
+    parser.add_argument('--show', action='store_true', help='逐帧输出检测结果与分阶段耗时')
+    parser.add_argument('--export', help='导出帧堆叠到 .npy 文件')
+    parser.add_argument('--replay', action='store_true', help='把会话回放进 main.py')
+    parser.add_argument('--log', help='回放时脚本 stdout 输出文件')
+    args = parser.parse_args(argv)
+
+    all_sessions = sessions(args.path)
+    if not all_sessions:
+        print('没有找到录制帧: %s' % args.path, file=sys.stderr)
+        return 1
+    session = args.session if args.session is not None else max(all_sessions)
+    if session not in all_sessions:
+        print('会话 %d 不存在' % session, file=sys.stderr)
+        return 1
+
+    if not (args.show or args.export or args.replay):
+        for s in sorted(all_sessions):
+            headers = all_sessions[s]
+            print('会话 %3d  %4d 帧  seq %d..%d  %s %dx%d' % (
+                s, len(headers), headers[0]['seq'], headers[-1]['seq'],
+                FORMAT_NAMES.get(headers[0]['format'], '?'), headers[0]['width'], headers[0]['height']))
+        return 0
+
+    if args.show:
+        for header, meta, _ in iter_session(args.path, session):
+            anatomy = meta['anatomy']
+            arm = '%s -> %s' % (tuple(anatomy['proximal_point']), tuple(anatomy['distal_point'])) if anatomy else '-'
+            points = len(meta['points']) if meta['points'] else 0
+            timings = ' '.join('%s:%.1f' % (k, v / 1000.0) for k, v in sorted(meta['timings'].items()))
+            print('#%05d t=%dms arm=%s points=%d %s' % (header['seq'], header['timestamp_ms'], arm, points, timings))
+
+    if args.export:
+        frames = list(iter_frames(args.path, session))
+        np.save(args.export, np.stack(frames))
+        print('导出 %d 帧 -> %s' % (len(frames), args.export))
+
+    if args.replay:
+        from host import replay
+        runtime.install()
+        report = replay.run(iter_frames(args.path, session), log=args.log)
+        print(replay.format_report(report))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
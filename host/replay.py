@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+# 帧回放基准：把录制帧送进真实的 main.py 主循环，统计每帧延迟、FPS 与内存分配
+#
+# 用法（在仓库根目录）：
+#   python -m host.replay --synthetic 300
+#   python -m host.replay --frames recordings/session1 --json report.json
+#   python -m host.replay --synthetic 300 --clock-fps 15 --detect-interval 2 --json base.json
+#   python -m host.replay --synthetic 300 --clock-fps 15 --detect-interval 2 --baseline base.json --tolerance 0.2
+#
+# 主机上的绝对耗时与设备不同，但同一台机器上前后两次的相对变化可以用来发现性能回退。
+# main.py 的帧调度器按实测耗时决定检测间隔（未启用调度器时按 clock.fps() 跳帧），
+# 做回退比较时应使用 --detect-interval（及 --clock-fps）固定它们。
+# 默认不读写快速启动状态文件（每次都是冷启动），--boot-state 指定文件时按设备行为读写。
+# --capture-fps 按给定帧率模拟传感器采集：单缓冲时每帧阻塞一个采集周期，
+# 多缓冲时采集与分析重叠，来不及取出的帧计入 dropped_frames。
+# 一"帧"定义为相邻两次 sensor.snapshot() 之间的时间，包含被跳过的帧。
+# 内存分配给出两项：
+#   image_alloc_kb —— 脚本在堆上新建的图像缓冲（copy() 等），对应设备上的堆碎片来源；
+#   host_alloc_peak_kb —— 主机进程的 tracemalloc 峰值，含替身自身开销，只宜做相对比较。
+import argparse
+import contextlib
+import json
+import os
+import runpy
+import sys
+import time
+import tracemalloc
+
+from host import runtime
+
+
+def _percentile(values, p):
+    if not values:
+        return 0.0
+    s = sorted(values)
+    k = min(len(s) - 1, max(0, int(round(p / 100.0 * (len(s) - 1)))))
+    return s[k]
+
+
+def _summary(values):
+    if not values:
+        return {'min': 0.0, 'mean': 0.0, 'p50': 0.0, 'p95': 0.0, 'max': 0.0}
+    return {
+        'min': round(min(values), 3),
+        'mean': round(sum(values) / len(values), 3),
+        'p50': round(_percentile(values, 50), 3),
+        'p95': round(_percentile(values, 95), 3),
+        'max': round(max(values), 3),
+    }
+
+
+class _FrameProbe:
+    """挂在 sensor.snapshot() 上，记录每帧的耗时与内存分配"""
+
+    def __init__(self, trace_alloc=True):
+        self.trace_alloc = trace_alloc
+        self.frames = []
+        self._t = None
+        self._mem = 0
+        self._img = 0
+
+    def __call__(self, index):
+        import image
+        now = time.perf_counter()
+        img = image.counters['image_alloc_bytes']
+        if self.trace_alloc:
+            cur, peak = tracemalloc.get_traced_memory()
+        else:
+            cur = peak = 0
+        if self._t is not None:
+            self.frames.append({
+                'frame': len(self.frames),
+                'latency_ms': round((now - self._t) * 1000.0, 3),
+                'image_alloc_kb': round((img - self._img) / 1024.0, 2),
+                'host_alloc_peak_kb': round(max(0, peak - self._mem) / 1024.0, 2),
+            })
+        if self.trace_alloc:
+            tracemalloc.reset_peak()
+            cur = tracemalloc.get_traced_memory()[0]
+        self._mem = cur
+        self._img = img
+        self._t = time.perf_counter()
+
+
+def run(frames, script=None, log=None, uart_dir=None, uart_realtime=False,
+        model_latency_ms=0.0, model_fixed=None, clock_fps=None, trace_alloc=True,
+        detect_interval=None, boot_state=None, capture_fps=0):
+    """回放 frames（uint8数组迭代器）并返回报告字典"""
+    if uart_dir:
+        os.makedirs(uart_dir, exist_ok=True)
+    runtime.install(uart_dir=uart_dir, uart_realtime=uart_realtime,
+                    model_latency_ms=model_latency_ms, model_fixed=model_fixed,
+                    clock_fps=clock_fps, capture_fps=capture_fps)
+    import sensor
+    if runtime.PROJECT_DIR not in sys.path:
+        sys.path.append(runtime.PROJECT_DIR)
+    import config
+    if detect_interval is not None:
+        config.SCHED_SETTINGS['fixed_interval'] = detect_interval
+    config.BOOT_SETTINGS['state_file'] = os.path.abspath(boot_state) if boot_state else ''
+
+    probe = _FrameProbe(trace_alloc)
+    sensor.set_source(frames, probe)
+    script = script or os.path.join(runtime.REPO_DIR, 'main.py')
+
+    cwd = os.getcwd()
+    os.chdir(os.path.dirname(os.path.abspath(script)))
+    out = open(log, 'w') if log else open(os.devnull, 'w')
+    if trace_alloc:
+        tracemalloc.start()
+    t0 = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(out):
+            runpy.run_path(script, run_name='__main__')
+    except sensor.ReplayFinished:
+        pass
+    finally:
+        elapsed = time.perf_counter() - t0
+        if trace_alloc:
+            tracemalloc.stop()
+        out.close()
+        os.chdir(cwd)
+
+    latencies = [f['latency_ms'] for f in probe.frames]
+    images = [f['image_alloc_kb'] for f in probe.frames]
+    peaks = [f['host_alloc_peak_kb'] for f in probe.frames]
+    report = {
+        'frames': len(probe.frames),
+        'elapsed_s': round(elapsed, 3),
+        'fps': round(len(probe.frames) / elapsed, 2) if elapsed > 0 else 0.0,
+        'latency_ms': _summary(latencies),
+        'image_alloc_kb': _summary(images),
+        'host_alloc_peak_kb': _summary(peaks),
+        'counters': runtime.counters(),
+        'per_frame': probe.frames,
+    }
+    return report
+
+
+def compare(report, baseline, tolerance):
+    """与基线比较，返回回退项列表（空列表表示通过）"""
+    failures = []
+    for key in ('mean', 'p95'):
+        old = baseline['latency_ms'][key]
+        new = report['latency_ms'][key]
+        if old > 0 and new > old * (1.0 + tolerance):
+            failures.append('latency_ms.%s: %.3f -> %.3f (+%.0f%%)' % (key, old, new, (new / old - 1) * 100))
+    old = baseline['image_alloc_kb']['mean']
+    new = report['image_alloc_kb']['mean']
+    if new > old * (1.0 + tolerance):
+        failures.append('image_alloc_kb.mean: %.2f -> %.2f' % (old, new))
+    return failures
+
+
+def format_report(report):
+    lat = report['latency_ms']
+    img = report['image_alloc_kb']
+    mem = report['host_alloc_peak_kb']
+    lines = [
+        '帧数: %d  总耗时: %.2fs  FPS: %.2f' % (report['frames'], report['elapsed_s'], report['fps']),
+        '每帧延迟(ms): min=%.2f mean=%.2f p50=%.2f p95=%.2f max=%.2f' % (
+            lat['min'], lat['mean'], lat['p50'], lat['p95'], lat['max']),
+        '每帧图像缓冲分配(KB): mean=%.1f max=%.1f' % (img['mean'], img['max']),
+        '每帧主机峰值分配(KB): mean=%.1f p95=%.1f max=%.1f' % (mem['mean'], mem['p95'], mem['max']),
+        '计数: ' + ', '.join('%s=%s' % kv for kv in sorted(report['counters'].items())),
+    ]
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='把录制帧回放进 main.py 并统计性能')
+    src = parser.add_mutually_exclusive_group(required=True)
+    src.add_argument('--frames', help='帧目录或 .npy/.ppm/.pgm 文件')
+    src.add_argument('--synthetic', type=int, metavar='N', help='生成 N 帧合成画面')
+    parser.add_argument('--loop', type=int, default=1, help='重复播放次数')
+    parser.add_argument('--still', type=int, default=0, help='合成画面每 K 帧才运动一次')
+    parser.add_argument('--script', help='被回放的脚本（默认 main.py）')
+    parser.add_argument('--log', help='脚本 stdout 输出文件（默认丢弃）')
+    parser.add_argument('--uart-dir', help='把 UART 输出写到该目录')
+    parser.add_argument('--uart-realtime', action='store_true', help='按波特率模拟串口发送耗时')
+    parser.add_argument('--model-latency-ms', type=float, default=0.0, help='模拟每次推理耗时')
+    parser.add_argument('--capture-fps', type=float, default=0,
+                        help='按该帧率模拟传感器采集（含多帧缓冲的流水线与丢帧）')
+    parser.add_argument('--clock-fps', type=float, help='固定 clock.fps() 的返回值，使跳帧可复现')
+    parser.add_argument('--detect-interval', type=int, help='固定帧调度器的检测间隔，使调度可复现')
+    parser.add_argument('--boot-state', help='快速启动状态文件（默认不读写，每次冷启动）')
+    parser.add_argument('--no-alloc', action='store_true', help='不跟踪内存分配（更接近真实耗时）')
+    parser.add_argument('--json', help='把完整报告写到该文件')
+    parser.add_argument('--baseline', help='与之前的报告比较')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='允许的相对回退幅度')
+    args = parser.parse_args(argv)
+
+    runtime.install()
+    from host import frames as frame_source
+    if args.synthetic:
+        frames = frame_source.synthetic_frames(args.synthetic, still=args.still)
+    else:
+        frames = frame_source.iter_frames(args.frames, loop=args.loop)
+
+    report = run(frames, script=args.script, log=args.log, uart_dir=args.uart_dir,
+                 uart_realtime=args.uart_realtime, model_latency_ms=args.model_latency_ms,
+                 clock_fps=args.clock_fps, trace_alloc=not args.no_alloc,
+                 detect_interval=args.detect_interval, boot_state=args.boot_state,
+                 capture_fps=args.capture_fps)
+    print(format_report(report))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=1)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        failures = compare(report, baseline, args.tolerance)
+        for line in failures:
+            print('性能回退: ' + line)
+        return 1 if failures else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
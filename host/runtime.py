@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+# 主机端仿真运行时
+#
+# install() 把 host/emu 放到 sys.path 最前面，使 `import sensor, image, pyb, ml, uos`
+# 以及 `from ulab import numpy` 得到基于NumPy的替身；同时给 CPython 的 time/gc
+# 补上 MicroPython 特有的函数（ticks_ms、clock、mem_free 等）。
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+HOST_DIR = os.path.dirname(os.path.abspath(__file__))
+EMU_DIR = os.path.join(HOST_DIR, 'emu')
+REPO_DIR = os.path.dirname(HOST_DIR)
+PROJECT_DIR = os.path.join(REPO_DIR, 'openmv_project')
+
+# 仿真堆大小（OpenMV H7 的 MicroPython 堆量级）
+HEAP_SIZE = 256 * 1024
+
+# 固定 clock.fps() 的返回值（None 表示按真实耗时计算），使自适应跳帧可复现
+_clock_fps = None
+
+
+class _Clock:
+    """time.clock() 的替身"""
+
+    def __init__(self):
+        self._t0 = None
+        self._ms = 0.0
+
+    def tick(self):
+        self._t0 = time.perf_counter()
+
+    def _elapsed(self):
+        if self._t0 is None:
+            return 0.0
+        return (time.perf_counter() - self._t0) * 1000.0
+
+    def avg(self):
+        return self._elapsed()
+
+    def fps(self):
+        if _clock_fps is not None:
+            return float(_clock_fps)
+        ms = self._elapsed()
+        return 1000.0 / ms if ms > 0 else 0.0
+
+
+def _ticks_ms():
+    return int(time.perf_counter() * 1000) & 0x3FFFFFFF
+
+
+def _ticks_us():
+    return int(time.perf_counter() * 1000000) & 0x3FFFFFFF
+
+
+def _ticks_diff(a, b):
+    d = (a - b) & 0x3FFFFFFF
+    return d - 0x40000000 if d & 0x20000000 else d
+
+
+def _ticks_add(a, delta):
+    return (a + delta) & 0x3FFFFFFF
+
+
+def _mem_alloc():
+    return tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+
+
+def _mem_free():
+    return max(0, HEAP_SIZE - _mem_alloc())
+
+
+def install(uart_dir=None, uart_realtime=False, model_latency_ms=0.0, model_fixed=None,
+            clock_fps=None, capture_fps=0):
+    """安装替身模块并配置仿真参数，可重复调用"""
+    global _clock_fps
+    _clock_fps = clock_fps
+    if EMU_DIR not in sys.path:
+        sys.path.insert(0, EMU_DIR)
+    if PROJECT_DIR not in sys.path:
+        sys.path.append(PROJECT_DIR)
+
+    time.ticks_ms = _ticks_ms
+    time.ticks_us = _ticks_us
+    time.ticks_cpu = _ticks_us
+    time.ticks_diff = _ticks_diff
+    time.ticks_add = _ticks_add
+    time.sleep_ms = lambda ms: time.sleep(ms / 1000.0)
+    time.sleep_us = lambda us: time.sleep(us / 1000000.0)
+    time.clock = _Clock
+    gc.mem_free = _mem_free
+    gc.mem_alloc = _mem_alloc
+    if not hasattr(gc, 'threshold'):
+        gc.threshold = lambda *args: None
+
+    import pyb
+    import ml
+    import sensor
+    sensor.config['capture_fps'] = capture_fps
+    pyb.config['uart_dir'] = uart_dir
+    pyb.config['uart_realtime'] = uart_realtime
+    ml.config['latency_ms'] = model_latency_ms
+    ml.config['fixed'] = model_fixed
+
+
+def counters():
+    """汇总各替身模块的计数器"""
+    import sensor
+    import image
+    import pyb
+    import ml
+    out = {}
+    for mod in (sensor, image, pyb, ml):
+        out.update(mod.counters)
+    return out
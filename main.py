@@ -4,9 +4,18 @@ sys.path.append("openmv_project")
 import config, vision, comm, safety, environment
 from config import *
 from vision import ArmAnalyzer
+from tracker import ArmTracker
 from comm import ProtocolHandler
 from safety import SafetyMonitor
 from environment import EnvAdapter
+from profiler import *
+from scheduler import FrameScheduler
+from framectx import FrameContext
+from overlay import overlay
+from logger import *
+from bootstate import BootStore, apply_sensor, settle_sensor
+from capture import FrameSource
+from recorder import SessionRecorder
 
 # ------------------ 初始化 ------------------
 sensor.reset()
@@ -14,36 +23,102 @@ sensor.set_pixformat(sensor.RGB565)
 sensor.set_framesize(sensor.HQVGA)
 sensor.set_vflip(CAM_SETTINGS['flip'])
 sensor.set_hmirror(CAM_SETTINGS['mirror'])
-sensor.skip_frames(2000)
+capture = FrameSource()  # 帧缓冲数量：流水线模式下采集与分析重叠
 
-# 模块初始化
-analyzer = ArmAnalyzer()
-comm = ProtocolHandler()
+# 快速启动：从上次保存的曝光/增益起步，按实测亮度判断稳定，代替固定等待
+boot_store = BootStore()
+boot = boot_store.load()
+if boot:
+    apply_sensor(boot)
+if BOOT_SETTINGS['fast_boot']:
+    settle_frames, settle_ms, settle_l = settle_sensor()
+    log.info("sensor settled: %d frames, %d ms, L=%s", settle_frames, settle_ms, settle_l)
+else:
+    sensor.skip_frames(2000)
+
+# 模块初始化（快速启动时标定值取自状态文件，模型延迟加载）
+analyzer = ArmAnalyzer(boot.cm_per_pixel if boot else None,
+                       BOOT_SETTINGS['fast_boot'] and BOOT_SETTINGS['lazy_model'])
+tracker = ArmTracker(analyzer)
+if boot and boot.endpoints:
+    tracker.restore(boot.endpoints, (sensor.width(), sensor.height()))
+comm = ProtocolHandler(analyzer.acu_table.ids)
 safety = SafetyMonitor()
 clock = time.clock()
 env_adapter = EnvAdapter()
+scheduler = FrameScheduler()
+frame_ctx = FrameContext()
+ctx = frame_ctx if STATS_SETTINGS['shared'] else None  # 每帧共享的统计上下文
+if LOG_SETTINGS['output'] == 'uart':
+    log.link = comm  # 日志作为协议文本消息发送
+recorder = SessionRecorder()
+if recorder.enabled:
+    profiler.enabled = True  # 录制每帧的分阶段耗时
 
 # 定义初始ROI
-roi = (80, 40, 160, 120)  # 仅处理图像中心区域
+roi = None  # 首次检测在整帧上进行，检测到手臂后收缩为跟踪ROI
+if boot and boot.roi:
+    roi = boot.roi  # 从上次手臂所在区域开始搜索
 
 # ------------------ 主循环 ------------------
 frame_counter = 0
 motion_alert_counter = 0  # 添加这一行，定义motion_alert_counter变量
+last_anatomy = None  # 调度器跳过检测的帧沿用（或外推）上次结果
+img = None
+anatomy = None
+points = None
 while True:
     clock.tick()
-    img = sensor.snapshot()
-    env_adapter.adjust_exposure(img)  # 新增行
+    # 为上一帧补上检测结果与耗时（图像在采集后已编码），文件分块写出
+    if recorder.enabled:
+        if img is not None:
+            recorder.record(anatomy, points, profiler.take_frame())
+        recorder.poll()
+    # 上一帧的叠加图元在下一次采集前统一绘制（覆盖所有提前 continue 的路径）
+    profiler.begin(STAGE_OVERLAY)
+    overlay.render(img)
+    profiler.end(STAGE_OVERLAY)
+    if SCHED_SETTINGS['enabled']:
+        scheduler.begin_frame()
+    elif capture.pipelined and capture.policy == 'fifo':
+        # FIFO 流水线：要跳过的帧只出队，不做任何分析
+        frame_counter = (frame_counter + 1) % PERF_SETTINGS['frame_skip']
+        if frame_counter != 0:
+            capture.skip()
+            img = None  # 出队后上一帧缓冲已失效
+            continue
+    profiler.begin(STAGE_SNAPSHOT)
+    img = capture.snapshot()
+    profiler.end(STAGE_SNAPSHOT)
+    anatomy = None
+    points = None
+    frame_ctx.begin(img)
+    overlay.begin_frame()
+    if analyzer.model_pending:
+        analyzer.maybe_load_model()  # 延迟加载：超过 model_after_frames 帧仍未加载时加载
+    frame_time = time.ticks_ms()  # 采集时间戳，随批量数据帧发送
+    recorder.capture(img, frame_time)  # 在检测（可能原地滤波整帧）之前编码要录制的画面
+    comm.poll()  # 帧间推进串口发送队列，不阻塞
+    profiler.maybe_report(comm if PROFILE_SETTINGS['output'] == 'uart' else None)
+    log.maybe_flush()  # 帧间分批输出日志缓冲
+    profiler.begin(STAGE_EXPOSURE)
+    env_adapter.adjust_exposure(img, ctx, roi if EXPOSURE_SETTINGS['use_roi'] else None)  # 新增行
+    profiler.end(STAGE_EXPOSURE)
 
-    # 性能优化：跳帧处理
-    frame_counter = (frame_counter + 1) % PERF_SETTINGS['frame_skip']
-    if frame_counter != 0:
-        continue
+    # 性能优化：跳帧处理（启用调度器时每帧都处理，只对检测降频；
+    # 流水线模式下 newest 策略处理不过来的帧由传感器覆盖，fifo 策略已在取帧前跳过）
+    if not SCHED_SETTINGS['enabled'] and not capture.pipelined:
+        frame_counter = (frame_counter + 1) % PERF_SETTINGS['frame_skip']
+        if frame_counter != 0:
+            continue
 
       # 安全监测
     try:  # 新增：添加异常处理
-       is_safe = safety.check_motion(img)
+       profiler.begin(STAGE_MOTION)
+       is_safe = safety.check_motion(img, ctx)
+       profiler.end(STAGE_MOTION)
        if not is_safe:
-           print("MOTION_ALERT detected!")  # 替代方案，而不是comm.send_alert
+           log.warn("MOTION_ALERT detected!")  # 替代方案，而不是comm.send_alert
            motion_alert_counter += 1
            if motion_alert_counter > 5:  # 如果连续5帧都检测到运动，重置安全监视器
                safety.reset()
@@ -52,51 +127,91 @@ while True:
        else:
            motion_alert_counter = 0  # 如果安全，重置计数器
     except Exception as e:
-       print(f"Error in motion detection: {e}")
+       log.error("Error in motion detection: %s", e)
        safety.reset()  # 出现异常时重置安全监视器
        continue
 
 
     # 视觉分析
-    print("Calling detect_anatomy with img:", img)
-    anatomy = analyzer.detect_anatomy(img)
-    print(f"Anatomy detection result: {anatomy}")
-    if not anatomy:
-        continue
+    if SCHED_SETTINGS['enabled'] and not scheduler.detect_due():
+        # 本帧不检测：跟踪器外推一步，否则沿用上次结果
+        anatomy = tracker.coast() if TRACK_SETTINGS['enabled'] else last_anatomy
+        if not anatomy:
+            continue
+    else:
+        log.debug("Calling detect_anatomy with img: %s", img)
+        search_roi = roi if ROI_SETTINGS['enabled'] else None
+        scheduler.begin_detect()
+        profiler.begin(STAGE_DETECT)
+        if TRACK_SETTINGS['enabled']:
+            anatomy = tracker.process(img, search_roi, ctx)  # 按需完整检测，其余帧跟踪
+        else:
+            anatomy = analyzer.detect_anatomy(img, search_roi, ctx)
+        profiler.end(STAGE_DETECT)
+        scheduler.end_detect()
+        last_anatomy = anatomy
+        log.debug("Anatomy detection result: %s", anatomy)
+        if not anatomy:
+            # 丢失目标时逐步扩大ROI，直到覆盖整帧
+            roi = analyzer.expand_roi(roi, img)
+            continue
 
     # 动态调整ROI基于手臂位置
     if 'contour' in anatomy:
-        contour = anatomy['contour']
-        roi = (
-            max(0, contour.x() - 20),
-            max(0, contour.y() - 20),
-            min(contour.w() + 40, 240),
-            min(contour.h() + 40, 160)
-        )
+        roi = analyzer.roi_from_anatomy(anatomy, img)
 
      # 确保ACU_DB被正确导入
     if 'ACU_DB' not in globals():
-       print("错误: ACU_DB未定义，尝试重新导入")
+       log.error("错误: ACU_DB未定义，尝试重新导入")
        from config import ACU_DB
 
        # 穴位定位与发送
-    print(f"可用穴位: {list(ACU_DB.keys())}")  # 调试输出
-    for acu_id in ACU_DB.keys():
-        pos = analyzer.calculate_acu_point(anatomy, acu_id)
-        if pos:
-            x_mm = int(pos[0] * analyzer.cm_per_pixel * 10)
-            y_mm = int(pos[1] * analyzer.cm_per_pixel * 10)
-            comm.send_acu_data(acu_id, x_mm, y_mm, ACU_DB[acu_id]['pressure'])
-
-            # 可视化
-            img.draw_cross(pos[0], pos[1], color=(0, 255, 0),size=5)
-            img.draw_string(pos[0], pos[1], f"{acu_id}: {ACU_DB[acu_id]['name']}")
-
-    # 性能显示
+    if log.on(LOG_DEBUG):
+        log.debug("可用穴位: %s", list(ACU_DB.keys()))  # 调试输出
+    # 先一次算出全部穴位，再统一发送，两个阶段分别计时
+    profiler.begin(STAGE_ACUPOINT)
+    points = analyzer.calculate_acu_points(anatomy)
+    profiler.end(STAGE_ACUPOINT)
+    if not points:
+        continue
+    ids = points['ids']
+    xs = points['x']
+    ys = points['y']
+
+    profiler.begin(STAGE_SEND)
+    if COMM_SETTINGS['batched']:
+        comm.begin_frame(frame_time)  # 本帧所有穴位合并为一个数据帧
+    x_mm = points['x_mm']
+    y_mm = points['y_mm']
+    pressure = points['pressure']
+    for i in range(len(ids)):
+        comm.send_acu_data(ids[i], int(x_mm[i]), int(y_mm[i]), pressure[i])
+    comm.end_frame()
+    comm.poll()
+    profiler.end(STAGE_SEND)
+
+    # 得到有效穴位后：加载延迟的模型，并定期保存快速启动状态
+    if analyzer.model_pending:
+        analyzer.maybe_load_model(True)
+    if boot_store.save_due():
+        boot_store.save(analyzer.cm_per_pixel, anatomy, roi, env_adapter.auto_gain)
+
+    # 可视化（无头模式或预览跳过的帧不生成任何图元）
     fps = clock.fps()
-    img.draw_string(5, 5, f"FPS:{fps:.1f} ", color=(255, 0, 0))
+    if overlay.active:
+        labels = points['labels']
+        for i in range(len(ids)):
+            x = int(xs[i])
+            y = int(ys[i])
+            overlay.cross(x, y, (0, 255, 0), 5)
+            overlay.text(x, y, labels[i])
 
-    # 动态调整帧率
+        # 性能显示
+        overlay.text(5, 5, f"FPS:{fps:.1f} ", (255, 0, 0))
+
+    # 动态调整帧率（仅在未启用调度器时）
+    if SCHED_SETTINGS['enabled']:
+        continue
     if fps < PERF_SETTINGS['target_fps'] * 0.8:
         PERF_SETTINGS['frame_skip'] = max(1, PERF_SETTINGS['frame_skip'] - 1)
     elif fps > PERF_SETTINGS['target_fps'] * 1.2:
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+# 穴位表：按肢体分段索引的列式穴位数据，可从 ACU_DB 构建，也可从编译好的二进制文件加载
+#
+# 二进制格式（小端序）：
+#   头部      '<4sBBHH'   魔数 b'ACDB' | 版本 | 分段数 | 穴位数 | 名称区字节数
+#   分段表    '<8sHH'     分段名(ASCII,补零) | 起始记录 | 记录数        × 分段数
+#   穴位记录  '<6sHhhHBBH' 穴位ID(ASCII,补零) | 相对位置×10000 | 横向偏移cm×100 |
+#                         纵向偏移cm×100 | 深度cm×100 | 压力 | 名称字节数 | 名称偏移  × 穴位数
+#   名称区    UTF-8 名称依次拼接
+# 同一分段的记录连续存放（分段内按穴位ID排序），检测到某一分段时只需计算该区间。
+# 文件由 host/build_acudb.py 从 config.py 中的定义生成。
+# 批量数据帧（comm.py）中穴位序号只占1字节，穴位表最多 MAX_IDS 个穴位。
+import struct
+from config import *
+
+MAGIC = b'ACDB'
+VERSION = 1
+HEADER_FMT = '<4sBBHH'
+SEGMENT_FMT = '<8sHH'
+RECORD_FMT = '<6sHhhHBBH'
+HEADER_LEN = struct.calcsize(HEADER_FMT)
+SEGMENT_LEN = struct.calcsize(SEGMENT_FMT)
+RECORD_LEN = struct.calcsize(RECORD_FMT)
+MAX_IDS = 256
+
+def _text(raw):
+    # 去掉定长字段末尾的补零
+    end = raw.find(b'\x00')
+    return (raw if end < 0 else raw[:end]).decode()
+
+class AcuTable:
+    def __init__(self):
+        self.ids = []
+        self.names = []
+        self.rel_pos = []     # 从近端到远端的相对位置（比例）
+        self.offset_x = []    # 横向偏移（cm，沿手臂法向）
+        self.offset_y = []    # 纵向偏移（cm，保留字段）
+        self.depth = []       # 深度（cm）
+        self.pressure = []
+        self.segments = {}    # 分段名 -> (起始下标, 数量)
+        self.source = None    # 'file' 或 'dict'
+
+    @classmethod
+    def from_dict(cls, db):
+        """从 ACU_DB 形式的字典构建，按 (分段, 穴位ID) 排序"""
+        table = cls()
+        default = ACUPOINT_SETTINGS['default_segment']
+        keys = sorted(db.keys(), key=lambda k: (db[k].get('segment', default), k))
+        for k in keys:
+            info = db[k]
+            segment = info.get('segment', default)
+            start, count = table.segments.get(segment, (len(table.ids), 0))
+            table.segments[segment] = (start, count + 1)
+            table.ids.append(k)
+            table.names.append(info['name'])
+            table.rel_pos.append(float(info.get('rel_pos', 0.5)))
+            table.offset_x.append(float(info['offset_cm'][0]))
+            table.offset_y.append(float(info['offset_cm'][1]))
+            table.depth.append(float(info['depth_cm']))
+            table.pressure.append(info['pressure'])
+        table.source = 'dict'
+        return table
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        magic, version, n_seg, n_rec, names_len = struct.unpack_from(HEADER_FMT, data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("bad acupoint table: %s" % path)
+        table = cls()
+        off = HEADER_LEN
+        for _ in range(n_seg):
+            name, start, count = struct.unpack_from(SEGMENT_FMT, data, off)
+            table.segments[_text(name)] = (start, count)
+            off += SEGMENT_LEN
+        names_off = off + n_rec * RECORD_LEN
+        for _ in range(n_rec):
+            acu_id, rel, ox, oy, depth, pressure, name_len, name_off = struct.unpack_from(RECORD_FMT, data, off)
+            table.ids.append(_text(acu_id))
+            table.rel_pos.append(rel / 10000)
+            table.offset_x.append(ox / 100)
+            table.offset_y.append(oy / 100)
+            table.depth.append(depth / 100)
+            table.pressure.append(pressure)
+            table.names.append(data[names_off + name_off:names_off + name_off + name_len].decode())
+            off += RECORD_LEN
+        table.source = 'file'
+        return table
+
+    def pack(self):
+        """编码为二进制格式（主机端构建工具使用）"""
+        names = bytearray()
+        records = bytearray()
+        for i in range(len(self.ids)):
+            name = self.names[i].encode()
+            records += struct.pack(RECORD_FMT, self.ids[i].encode(),
+                                   int(round(self.rel_pos[i] * 10000)),
+                                   int(round(self.offset_x[i] * 100)),
+                                   int(round(self.offset_y[i] * 100)),
+                                   int(round(self.depth[i] * 100)),
+                                   self.pressure[i], len(name), len(names))
+            names += name
+        out = bytearray(struct.pack(HEADER_FMT, MAGIC, VERSION, len(self.segments), len(self.ids), len(names)))
+        for segment in sorted(self.segments, key=lambda s: self.segments[s][0]):
+            start, count = self.segments[segment]
+            out += struct.pack(SEGMENT_FMT, segment.encode(), start, count)
+        return bytes(out + records + names)
+
+    def segment(self, name):
+        """返回分段的 (起始下标, 数量)；未知分段返回整表"""
+        return self.segments.get(name, (0, len(self.ids)))
+
+def load_acu_table():
+    """优先加载编译好的穴位表文件，不存在或损坏（截断、版本不符）时由 ACU_DB 构建"""
+    path = ACUPOINT_SETTINGS['table']
+    if path:
+        try:
+            return AcuTable.load(path)
+        except OSError:
+            pass
+        except (ValueError, struct.error) as e:
+            from logger import log  # 延迟导入：主机工具（build_acudb、protocol）直接使用本模块
+            log.warn("Invalid acupoint table %s, using ACU_DB: %s", path, e)
+    return AcuTable.from_dict(ACU_DB)
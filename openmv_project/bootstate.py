@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+# 快速启动：保存上次的曝光/增益、手臂端点、跟踪ROI与标定值，下次上电直接从这些值起步
+#
+# 状态文件格式（小端序，定长 STATE_LEN 字节）：
+#   '<4sBBIff4h4H'  魔数 b'BST1' | 版本 | 标志 | 曝光us | 增益dB | cm_per_pixel |
+#                   近端x,y 远端x,y | ROI x,y,w,h
+#   标志 bit0 自动增益开启，bit1 端点有效，bit2 ROI有效
+# 先写临时文件再改名，写入过程中断电不会留下半个文件；只有标定值、曝光/增益、端点或
+# ROI 相对上次保存的状态变化超过 BOOT_SETTINGS 中的阈值时才重写，避免反复擦写闪存；
+# calibrate_time.py 重新标定后删除状态文件，下次启动重新读取 calibration.json。
+import struct, time, sensor, uos
+from config import *
+
+MAGIC = b'BST1'
+VERSION = 1
+STATE_FMT = '<4sBBIff4h4H'
+STATE_LEN = struct.calcsize(STATE_FMT)
+FLAG_AUTO_GAIN = 0x01
+FLAG_ENDPOINTS = 0x02
+FLAG_ROI = 0x04
+
+class BootState:
+    def __init__(self):
+        self.exposure_us = 0
+        self.gain_db = 0.0
+        self.auto_gain = False
+        self.cm_per_pixel = 0.0
+        self.endpoints = None  # (近端x, 近端y, 远端x, 远端y)
+        self.roi = None
+
+    def pack(self):
+        flags = 0
+        if self.auto_gain:
+            flags |= FLAG_AUTO_GAIN
+        if self.endpoints:
+            flags |= FLAG_ENDPOINTS
+        if self.roi:
+            flags |= FLAG_ROI
+        e = self.endpoints or (0, 0, 0, 0)
+        r = self.roi or (0, 0, 0, 0)
+        return struct.pack(STATE_FMT, MAGIC, VERSION, flags, self.exposure_us, self.gain_db,
+                           self.cm_per_pixel, e[0], e[1], e[2], e[3], r[0], r[1], r[2], r[3])
+
+    @classmethod
+    def unpack(cls, data):
+        if len(data) != STATE_LEN:
+            raise ValueError("bad boot state length: %d" % len(data))
+        v = struct.unpack(STATE_FMT, data)
+        if v[0] != MAGIC or v[1] != VERSION:
+            raise ValueError("bad boot state header")
+        state = cls()
+        flags = v[2]
+        state.exposure_us = v[3]
+        state.gain_db = v[4]
+        state.cm_per_pixel = v[5]
+        state.auto_gain = bool(flags & FLAG_AUTO_GAIN)
+        if flags & FLAG_ENDPOINTS:
+            state.endpoints = v[6:10]
+        if flags & FLAG_ROI:
+            state.roi = v[10:14]
+        return state
+
+class BootStore:
+    def __init__(self, path=None):
+        self.path = BOOT_SETTINGS['state_file'] if path is None else path
+        self._saved = None  # 上次读到/写入的状态，变化不超过阈值时不重写闪存
+        self._last_save = time.ticks_ms()
+        self._interval = BOOT_SETTINGS['first_save_ms']  # 本次上电首次保存较早，之后按 save_ms
+        self.stats = {'loaded': False, 'saves': 0}
+
+    def load(self):
+        """读取状态文件，不存在或损坏时返回None"""
+        if not (BOOT_SETTINGS['fast_boot'] and self.path):
+            return None
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+            state = BootState.unpack(data)
+        except (OSError, ValueError):
+            return None
+        if state.cm_per_pixel <= 0:
+            return None
+        self._saved = state
+        self.stats['loaded'] = True
+        return state
+
+    def save_due(self):
+        if not (BOOT_SETTINGS['fast_boot'] and self.path):
+            return False
+        return time.ticks_diff(time.ticks_ms(), self._last_save) >= self._interval
+
+    def save(self, cm_per_pixel, anatomy=None, roi=None, auto_gain=False):
+        """保存当前传感器曝光/增益与检测状态（在得到有效穴位的帧调用）"""
+        self._last_save = time.ticks_ms()
+        self._interval = BOOT_SETTINGS['save_ms']
+        state = BootState()
+        state.exposure_us = sensor.get_exposure_us()
+        state.gain_db = sensor.get_gain_db()
+        state.auto_gain = bool(auto_gain)
+        state.cm_per_pixel = cm_per_pixel
+        if anatomy:
+            p = anatomy['proximal_point']
+            d = anatomy['distal_point']
+            state.endpoints = (int(p[0]), int(p[1]), int(d[0]), int(d[1]))
+        if roi:
+            state.roi = tuple(int(v) for v in roi)
+        if not self._changed(state):
+            return False
+        tmp = self.path + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(state.pack())
+        try:
+            uos.remove(self.path)
+        except OSError:
+            pass
+        uos.rename(tmp, self.path)
+        self._saved = state
+        self.stats['saves'] += 1
+        return True
+
+    def _changed(self, state):
+        """与上次保存的状态相比，是否有超过阈值、值得重写闪存的变化"""
+        old = self._saved
+        if old is None:
+            return True
+        if state.auto_gain != old.auto_gain or abs(state.cm_per_pixel - old.cm_per_pixel) > 1e-4 * old.cm_per_pixel:
+            return True
+        if abs(state.exposure_us - old.exposure_us) > BOOT_SETTINGS['save_exposure_ratio'] * max(1, old.exposure_us):
+            return True
+        if abs(state.gain_db - old.gain_db) > BOOT_SETTINGS['save_gain_db']:
+            return True
+        return _moved(state.endpoints, old.endpoints) or _moved(state.roi, old.roi)
+
+def _moved(a, b):
+    # 端点/ROI 有无发生变化，或任一坐标移动超过 save_move_px
+    if a is None or b is None:
+        return a is not b
+    limit = BOOT_SETTINGS['save_move_px']
+    for i in range(4):
+        if abs(a[i] - b[i]) > limit:
+            return True
+    return False
+
+def apply_sensor(state):
+    """以上次保存的曝光/增益作为起点，之后由 EnvAdapter 重新打开自动曝光"""
+    sensor.set_auto_exposure(False, exposure_us=state.exposure_us)
+    sensor.set_auto_gain(False, gain_db=state.gain_db)
+
+def settle_sensor():
+    """按实测亮度等待传感器稳定，代替固定的 skip_frames(2000)
+
+    连续 settle_frames 帧的平均亮度变化不超过 settle_delta 且处于 settle_l 范围内
+    即认为稳定；最长等待 settle_max_ms。返回 (丢弃帧数, 耗时ms, 最后亮度)。
+    """
+    start = time.ticks_ms()
+    low, high = BOOT_SETTINGS['settle_l']
+    prev = None
+    stable = 0
+    frames = 0
+    l_mean = None
+    while True:
+        img = sensor.snapshot()
+        frames += 1
+        l_mean = img.get_statistics().l_mean()
+        if prev is not None and abs(l_mean - prev) <= BOOT_SETTINGS['settle_delta'] and low <= l_mean <= high:
+            stable += 1
+        else:
+            stable = 0
+        prev = l_mean
+        elapsed = time.ticks_diff(time.ticks_ms(), start)
+        if stable >= BOOT_SETTINGS['settle_frames'] or elapsed >= BOOT_SETTINGS['settle_max_ms']:
+            return frames, elapsed, l_mean
@@ -1,21 +1,92 @@
-import sensor, image, time, math, json, pyb, os
+import sensor, image, time, math, json, pyb, os, sys
+sys.path.append("openmv_project")  # 与 main.py 相同：脚本从设备根目录运行
+from config import BOOT_SETTINGS
 
+# 与 main.py 使用相同的分辨率，cm_per_pixel 才能直接用于穴位换算；
+# 灰度格式下 find_rects 与逐像素取值都更快
 sensor.reset()
-sensor.set_pixformat(sensor.RGB565)
-sensor.set_framesize(sensor.QVGA)
-sensor.skip_frames(1000)
+sensor.set_pixformat(sensor.GRAYSCALE)
+sensor.set_framesize(sensor.HQVGA)
+sensor.skip_frames(time=500)
 
 # ******************** 校准参数 ********************
 REF_SIZE_CM = 5.0         # 校准卡实际尺寸
 SAMPLES_NEEDED = 5        # 采样次数
-INIT_DELAY = 3            # 初始准备时间（秒）
-INTERVAL = 2              # 采样间隔（秒）
+MIN_WIDTH_PX = 40         # 过滤小面积误检
+RECT_THRESHOLD = 2500     # find_rects 阈值
+ROI_MARGIN = 12           # 跟踪ROI在卡片外扩的像素（至少）
+LOST_FRAMES = 5           # 连续丢失多少帧后回到整帧搜索
+STABLE_FRAMES = 3         # 连续多少帧测量一致才记为一个样本
+STABLE_TOL_PX = 0.6       # 连续测量的最大差值（像素）
+EDGE_WIN = 5              # 亚像素边缘搜索半窗口（像素）
+EDGE_ROWS = 9             # 每帧测量的扫描行数
+GRAD_FLOOR = 4            # 梯度噪声底（灰度级），低于该值的梯度不参与质心
+OUTLIER_K = 3.0           # 样本偏离中位数超过 K×1.4826×MAD 时剔除
 
 # ******************** 可视化配置 ********************
 TEXT_COLOR = (255, 0, 0)  # 红色文字提示
 BOX_COLOR = (0, 255, 0)   # 绿色方框
 JSON_FILE_PATH = "calibration.json"
 
+def median(values):
+    s = sorted(values)
+    n = len(s)
+    if n == 0:
+        return None
+    return s[n // 2] if n % 2 else (s[n // 2 - 1] + s[n // 2]) / 2
+
+def robust_estimate(samples):
+    """中位数/MAD 估计，返回 (宽度, MAD, 保留的样本, 剔除的样本)"""
+    med = median(samples)
+    mad = median([abs(v - med) for v in samples])
+    limit = max(OUTLIER_K * 1.4826 * mad, STABLE_TOL_PX)  # MAD 为0时按稳定容差
+    kept = [v for v in samples if abs(v - med) <= limit]
+    rejected = [v for v in samples if v not in kept]
+    width = median(kept)
+    return width, median([abs(v - width) for v in kept]), kept, rejected
+
+def edge_subpixel(img, x0, x1, y):
+    """在 [x0, x1] 的水平剖面上用梯度加权质心求边缘位置（亚像素），梯度太弱返回None"""
+    x0 = max(0, x0)
+    x1 = min(img.width() - 1, x1)
+    prev = img.get_pixel(x0, y)
+    total = 0
+    weighted = 0.0
+    for x in range(x0 + 1, x1 + 1):
+        v = img.get_pixel(x, y)
+        g = abs(v - prev) - GRAD_FLOOR
+        prev = v
+        if g > 0:
+            total += g
+            weighted += g * (x - 0.5)  # 梯度位于两个像素之间
+    if total < 4 * GRAD_FLOOR:
+        return None
+    return weighted / total
+
+def measure_width(img, rect):
+    """在卡片中部若干扫描行上测量左右边缘的亚像素位置，返回宽度中位数"""
+    x, y, w, h = rect
+    widths = []
+    for i in range(EDGE_ROWS):
+        row = y + h // 5 + (h * 3 // 5) * i // max(1, EDGE_ROWS - 1)
+        left = edge_subpixel(img, x - EDGE_WIN, x + EDGE_WIN, row)
+        right = edge_subpixel(img, x + w - EDGE_WIN, x + w + EDGE_WIN, row)
+        if left is not None and right is not None:
+            widths.append(right - left)
+    if len(widths) < EDGE_ROWS // 2 + 1:
+        return None
+    return median(widths)
+
+def track_roi(img, rect):
+    """下一帧只在卡片附近搜索：卡片外扩 margin 并裁剪到图像内"""
+    x, y, w, h = rect
+    m = max(ROI_MARGIN, w // 8)
+    x0 = max(0, x - m)
+    y0 = max(0, y - m)
+    x1 = min(img.width(), x + w + m)
+    y1 = min(img.height(), y + h + m)
+    return (x0, y0, x1 - x0, y1 - y0)
+
 def run_calibration():
     # **删除旧的 JSON 文件**
     try:
@@ -25,63 +96,74 @@ def run_calibration():
     except OSError:
         print("未找到旧的 JSON 文件，无需删除。")
 
-    measurements = []
+    samples = []
+    recent = []           # 最近几帧的测量值，用于判断稳定
+    roi = None            # 跟踪ROI，None 表示整帧搜索
+    lost = 0
+    frames = 0
     led = pyb.LED(1)      # 使用红色LED作为状态指示
-    start_time = time.ticks_ms()  # 记录开始时间
-
-    # 初始倒计时提示
-    for i in range(INIT_DELAY, 0, -1):
-        img = sensor.snapshot()
-        img.draw_string(10, 10, f"准备倒计时: {i}秒", color=TEXT_COLOR)
-        img.draw_string(10, 30, "请放置校准卡片!", color=TEXT_COLOR)
-        time.sleep(1)
+    start_time = time.ticks_ms()
 
-    # 开始自动采样
-    sample_count = 0
-    while sample_count < SAMPLES_NEEDED:
+    # 自动采样：卡片稳定即记录样本，不做固定等待
+    while len(samples) < SAMPLES_NEEDED:
         img = sensor.snapshot()
+        frames += 1
+        led.off()
 
-        # 实时检测卡片
-        rects = img.find_rects(threshold=2500)
-        found = False
-
+        # 锁定后只在卡片附近的ROI内检测
+        rects = img.find_rects(roi=roi, threshold=RECT_THRESHOLD) if roi else img.find_rects(threshold=RECT_THRESHOLD)
+        card = None
         if rects:
             largest_rect = max(rects, key=lambda r: r.w() * r.h())
-            if largest_rect.w() > 50:  # 过滤小面积误检
-                found = True
-                img.draw_rectangle(largest_rect.rect(), color=BOX_COLOR)
-                pixel_width = largest_rect.w()
-
-                # 显示状态信息
-                img.draw_string(10, 10, f"采样进度: {sample_count+1}/{SAMPLES_NEEDED}", color=TEXT_COLOR)
-                img.draw_string(10, 30, f"当前宽度: {pixel_width}px", color=TEXT_COLOR)
-                img.draw_string(10, 50, "请勿移动卡片!", color=TEXT_COLOR)
-
-                # 到达采样间隔时记录数据
-                if time.ticks_diff(time.ticks_ms(), start_time) >= INTERVAL * 1000:
-                    measurements.append(pixel_width)
-                    sample_count += 1
-                    start_time = time.ticks_ms()  # 重置计时器
-
-                    # LED反馈
-                    led.on()
-                    time.sleep_ms(100)
-                    led.off()
-
-        # 未找到卡片提示
-        if not found:
+            if largest_rect.w() > MIN_WIDTH_PX:
+                card = largest_rect.rect()
+
+        if card is None:
+            recent = []
+            lost += 1
+            if lost >= LOST_FRAMES:
+                roi = None
             img.draw_string(10, 10, "未检测到校准卡片!", color=TEXT_COLOR)
             img.draw_string(10, 30, "请放置5cm白色卡片", color=TEXT_COLOR)
-
-        time.sleep_ms(100)  # 降低CPU占用
-
-    # 计算并保存校准参数
-    avg_width = sum(measurements) / SAMPLES_NEEDED
-    cm_per_pixel = REF_SIZE_CM / avg_width
+            continue
+
+        lost = 0
+        roi = track_roi(img, card)
+        img.draw_rectangle(card, color=BOX_COLOR)
+        pixel_width = measure_width(img, card)
+        if pixel_width is None:
+            recent = []
+            continue
+
+        recent.append(pixel_width)
+        if len(recent) > STABLE_FRAMES:
+            recent.pop(0)
+        if len(recent) == STABLE_FRAMES and max(recent) - min(recent) <= STABLE_TOL_PX:
+            samples.append(median(recent))
+            recent = []
+            led.on()  # LED反馈，下一帧熄灭
+
+        # 显示状态信息
+        img.draw_string(10, 10, f"采样进度: {len(samples)}/{SAMPLES_NEEDED}", color=TEXT_COLOR)
+        img.draw_string(10, 30, f"当前宽度: {pixel_width:.2f}px", color=TEXT_COLOR)
+        img.draw_string(10, 50, "请勿移动卡片!", color=TEXT_COLOR)
+
+    # 计算并保存校准参数：中位数/MAD 剔除离群样本
+    width, mad, kept, rejected = robust_estimate(samples)
+    cm_per_pixel = REF_SIZE_CM / width
+    elapsed_ms = time.ticks_diff(time.ticks_ms(), start_time)
 
     calibration_data = {
         "cm_per_pixel": round(cm_per_pixel, 5),
-        "samples": measurements,
+        "width_px": round(width, 3),
+        "mad_px": round(mad, 3),
+        # 相对离散度（1.4826×MAD/宽度），cm_per_pixel 的相对误差量级
+        "spread": round(1.4826 * mad / width, 5),
+        "samples": [round(v, 2) for v in samples],
+        "rejected": [round(v, 2) for v in rejected],
+        "resolution": [sensor.width(), sensor.height()],
+        "frames": frames,
+        "elapsed_ms": elapsed_ms,
         "timestamp": list(time.localtime())  # 转换为可序列化格式
     }
 
@@ -92,6 +174,12 @@ def run_calibration():
         f.write(json_data)  # 确保写入的是 JSON 数据
         f.flush()
         os.sync()
+    state_file = BOOT_SETTINGS['state_file']  # 快速启动状态文件（含旧标定值），标定后删除
+    if state_file:
+        try:
+            os.remove(state_file)  # 下次启动重新读取 calibration.json
+        except OSError:
+            pass
 
     # 在终端打印 JSON 数据
     print("校准结果 JSON 数据:\n", json_data)  # 直接打印 JSON 数据
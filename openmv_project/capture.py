@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+# 流水线采集：用多个传感器帧缓冲让下一帧的曝光与DMA传输和当前帧的分析重叠
+#
+#   'newest' —— 3个帧缓冲，传感器在后台连续采集，snapshot() 总是返回最新的完整帧；
+#               分析跟不上时中间的帧直接被覆盖，不会被取出（延迟最低）
+#   'fifo'   —— 4个及以上帧缓冲（视频FIFO），snapshot() 按顺序返回，不漏帧（吞吐优先）；
+#               需要跳帧时只出队丢弃，不做任何分析
+# 多缓冲模式下 snapshot() 返回的图像在下一次 snapshot() 后失效，需要跨帧保留的数据
+# 必须复制（运动检测参考帧、缩略图等已经是独立缓冲）。
+import sensor
+from config import *
+
+class FrameSource:
+    def __init__(self):
+        self.pipelined = CAPTURE_SETTINGS['pipeline']
+        self.policy = CAPTURE_SETTINGS['policy']
+        if self.pipelined:
+            if self.policy == 'fifo':
+                buffers = max(4, CAPTURE_SETTINGS['buffers'])
+            else:
+                buffers = 3
+            sensor.set_framebuffers(buffers)
+        else:
+            sensor.set_framebuffers(1)
+        self.buffers = sensor.get_framebuffers()
+        self.stats = {'frames': 0, 'skipped': 0}
+
+    def snapshot(self):
+        self.stats['frames'] += 1
+        return sensor.snapshot()
+
+    def skip(self):
+        """跳过一帧：FIFO 模式只出队不分析；newest 模式无需调用，未取出的帧由传感器覆盖"""
+        self.stats['skipped'] += 1
+        if self.policy == 'fifo':
+            sensor.snapshot()
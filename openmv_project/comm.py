@@ -1,38 +1,338 @@
 # -*- coding: utf-8 -*-
-import pyb
+import pyb, time
 from pyb import UART
+from config import *
+from acudb import MAX_IDS
+
+# CRC-8（多项式0x07）查找表，导入时生成一次
+def _make_crc_table():
+    table = bytearray(256)
+    for i in range(256):
+        crc = i
+        for _ in range(8):
+            if crc & 0x80:
+                crc = (crc << 1) ^ 0x07
+            else:
+                crc <<= 1
+            crc &= 0xFF
+        table[i] = crc
+    return table
+
+CRC8_TABLE = _make_crc_table()
+PACKET_LEN = 10
+
+def table_tag(ids):
+    """穴位表标签：按序号顺序对各ID（ASCII，以0结尾）计算 CRC-16/CCITT（初值0xFFFF）"""
+    crc = 0xFFFF
+    for acu_id in ids:
+        for b in acu_id.encode() + b'\0':
+            crc ^= b << 8
+            for _ in range(8):
+                crc = ((crc << 1) ^ 0x1021) if crc & 0x8000 else (crc << 1)
+                crc &= 0xFFFF
+    return crc
+
+# 批量数据帧：
+#   0xAB | seq | len(2字节) | 表标签(2字节) | 时间戳ms(4字节) | N × 穴位记录 | CRC
+# len 为表标签、时间戳与穴位记录的总字节数；每条穴位记录5字节：
+#   穴位序号 | x/y 各12位打包(3字节) | 压力
+# 穴位序号为 sorted(ids) 中的下标（1字节，穴位表最多 MAX_IDS 个），主机端解码器使用同样的顺序；
+# 表标签为 table_tag(sorted(ids))，穴位表增删条目后序号含义改变，接收端据此发现两端的表不一致。
+# 多字节字段均为大端序。批量帧需要接收端支持，由 COMM_SETTINGS['batched'] 显式开启。
+FRAME_HEADER = 0xAB
+FRAME_HEADER_LEN = 10
+FRAME_RECORD_LEN = 5
+
+# 文本消息（性能汇总、日志）：
+#   0xAC | 类型 | 长度 | 文本（UTF-8，最多 TEXT_MAX 字节）| CRC
+# 与数据包走同一条发送路径（队列模式下整条入队），不会插进正在发送的二进制帧中间；
+# 更长的文本拆成多条，主机端按类型拼接。
+TEXT_HEADER = 0xAC
+TEXT_MAX = 240
+TEXT_PROFILE = 1
+TEXT_LOG = 2
+
+# 发送队列（COMM_SETTINGS['tx_queue']）：
+# 编码好的包/帧先进入环形字节缓冲，由 poll() 在帧间按链路速率（令牌桶）写出，
+# 单次写出不超过 tx_burst_bytes，视觉循环因此不会被串口拖住。
+# 队列放不下时不阻塞，而是把各穴位的值挂起（每个穴位只保留最新值），
+# 等队列有空间时再重新编码发送；被新值覆盖掉的旧值计入 dropped。
 
 class ProtocolHandler:
-    def __init__(self):
-        self.uart = UART(3, 115200)
+    def __init__(self, ids=None):
+        # ids: 可发送的穴位ID（默认 ACU_DB 的键，使用编译穴位表时传入表中的ID）
+        self.baudrate = 115200
+        self.uart = UART(3, self.baudrate)
         self.seq_num = 0
+        # 预分配的数据包缓冲，每次发送原地填充
+        self._packet = bytearray(PACKET_LEN)
+        self._packet[0] = 0xAA
+        # 批量模式：预分配整帧缓冲
+        self.acu_ids = sorted(ids if ids is not None else ACU_DB)
+        if len(self.acu_ids) > MAX_IDS:
+            raise ValueError("too many acupoints for 1-byte frame index: %d > %d" % (len(self.acu_ids), MAX_IDS))
+        self.acu_index = {acu_id: i for i, acu_id in enumerate(self.acu_ids)}
+        self._frame = bytearray(FRAME_HEADER_LEN + COMM_SETTINGS['max_points'] * FRAME_RECORD_LEN + 1)
+        self._frame[0] = FRAME_HEADER
+        self.table_tag = table_tag(self.acu_ids)
+        self._frame[4] = self.table_tag >> 8
+        self._frame[5] = self.table_tag & 0xFF
+        self._frame_len = 0
+        self._frame_open = False
+        self._text = bytearray(3 + TEXT_MAX + 1)
+        self._text[0] = TEXT_HEADER
+        # 死区模式：记录每个穴位上次实际发送的 [x, y, 压力, 时间]
+        self._last_sent = {}
+        self.stats = {'sent': 0, 'suppressed': 0}
+        # 发送队列与挂起表（均预分配）
+        self._txq = bytearray(COMM_SETTINGS['tx_queue_bytes'])
+        self._txq_head = 0
+        self._txq_len = 0
+        self._tokens = COMM_SETTINGS['tx_burst_bytes']
+        self._last_poll = time.ticks_ms()
+        self._pending = [[0, 0, 0] for _ in self.acu_ids]
+        self._pending_flags = bytearray(len(self.acu_ids))
+        self._pending_count = 0
+        self._pending_next = 0  # 分块补发时下一次开始扫描的穴位下标
+        self._pending_ts = 0
+        self._rate_bytes = 0
+        self._rate_start = self._last_poll
+        self.tx_stats = {'queue_depth': 0, 'pending': 0, 'dropped': 0,
+                         'bytes_sent': 0, 'bytes_per_sec': 0}
+
+    def begin_frame(self, timestamp_ms=None):
+        """开始一个批量数据帧，之后的 send_acu_data 都写入该帧，end_frame 时一次发送"""
+        if timestamp_ms is None:
+            timestamp_ms = time.ticks_ms()
+        frame = self._frame
+        frame[1] = self.seq_num % 256
+        frame[6] = (timestamp_ms >> 24) & 0xFF
+        frame[7] = (timestamp_ms >> 16) & 0xFF
+        frame[8] = (timestamp_ms >> 8) & 0xFF
+        frame[9] = timestamp_ms & 0xFF
+        self._frame_len = FRAME_HEADER_LEN
+        self._frame_open = True
+
+    def end_frame(self):
+        if not self._frame_open:
+            return
+        self._frame_open = False
+        frame = self._frame
+        n = self._frame_len
+        if n == FRAME_HEADER_LEN and COMM_SETTINGS['deadband_mm'] > 0:
+            return  # 所有穴位都在死区内，本帧无需发送
+        body = n - 4
+        frame[2] = (body >> 8) & 0xFF
+        frame[3] = body & 0xFF
+        frame[n] = self._calc_crc(frame, n)
+        if self._transmit(frame, n + 1):
+            self.seq_num += 1
+        else:
+            self._park_frame(n)
 
     def send_acu_data(self, acu_id, x_mm, y_mm, pressure):
         # 数据压缩：将坐标映射到12位（0-4095）
         x_enc = min(max(x_mm, 0), 4095)
         y_enc = min(max(y_mm, 0), 4095)
-        payload = bytearray([
-            0xAA,
-            self.seq_num % 256,
-            ord(acu_id[0]), ord(acu_id[1]), ord(acu_id[2]),
-            (x_enc >> 4) & 0xFF,  # 高8位
-            ((x_enc & 0xF) << 4) | ((y_enc >> 8) & 0xF),  # 低4位 + 高4位
-            y_enc & 0xFF,  # 低8位
-            pressure
-        ])
-        crc = self._calc_crc(payload)
-        packet = payload + bytearray([crc])
-        self.uart.write(packet)
-        self.seq_num += 1
-
-    def _calc_crc(self, data):
+        if COMM_SETTINGS['deadband_mm'] > 0 and not self._changed(acu_id, x_enc, y_enc, pressure):
+            self.stats['suppressed'] += 1
+            return
+        self.stats['sent'] += 1
+        if self._frame_open:
+            self._append_record(self.acu_index[acu_id], x_enc, y_enc, pressure)
+            return
+        self._encode_packet(acu_id, x_enc, y_enc, pressure)
+        if self._transmit(self._packet, PACKET_LEN):
+            self.seq_num += 1
+        else:
+            self._park(self.acu_index[acu_id], x_enc, y_enc, pressure)
+
+    def send_text(self, kind, data):
+        """发送文本（str 或 bytes），返回已发送/入队的字节数；队列放不下时剩余部分不发送"""
+        if isinstance(data, str):
+            data = data.encode()
+        text = self._text
+        text[1] = kind
+        sent = 0
+        while sent < len(data):
+            n = min(TEXT_MAX, len(data) - sent)
+            while n < len(data) - sent and n > 1 and data[sent + n] & 0xC0 == 0x80:
+                n -= 1  # 不在多字节字符中间拆分
+            text[2] = n
+            text[3:3 + n] = memoryview(data)[sent:sent + n]
+            text[3 + n] = self._calc_crc(text, 3 + n)
+            if not self._transmit(text, 4 + n):
+                break
+            sent += n
+        return sent
+
+    def send_log(self, data):
+        """日志输出（logger.RingLogger 在 output 为 'uart' 时调用）"""
+        return self.send_text(TEXT_LOG, data)
+
+    def _encode_packet(self, acu_id, x_enc, y_enc, pressure):
+        packet = self._packet
+        packet[1] = self.seq_num % 256
+        packet[2] = ord(acu_id[0])
+        packet[3] = ord(acu_id[1])
+        packet[4] = ord(acu_id[2])
+        packet[5] = (x_enc >> 4) & 0xFF  # 高8位
+        packet[6] = ((x_enc & 0xF) << 4) | ((y_enc >> 8) & 0xF)  # 低4位 + 高4位
+        packet[7] = y_enc & 0xFF  # 低8位
+        packet[8] = pressure
+        packet[9] = self._calc_crc(packet, PACKET_LEN - 1)
+
+    def _transmit(self, buf, n):
+        """发送 buf 的前 n 字节：直写模式立即写串口，队列模式放入环形缓冲，放不下返回False"""
+        if not COMM_SETTINGS['tx_queue']:
+            self.uart.write(memoryview(buf)[:n])
+            self._account(n, time.ticks_ms())
+            return True
+        size = len(self._txq)
+        if size - self._txq_len < n:
+            return False
+        tail = (self._txq_head + self._txq_len) % size
+        first = min(n, size - tail)
+        self._txq[tail:tail + first] = memoryview(buf)[:first]
+        if first < n:
+            self._txq[0:n - first] = memoryview(buf)[first:n]
+        self._txq_len += n
+        self.tx_stats['queue_depth'] = self._txq_len
+        return True
+
+    def poll(self):
+        """帧间调用：按链路速率写出队列中的字节（单次不超过突发上限），再把挂起的穴位重新入队"""
+        if not COMM_SETTINGS['tx_queue']:
+            return
+        now = time.ticks_ms()
+        elapsed = time.ticks_diff(now, self._last_poll)
+        self._last_poll = now
+        # 令牌桶：每毫秒可发送 baudrate/10000 字节（8N1每字节10位）
+        self._tokens = min(COMM_SETTINGS['tx_burst_bytes'],
+                           self._tokens + elapsed * self.baudrate // 10000)
+        n = min(self._tokens, self._txq_len)
+        if n > 0:
+            size = len(self._txq)
+            head = self._txq_head
+            first = min(n, size - head)
+            self.uart.write(memoryview(self._txq)[head:head + first])
+            if first < n:
+                self.uart.write(memoryview(self._txq)[0:n - first])
+            self._txq_head = (head + n) % size
+            self._txq_len -= n
+            self._tokens -= n
+            self._account(n, now)
+        if self._pending_count and not self._frame_open:
+            self._flush_pending()
+        self.tx_stats['queue_depth'] = self._txq_len
+        self.tx_stats['pending'] = self._pending_count
+
+    def _account(self, n, now):
+        self.tx_stats['bytes_sent'] += n
+        self._rate_bytes += n
+        window = time.ticks_diff(now, self._rate_start)
+        if window >= 1000:
+            self.tx_stats['bytes_per_sec'] = self._rate_bytes * 1000 // window
+            self._rate_bytes = 0
+            self._rate_start = now
+
+    def _park(self, index, x_enc, y_enc, pressure):
+        # 同一穴位已有挂起值时直接覆盖：只保留最新值
+        slot = self._pending[index]
+        if self._pending_flags[index]:
+            self.tx_stats['dropped'] += 1
+        else:
+            self._pending_flags[index] = 1
+            self._pending_count += 1
+        slot[0] = x_enc
+        slot[1] = y_enc
+        slot[2] = pressure
+
+    def _park_frame(self, n):
+        frame = self._frame
+        self._pending_ts = (frame[6] << 24) | (frame[7] << 16) | (frame[8] << 8) | frame[9]
+        for i in range(FRAME_HEADER_LEN, n, FRAME_RECORD_LEN):
+            self._park(frame[i], (frame[i + 1] << 4) | (frame[i + 2] >> 4),
+                       ((frame[i + 2] & 0xF) << 8) | frame[i + 3], frame[i + 4])
+
+    def _flush_pending(self):
+        if COMM_SETTINGS['batched']:
+            # 挂起的穴位按队列空闲空间分块成帧（每帧最多 max_points 条），时间戳取最近一次
+            # 被挂起的帧；放不下的继续挂起，下次 poll 从上次停下的穴位接着发，避免饿死
+            count = len(self._pending_flags)
+            while self._pending_count:
+                free = len(self._txq) - self._txq_len
+                n = min(self._pending_count, COMM_SETTINGS['max_points'],
+                        (free - FRAME_HEADER_LEN - 1) // FRAME_RECORD_LEN)
+                if n <= 0:
+                    return
+                self.begin_frame(self._pending_ts)
+                index = self._pending_next
+                while n:
+                    if self._pending_flags[index]:
+                        self._pending_flags[index] = 0
+                        self._pending_count -= 1
+                        slot = self._pending[index]
+                        self._append_record(index, slot[0], slot[1], slot[2])
+                        n -= 1
+                    index = (index + 1) % count
+                self._pending_next = index
+                self.end_frame()
+            return
+        for index in range(len(self._pending_flags)):
+            if not self._pending_flags[index]:
+                continue
+            if len(self._txq) - self._txq_len < PACKET_LEN:
+                break
+            self._pending_flags[index] = 0
+            self._pending_count -= 1
+            slot = self._pending[index]
+            self._encode_packet(self.acu_ids[index], slot[0], slot[1], slot[2])
+            self._transmit(self._packet, PACKET_LEN)
+            self.seq_num += 1
+
+    def _changed(self, acu_id, x_enc, y_enc, pressure):
+        """坐标移动超过死区、压力变化或距上次发送超过关键帧间隔时返回True，并记录本次发送值"""
+        now = time.ticks_ms()
+        last = self._last_sent.get(acu_id)
+        if last is None:
+            self._last_sent[acu_id] = [x_enc, y_enc, pressure, now]
+            return True
+        deadband = COMM_SETTINGS['deadband_mm']
+        if (abs(x_enc - last[0]) < deadband and abs(y_enc - last[1]) < deadband
+                and pressure == last[2]
+                and time.ticks_diff(now, last[3]) < COMM_SETTINGS['keyframe_ms']):
+            return False
+        last[0] = x_enc
+        last[1] = y_enc
+        last[2] = pressure
+        last[3] = now
+        return True
+
+    def reset_deadband(self):
+        """清空发送记录，下一帧全部穴位重新发送（例如接收端重启后）"""
+        self._last_sent = {}
+
+    def _append_record(self, index, x_enc, y_enc, pressure):
+        frame = self._frame
+        i = self._frame_len
+        if i + FRAME_RECORD_LEN >= len(frame):
+            # 帧已满：先发出当前帧，再开一个同时间戳的新帧
+            ts = (frame[6] << 24) | (frame[7] << 16) | (frame[8] << 8) | frame[9]
+            self.end_frame()
+            self.begin_frame(ts)
+            i = self._frame_len
+        frame[i] = index
+        frame[i + 1] = (x_enc >> 4) & 0xFF
+        frame[i + 2] = ((x_enc & 0xF) << 4) | ((y_enc >> 8) & 0xF)
+        frame[i + 3] = y_enc & 0xFF
+        frame[i + 4] = pressure
+        self._frame_len = i + FRAME_RECORD_LEN
+
+    def _calc_crc(self, data, length=None):
+        # 查表法：每字节一次查表，代替逐位移位
+        table = CRC8_TABLE
         crc = 0
-        for b in data:
-            crc ^= b
-            for _ in range(8):
-                if crc & 0x80:
-                    crc = (crc << 1) ^ 0x07
-                else:
-                    crc <<= 1
-                crc &= 0xFF
+        for i in range(len(data) if length is None else length):
+            crc = table[crc ^ data[i]]
         return crc
@@ -21,21 +21,27 @@ ACU_DB = {
         "ref_point": "elbow_line_end",  # 保留兼容原有代码
         "offset_cm": (0.5, 0),          # 横向偏移
         "depth_cm": 1.2,
-        "pressure": 80
+        "pressure": 80,
+        "segment": "forearm",           # 所在肢体分段
+        "rel_pos": 0.15                 # 从肘部到腕部的相对位置
     },
     "PC3": {
         "name": "曲泽",
         "ref_point": "wrist_line_mid",  # 保留兼容原有代码
         "offset_cm": (0.5, 0.5),        # 微调偏移
         "depth_cm": 0.8,
-        "pressure": 70
+        "pressure": 70,
+        "segment": "forearm",
+        "rel_pos": 0.25
     },
     "HT7": {
         "name": "神门",
         "ref_point": "wrist_line_ulnar", # 保留兼容原有代码
         "offset_cm": (0.0, -1.0),        # 微调偏移
         "depth_cm": 0.5,
-        "pressure": 60
+        "pressure": 60,
+        "segment": "forearm",
+        "rel_pos": 0.9
     }
 }
 
@@ -43,4 +49,154 @@ ACU_DB = {
 PERF_SETTINGS = {
     'target_fps': 15,
     'frame_skip': 2
+}
+
+# 跟踪ROI参数
+ROI_SETTINGS = {
+    'enabled': True,      # 锁定手臂后只在ROI内做边缘/色块检测
+    'margin': 20,         # 检测结果向外扩展的像素
+    'expand_step': 40,    # 每次未检测到时ROI向四周扩大的像素
+    'min_size': 64        # ROI最小边长
+}
+
+# 手臂跟踪参数（α-β滤波）
+TRACK_SETTINGS = {
+    'enabled': True,           # 两次完整检测之间用滤波器预测端点
+    'alpha': 0.5,              # 位置修正系数
+    'beta': 0.1,               # 速度修正系数
+    'redetect_interval': 10,   # 每隔N个处理帧强制完整检测
+    'min_confidence': 0.4,     # 置信度低于该值时立即完整检测
+    'miss_decay': 0.6,         # 局部校验失败时的置信度衰减
+    'search_margin': 16,       # 局部校验窗口外扩像素
+    'min_pixels': 150,         # 局部校验所需的最少肤色像素
+    'max_offset': 20,          # 单帧允许的最大法向修正（像素）
+    'reset_distance': 40       # 检测结果偏离预测超过该值时重置滤波器
+}
+
+# 推理缓存参数
+INFER_SETTINGS = {
+    'cache': True,            # 场景未变化时复用上次的识别结果
+    'pool': 20,               # 场景签名的降采样倍数（HQVGA -> 12x8）
+    'change_threshold': 5,    # 签名差异的L均值超过该值视为场景变化
+    'ttl_ms': 2000,           # 缓存最长有效期
+    'preprocess': True,       # 推理前缩放进预分配的模型输入缓冲（保持宽高比）
+    'crop': True,             # 有跟踪ROI时只把ROI附近区域送入模型
+    'crop_margin': 16         # 裁剪区域在ROI基础上外扩的像素
+}
+
+# 运动检测参数
+MOTION_SETTINGS = {
+    'downsampled': True,   # 在预分配的降采样灰度缓冲上做帧差，不再每帧拷贝整帧
+    'scale': 0.25,         # 降采样比例（HQVGA -> 60x40）
+    'threshold': 72        # 灰度差均值阈值（大致对应整帧模式下的L均值30）
+}
+
+# 串口协议参数
+COMM_SETTINGS = {
+    'batched': False,     # True 时每个处理帧的所有穴位合并为一个 0xAB 数据帧发送（接收端需支持），默认单点包 0xAA
+    'max_points': 48,     # 单个数据帧最多容纳的穴位数
+    'deadband_mm': 2,     # 坐标变化小于该值(mm)且压力不变时不重发，0为关闭
+    'keyframe_ms': 1000,  # 每个穴位至少每隔该时间重发一次，供接收端重新同步
+    'tx_queue': True,     # 经发送队列在帧间写串口，不在视觉循环里阻塞
+    'tx_queue_bytes': 256,  # 发送队列容量（字节）
+    'tx_burst_bytes': 64  # 单次 poll 最多写出的字节数（115200波特约5.5ms）
+}
+
+# 分阶段耗时统计参数
+PROFILE_SETTINGS = {
+    'enabled': False,     # 关闭时各阶段计时只剩一次判断
+    'window': 64,         # 每个阶段保留最近N个样本（预分配）
+    'report_ms': 5000,    # 周期性输出汇总的间隔，0为只在手动调用时输出
+    'output': 'usb'       # 汇总输出到 'usb'（print）或 'uart'
+}
+
+# 帧调度参数（替代 PERF_SETTINGS['frame_skip'] 的自适应跳帧）
+SCHED_SETTINGS = {
+    'enabled': True,      # 按时间预算调度：检测降频，其余阶段每帧运行
+    'max_interval': 6,    # 检测阶段最多每N帧运行一次
+    'ema': 0.2,           # 耗时滑动平均系数
+    'fixed_interval': 0   # >0 时固定检测间隔（回放对比用），0为按预算自适应
+}
+
+# 每帧共享统计参数
+STATS_SETTINGS = {
+    'shared': True,       # 曝光、肤色阈值、运动检测共用同一份亮度统计与缩略图
+    'source': 'thumb'     # 'thumb' 在降采样灰度图上统计，'full' 在整帧上统计
+}
+
+# 曝光控制参数
+EXPOSURE_SETTINGS = {
+    'hysteresis': True,     # 滞回控制：只在状态变化时写传感器寄存器
+    'target': 100,          # 目标亮度值，低于 target-20 时开启自动增益
+    'hysteresis_band': 8,   # 亮度回升到 target-20+该值 以上才关闭自动增益
+    'interval': 5,          # 每隔N帧统计一次亮度
+    'use_roi': False        # 只统计跟踪ROI内的亮度（手臂区域）
+}
+
+# 穴位求解参数
+ACUPOINT_SETTINGS = {
+    'batch': True,        # 用预计算数组一次求出全部穴位，False 时逐点计算
+    'table': 'acupoints.bin',      # 编译好的穴位表（host/build_acudb.py 生成），不存在时使用 ACU_DB
+    'default_segment': 'forearm'   # 检测结果未标明分段时使用的肢体分段
+}
+
+# 手臂轴线估计参数（AI识别到手臂后确定端点）
+AXIS_SETTINGS = {
+    'method': 'moments',  # 'moments' 降采样肤色掩膜的矩估计，'hough' 整帧 Canny + Hough 直线
+    'scale': 0.25,        # 粗估计所用的降采样比例
+    'min_pixels': 40,     # 粗估计层上色块的最少像素
+    'refine': False,      # 在整帧分辨率下对粗略结果附近的窗口重新估计（更准但更慢）
+    'refine_margin': 8    # 精估计窗口外扩像素
+}
+
+# 叠加显示参数（IDE预览的线条、十字与文字）
+OVERLAY_SETTINGS = {
+    'mode': 'preview',    # 'preview' 每隔N帧绘制一次，'headless' 生产模式不绘制任何叠加
+    'every_n': 4,         # 预览模式下每N帧绘制一次（1 为每帧绘制）
+    'max_items': 96       # 单帧图元数量上限，超出部分丢弃
+}
+
+# 日志参数（logger.py）
+LOG_SETTINGS = {
+    'level': 'warn',      # 'debug' / 'info' / 'warn' / 'error' / 'off'，低于该级别的日志不做格式化
+    'ring_bytes': 2048,   # 日志环形缓冲大小（字节），放不下的消息丢弃并计数
+    'flush_ms': 200,      # 帧间输出间隔（毫秒），0 表示只在调用 flush() 时输出
+    'flush_bytes': 256,   # 每次帧间输出的最大字节数
+    'output': 'usb'       # 'usb' 输出到USB串口（stdout），'uart' 写到通信串口
+}
+
+# 快速启动参数（bootstate.py）
+BOOT_SETTINGS = {
+    'fast_boot': True,        # 启用快速启动，False 时沿用固定 skip_frames 与同步加载模型
+    'state_file': 'state.bin',  # 状态文件（曝光/增益、端点、ROI、标定值），空字符串表示不读写
+    'first_save_ms': 5000,    # 上电后首次保存的等待时间（毫秒），等自动曝光收敛
+    'save_ms': 120000,        # 之后检查是否需要保存的最短间隔（毫秒）
+    'save_move_px': 24,       # 端点或ROI移动超过该像素数才重写状态文件（减少闪存擦写）
+    'save_exposure_ratio': 0.25,  # 曝光时间相对变化超过该比例才重写
+    'save_gain_db': 3.0,      # 增益变化超过该值（dB）才重写
+    'settle_frames': 3,       # 连续稳定帧数
+    'settle_delta': 2,        # 相邻帧平均亮度的最大变化
+    'settle_l': (10, 95),     # 稳定时平均亮度应处于的范围（排除上电时的全黑/全白帧）
+    'settle_max_ms': 2000,    # 最长等待时间（毫秒）
+    'lazy_model': True,       # 延迟加载模型，加载前使用传统肤色检测
+    'model_after_frames': 30  # 一直没有得到有效穴位时，处理该帧数后也加载模型
+}
+
+# 采集流水线参数（capture.py）
+CAPTURE_SETTINGS = {
+    'pipeline': True,     # 多帧缓冲：下一帧的曝光与传输和当前帧的分析重叠，False 为单缓冲顺序采集
+    'policy': 'newest',   # 'newest' 总是取最新帧（延迟优先，来不及处理的帧被覆盖），'fifo' 按顺序取帧（吞吐优先）
+    'buffers': 4          # fifo 策略的帧缓冲数量（至少4个），newest 固定使用3个
+}
+
+# 现场录制参数（recorder.py，主机端用 host/recording.py 读取与回放）
+RECORD_SETTINGS = {
+    'enabled': False,     # 录制帧、检测结果、穴位输出与分阶段耗时
+    'dir': 'rec',         # 录制目录（闪存或SD卡）
+    'format': 'jpeg',     # 'jpeg' 压缩彩色，'gray' 降采样灰度，'rgb565' 降采样彩色（不压缩）
+    'quality': 50,        # JPEG 质量
+    'scale': 0.5,         # 'gray' / 'rgb565' 的降采样比例
+    'max_frames': 300,    # 环形槽位数，超出后覆盖最旧的帧
+    'every_n': 2,         # 每N帧录制一帧
+    'chunk_bytes': 4096   # 每帧最多写出的字节数，上一帧未写完时跳过新帧
 }
\ No newline at end of file
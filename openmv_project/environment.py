@@ -1,19 +1,69 @@
 # environment.py
 import sensor
+from config import *
 
 class EnvAdapter:
     def __init__(self):
         self.auto_mode = True
+        # 已写入传感器的状态，None 表示尚未写过
+        self.auto_exposure = None
+        self.auto_gain = None
+        self.l_mean = None
+        self._frames = 0
+        # 统计：处理帧数、实际做亮度统计的次数、传感器寄存器写入次数
+        self.stats = {'frames': 0, 'updates': 0, 'writes': 0}
 
-    def adjust_exposure(self, img):
+    def adjust_exposure(self, img, ctx=None, roi=None):
         if not self.auto_mode:
             return
-        stats = img.get_statistics()
-        target = 100  # 目标亮度值
+        self.stats['frames'] += 1
+        if not EXPOSURE_SETTINGS['hysteresis']:
+            self._adjust_every_frame(img, ctx)
+            return
+
+        # 降频统计：每隔 interval 帧才看一次亮度
+        self._frames += 1
+        if self.auto_gain is not None and self._frames < EXPOSURE_SETTINGS['interval']:
+            return
+        self._frames = 0
+        self.stats['updates'] += 1
+        if ctx:
+            l_mean = ctx.l_mean(roi)
+        else:
+            l_mean = img.get_statistics(roi=roi).l_mean()
+        self.l_mean = l_mean
+
+        # 滞回：低于下限开启自动增益，高于上限关闭，中间保持原状态
+        low = EXPOSURE_SETTINGS['target'] - 20
+        gain = self.auto_gain
+        if l_mean < low:
+            gain = True
+        elif l_mean > low + EXPOSURE_SETTINGS['hysteresis_band'] or gain is None:
+            gain = False
+        self._apply(True, gain)
+
+    def _apply(self, exposure, gain):
+        # 只在状态真正变化时写传感器
+        if exposure != self.auto_exposure:
+            sensor.set_auto_exposure(exposure)
+            self.auto_exposure = exposure
+            self.stats['writes'] += 1
+        if gain != self.auto_gain:
+            sensor.set_auto_gain(gain)
+            self.auto_gain = gain
+            self.stats['writes'] += 1
+
+    def _adjust_every_frame(self, img, ctx):
+        # 原始行为：每帧统计并重写曝光/增益
+        l_mean = ctx.l_mean() if ctx else img.get_statistics().l_mean()
+        target = EXPOSURE_SETTINGS['target']  # 目标亮度值
         sensor.set_auto_exposure(True)
-        if stats.l_mean() < target - 20:
+        if l_mean < target - 20:
             sensor.set_auto_gain(True)
         else:
             sensor.set_auto_gain(False)
+        self.stats['writes'] += 2
+        self.auto_exposure = True
+        self.auto_gain = l_mean < target - 20
 
 # 在main.py中初始化并使用
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+# 每帧共享的分析上下文：亮度统计只算一次，降采样灰度缩略图只画一次，
+# 曝光控制、肤色阈值与运动检测都从这里取，不再各自对整帧做统计
+import image
+from config import *
+
+class FrameContext:
+    def __init__(self):
+        self.img = None
+        self._l_mean = None        # 本帧整帧亮度均值（惰性计算）
+        self._thumb = None         # 预分配的降采样灰度缓冲
+        self._thumb_ready = False
+        self.stat_passes = 0       # 实际执行的统计次数
+
+    def begin(self, img):
+        """每帧 snapshot 之后调用，使上一帧的结果失效"""
+        self.img = img
+        self._l_mean = None
+        self._thumb_ready = False
+
+    def thumbnail(self):
+        """本帧的降采样灰度图（比例同运动检测），同一帧内只绘制一次"""
+        if not self._thumb_ready:
+            img = self.img
+            scale = MOTION_SETTINGS['scale']
+            w = max(1, int(img.width() * scale))
+            h = max(1, int(img.height() * scale))
+            if self._thumb is None or self._thumb.width() != w or self._thumb.height() != h:
+                self._thumb = image.Image(w, h, image.GRAYSCALE)
+            self._thumb.draw_image(img, 0, 0, x_scale=scale, y_scale=scale)
+            self._thumb_ready = True
+        return self._thumb
+
+    def l_mean(self, roi=None):
+        """亮度均值（Lab L，0-100）；roi 为整帧坐标，给定时统计该区域"""
+        if roi is None and self._l_mean is not None:
+            return self._l_mean
+        self.stat_passes += 1
+        if STATS_SETTINGS['source'] == 'thumb':
+            # 在缩略图上统计，灰度 0-255 线性换算到 L 的 0-100
+            thumb = self.thumbnail()
+            r = None
+            if roi:
+                s = MOTION_SETTINGS['scale']
+                r = (int(roi[0] * s), int(roi[1] * s), max(1, int(roi[2] * s)), max(1, int(roi[3] * s)))
+            value = thumb.get_statistics(roi=r).mean() * 100 / 255
+        else:
+            value = self.img.get_statistics(roi=roi).l_mean()
+        if roi is None:
+            self._l_mean = value
+        return value
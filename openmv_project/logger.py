@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+# 分级日志：写入预分配的环形缓冲，由主循环在帧间按时间间隔分批输出，或调用 flush() 立即输出
+#
+# 级别在启动时由 LOG_SETTINGS['level'] 确定，低于该级别的调用在格式化之前直接返回。
+# 消息用 % 格式化，参数只在启用时才拼接：
+#   from logger import log, LOG_DEBUG
+#   log.debug("穴位 %s 位置: (%d, %d)", acu_id, x, y)
+#   if log.on(LOG_DEBUG):                # 参数本身开销大（如构造列表）时先判断
+#       log.debug("可用穴位: %s", list(ACU_DB.keys()))
+#   log.maybe_flush()                    # 每帧调用一次，按 flush_ms 间隔输出
+#   log.flush()                          # 立即输出全部缓冲内容
+# 缓冲放不下的消息被丢弃并计数，下一次输出时报告丢弃条数。
+# 输出到通信串口时经协议的文本消息发送（不会插进二进制数据帧中间），发送队列满时
+# 未发出的部分留在缓冲里，下次再输出。
+import sys, time
+from config import *
+
+LOG_DEBUG = 10
+LOG_INFO = 20
+LOG_WARN = 30
+LOG_ERROR = 40
+LOG_OFF = 100
+LEVELS = {'debug': LOG_DEBUG, 'info': LOG_INFO, 'warn': LOG_WARN, 'error': LOG_ERROR, 'off': LOG_OFF}
+_TAGS = {LOG_DEBUG: 'D', LOG_INFO: 'I', LOG_WARN: 'W', LOG_ERROR: 'E'}
+_NEWLINE = 10
+
+class RingLogger:
+    def __init__(self, level=None, size=None):
+        self.level = LEVELS[level or LOG_SETTINGS['level']]
+        self._buf = bytearray(size or LOG_SETTINGS['ring_bytes'])
+        self._out = bytearray(len(self._buf))  # 输出时的线性拷贝缓冲
+        self._head = 0
+        self._len = 0
+        self._last_flush = time.ticks_ms()
+        self.link = None  # output 为 'uart' 时由 main.py 指定通信协议（ProtocolHandler），日志作为文本消息发送
+        self.stats = {'messages': 0, 'dropped': 0, 'bytes_out': 0}
+        self._dropped = 0  # 自上次输出以来丢弃的条数
+
+    def on(self, level):
+        return level >= self.level
+
+    def debug(self, fmt, *args):
+        if LOG_DEBUG >= self.level:
+            self._write(LOG_DEBUG, fmt, args)
+
+    def info(self, fmt, *args):
+        if LOG_INFO >= self.level:
+            self._write(LOG_INFO, fmt, args)
+
+    def warn(self, fmt, *args):
+        if LOG_WARN >= self.level:
+            self._write(LOG_WARN, fmt, args)
+
+    def error(self, fmt, *args):
+        if LOG_ERROR >= self.level:
+            self._write(LOG_ERROR, fmt, args)
+
+    def _write(self, level, fmt, args):
+        line = '%d %s %s\n' % (time.ticks_ms(), _TAGS[level], (fmt % args) if args else fmt)
+        data = line.encode()
+        n = len(data)
+        size = len(self._buf)
+        if n > size - self._len:
+            self._dropped += 1
+            self.stats['dropped'] += 1
+            return
+        tail = (self._head + self._len) % size
+        first = min(n, size - tail)
+        self._buf[tail:tail + first] = data[:first]
+        if first < n:
+            self._buf[0:n - first] = data[first:]
+        self._len += n
+        self.stats['messages'] += 1
+
+    def maybe_flush(self):
+        """按 flush_ms 间隔输出一批（不超过 flush_bytes），flush_ms 为0时只在 flush() 时输出"""
+        interval = LOG_SETTINGS['flush_ms']
+        if interval <= 0 or not (self._len or self._dropped):
+            return
+        now = time.ticks_ms()
+        if time.ticks_diff(now, self._last_flush) >= interval:
+            self._last_flush = now
+            self._drain(LOG_SETTINGS['flush_bytes'])
+
+    def flush(self):
+        """输出缓冲中的全部消息"""
+        self._last_flush = time.ticks_ms()
+        self._drain(len(self._buf))
+
+    def _drain(self, limit):
+        # 输出不超过 limit 字节的完整消息（以换行切分，避免截断多字节字符）；
+        # 第一条消息就超过 limit 时整条输出
+        if self._dropped:
+            note = ('%d W [log] %d 条消息因缓冲已满被丢弃\n' % (time.ticks_ms(), self._dropped)).encode()
+            if self._emit(note) < len(note):
+                return 0  # 链路忙，下次再输出
+            self._dropped = 0
+        n = self._len
+        if n == 0:
+            return 0
+        size = len(self._buf)
+        out = self._out
+        head = self._head
+        first = min(n, size - head)
+        out[0:first] = self._buf[head:head + first]
+        if first < n:
+            out[first:n] = self._buf[0:n - first]
+        end = n
+        if n > limit:
+            end = limit
+            while end > 0 and out[end - 1] != _NEWLINE:
+                end -= 1
+            if end == 0:
+                end = limit
+                while out[end - 1] != _NEWLINE:
+                    end += 1
+        end = self._emit(memoryview(out)[:end])
+        self._head = (head + end) % size
+        self._len -= end
+        return end
+
+    def _emit(self, data):
+        """输出 data，返回实际输出的字节数（通信链路发送队列满时可能少于 len(data)）"""
+        if self.link and LOG_SETTINGS['output'] == 'uart':
+            n = self.link.send_log(data)
+        else:
+            sys.stdout.write(bytes(data).decode())
+            n = len(data)
+        self.stats['bytes_out'] += n
+        return n
+
+# 全局实例：main.py 与各模块共用同一个缓冲
+log = RingLogger()
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+# 叠加显示（IDE预览用的线条、矩形、十字和文字）
+#
+# 各模块不再直接在帧上绘制，而是把图元加入同一个列表，主循环在帧结束时一次性绘制。
+#   'headless' 生产模式：不记录也不绘制任何图元
+#   'preview'  预览模式：每 every_n 帧绘制一次，其余帧 add_* 直接返回
+# 构造文字（格式化字符串）前应先判断 overlay.active，跳过的帧不产生任何开销。
+# 用法：
+#   from overlay import overlay
+#   overlay.begin_frame()                      # 每帧采集后调用
+#   if overlay.active: overlay.text(5, 5, "FPS:%.1f" % fps, (255, 0, 0))
+#   overlay.render(img)                        # 帧结束时（下一次 snapshot 之前）调用
+from config import *
+
+# 图元类型
+PRIM_LINE = 0
+PRIM_RECT = 1
+PRIM_CROSS = 2
+PRIM_TEXT = 3
+
+class Overlay:
+    def __init__(self):
+        self.mode = OVERLAY_SETTINGS['mode']
+        self.every_n = max(1, OVERLAY_SETTINGS['every_n'])
+        self.max_items = OVERLAY_SETTINGS['max_items']
+        self.active = False   # 本帧是否记录图元
+        self._frame = 0
+        self._items = []
+        self.stats = {'frames': 0, 'rendered': 0, 'primitives': 0, 'dropped': 0}
+
+    def begin_frame(self):
+        """开始新的一帧：决定本帧是否绘制，并清空上一帧未绘制的图元"""
+        self.stats['frames'] += 1
+        if self._items:
+            self._items.clear()
+        if self.mode == 'headless':
+            self.active = False
+            return
+        self.active = self._frame == 0
+        self._frame = (self._frame + 1) % self.every_n
+
+    def _add(self, item):
+        if len(self._items) >= self.max_items:
+            self.stats['dropped'] += 1
+            return
+        self._items.append(item)
+
+    def line(self, x0, y0, x1, y1, color, thickness=1):
+        if self.active:
+            self._add((PRIM_LINE, x0, y0, x1, y1, color, thickness))
+
+    def rect(self, r, color):
+        if self.active:
+            self._add((PRIM_RECT, r[0], r[1], r[2], r[3], color, 1))
+
+    def cross(self, x, y, color, size=5):
+        if self.active:
+            self._add((PRIM_CROSS, x, y, size, 0, color, 0))
+
+    def text(self, x, y, s, color=None):
+        if self.active:
+            self._add((PRIM_TEXT, x, y, s, 0, color, 0))
+
+    def render(self, img):
+        """把本帧记录的全部图元画到 img 上并清空列表"""
+        items = self._items
+        if not items or img is None:
+            return
+        for kind, a, b, c, d, color, t in items:
+            if kind == PRIM_LINE:
+                img.draw_line(a, b, c, d, color=color, thickness=t)
+            elif kind == PRIM_RECT:
+                img.draw_rectangle(a, b, c, d, color=color)
+            elif kind == PRIM_CROSS:
+                img.draw_cross(a, b, color=color, size=c)
+            elif color is None:
+                img.draw_string(a, b, c)
+            else:
+                img.draw_string(a, b, c, color=color)
+        self.stats['rendered'] += 1
+        self.stats['primitives'] += len(items)
+        items.clear()
+
+# 全局实例：vision.py 与 main.py 共用同一个图元列表
+overlay = Overlay()
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+# 主循环分阶段耗时统计
+#
+# 每个阶段一个预分配的环形样本数组（微秒），记录时不分配内存；
+# min/mean/p95/max 只在输出汇总时计算。关闭时 begin/end 只做一次属性判断。
+# 用法：
+#   from profiler import profiler, STAGE_DETECT
+#   profiler.begin(STAGE_DETECT); ...; profiler.end(STAGE_DETECT)
+#   profiler.report()            # 汇总输出到USB串口（print）
+#   profiler.report(comm)        # 或作为文本消息经通信协议发送（见 comm.py）
+import time
+from array import array
+from config import *
+from comm import TEXT_PROFILE
+
+# 阶段编号（数组下标），名称用于汇总输出
+STAGE_SNAPSHOT = 0
+STAGE_EXPOSURE = 1
+STAGE_MOTION = 2
+STAGE_DETECT = 3   # detect_anatomy / 跟踪整体
+STAGE_INFER = 4    # 其中：模型推理
+STAGE_EDGES = 5    # 其中：手臂轴线估计（矩估计或边缘+直线）
+STAGE_BLOBS = 6    # 其中：肤色色块检测
+STAGE_ACUPOINT = 7
+STAGE_SEND = 8
+STAGE_OVERLAY = 9  # 叠加显示绘制
+STAGE_NAMES = ('snap', 'expo', 'motion', 'detect', 'infer', 'edges', 'blobs', 'acu', 'send', 'draw')
+
+class StageProfiler:
+    def __init__(self, window=None):
+        self.enabled = PROFILE_SETTINGS['enabled']
+        n = window or PROFILE_SETTINGS['window']
+        self.window = n
+        count = len(STAGE_NAMES)
+        self._samples = [array('I', [0] * n) for _ in range(count)]
+        self._pos = [0] * count     # 下一个写入位置
+        self._count = [0] * count   # 窗口内有效样本数
+        self._start = [0] * count   # 本次 begin 的时间戳
+        self._fresh = bytearray(count)  # 自上次 take_frame() 以来有新样本的阶段
+        self._last_report = time.ticks_ms()
+
+    def begin(self, stage):
+        if self.enabled:
+            self._start[stage] = time.ticks_us()
+
+    def end(self, stage):
+        if not self.enabled:
+            return
+        elapsed = time.ticks_diff(time.ticks_us(), self._start[stage])
+        pos = self._pos[stage]
+        self._samples[stage][pos] = max(0, elapsed)
+        self._fresh[stage] = 1
+        self._pos[stage] = (pos + 1) % self.window
+        if self._count[stage] < self.window:
+            self._count[stage] += 1
+
+    def reset(self):
+        for i in range(len(STAGE_NAMES)):
+            self._pos[i] = 0
+            self._count[i] = 0
+
+    def stage_stats(self, stage):
+        """返回 (min, mean, p95, max)，单位微秒；无样本时返回None"""
+        n = self._count[stage]
+        if n == 0:
+            return None
+        values = sorted(self._samples[stage][:n])
+        return (values[0], sum(values) // n, values[min(n - 1, n * 95 // 100)], values[-1])
+
+    def take_frame(self):
+        """返回自上次调用以来各阶段的最新耗时 {阶段名: 微秒}（录制每帧时序用）"""
+        out = {}
+        for i, name in enumerate(STAGE_NAMES):
+            if self._fresh[i]:
+                self._fresh[i] = 0
+                out[name] = self._samples[i][(self._pos[i] - 1) % self.window]
+        return out
+
+    def summary(self):
+        """紧凑的单行汇总：阶段名:min/mean/p95/max（毫秒）"""
+        parts = []
+        for i, name in enumerate(STAGE_NAMES):
+            s = self.stage_stats(i)
+            if s:
+                parts.append('%s:%.1f/%.1f/%.1f/%.1f' % (name, s[0] / 1000, s[1] / 1000, s[2] / 1000, s[3] / 1000))
+        return 'PROF ' + ' '.join(parts)
+
+    def report(self, link=None):
+        """输出汇总：默认 print 到USB串口，给定 link（ProtocolHandler）时作为文本消息发送"""
+        line = self.summary()
+        if link:
+            link.send_text(TEXT_PROFILE, line + '\n')
+        else:
+            print(line)
+
+    def maybe_report(self, link=None):
+        """按 report_ms 间隔周期性输出，report_ms 为0时只在手动调用 report() 时输出"""
+        interval = PROFILE_SETTINGS['report_ms']
+        if not self.enabled or interval <= 0:
+            return
+        now = time.ticks_ms()
+        if time.ticks_diff(now, self._last_report) >= interval:
+            self._last_report = now
+            self.report(link)
+
+# 全局实例：main.py 与各模块共享同一份统计
+profiler = StageProfiler()
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+# 现场录制：把帧（JPEG / 降采样灰度 / 降采样RGB565）连同检测结果、穴位输出与分阶段耗时
+# 写到闪存/SD卡，供主机端 host/recording.py 读取并回放进同一条处理流水线
+#
+# 存储：RECORD_SETTINGS['dir'] 下 max_frames 个槽位文件 fNNNN.rec 循环覆盖（有界环形），
+# 每次上电会话号加一（保存在 dir/session），主机端按 (会话号, 帧序号) 还原顺序。
+# 单帧文件格式（小端序）：
+#   头部   '<4sBBIIIHHHI'  魔数 b'RFRM' | 版本 | 图像格式 | 会话号 | 帧序号 | 时间戳ms |
+#                          图像宽 | 图像高 | 元数据字节数 | 图像字节数
+#   元数据 UTF-8 JSON：{'size': [原始宽, 原始高], 'anatomy': {...} 或 null,
+#                      'points': [[ID, x, y, x_mm, y_mm, 压力], ...] 或 null, 'timings': {阶段名: 微秒}}
+#   图像   JPEG 数据，或逐行存放的灰度（1字节）/ RGB565（2字节，小端）像素
+# capture() 在采集后、检测之前编码图像（检测可能原地滤波整帧），record() 在该帧处理完后
+# 补上检测结果与耗时；写文件是分块进行的：poll() 每次最多写 chunk_bytes，
+# 上一帧还没写完时新的帧直接跳过（计入 dropped），任何一次写入都不会拖住一帧。
+import image, json, struct, time, uos
+from config import *
+
+MAGIC = b'RFRM'
+VERSION = 1
+HEADER_FMT = '<4sBBIIIHHHI'
+HEADER_LEN = struct.calcsize(HEADER_FMT)
+FMT_JPEG = 0
+FMT_GRAY = 1
+FMT_RGB565 = 2
+FORMATS = {'jpeg': FMT_JPEG, 'gray': FMT_GRAY, 'rgb565': FMT_RGB565}
+
+class SessionRecorder:
+    def __init__(self):
+        self.enabled = RECORD_SETTINGS['enabled']
+        self.dir = RECORD_SETTINGS['dir']
+        self.fmt = FORMATS[RECORD_SETTINGS['format']]
+        self.seq = 0
+        self.session = 0
+        self._header = bytearray(HEADER_LEN)
+        self._buf = None      # 降采样缓冲（灰度/RGB565），预分配
+        self._captured = None  # capture() 编码好、等待 record() 的 (图像, 宽, 高, 原始宽, 原始高, 时间戳)
+        self._parts = None    # 正在写入的 [头部, 元数据, 图像]
+        self._part = 0
+        self._offset = 0
+        self._file = None
+        self._frames = 0
+        self.stats = {'recorded': 0, 'dropped': 0, 'bytes': 0}
+        if self.enabled:
+            self.session = self._next_session()
+
+    def _next_session(self):
+        try:
+            uos.mkdir(self.dir)
+        except OSError:
+            pass
+        path = self.dir + '/session'
+        try:
+            with open(path) as f:
+                session = int(f.read()) + 1
+        except (OSError, ValueError):
+            session = 1
+        with open(path, 'w') as f:
+            f.write(str(session))
+        return session
+
+    def busy(self):
+        return self._parts is not None
+
+    def capture(self, img, timestamp_ms):
+        """采集后立即编码本帧图像（检测之前，保存的是原始画面），上一帧未写完或未到间隔时跳过"""
+        if not self.enabled:
+            return False
+        self._frames += 1
+        if self._frames < RECORD_SETTINGS['every_n']:
+            return False
+        self._frames = 0
+        if self._parts is not None:
+            self.stats['dropped'] += 1
+            return False
+        payload, w, h = self._encode(img)
+        self._captured = (payload, w, h, img.width(), img.height(), timestamp_ms)
+        return True
+
+    def record(self, anatomy=None, points=None, timings=None):
+        """为 capture() 编码的帧补上检测结果并准备写出（不写文件），本帧未编码时跳过"""
+        if self._captured is None:
+            return False
+        payload, w, h, width, height, timestamp_ms = self._captured
+        self._captured = None
+        meta = {'size': [width, height], 'anatomy': None, 'points': None,
+                'timings': timings or {}}
+        if anatomy:
+            meta['anatomy'] = {'proximal_point': list(anatomy['proximal_point']),
+                               'distal_point': list(anatomy['distal_point']),
+                               'is_vertical': anatomy['is_vertical'],
+                               'arm_length': anatomy['arm_length'],
+                               'tracked': anatomy.get('tracked', False)}
+        if points:
+            meta['points'] = [[points['ids'][i], int(points['x'][i]), int(points['y'][i]),
+                               int(points['x_mm'][i]), int(points['y_mm'][i]), points['pressure'][i]]
+                              for i in range(len(points['ids']))]
+        meta = json.dumps(meta).encode()
+        struct.pack_into(HEADER_FMT, self._header, 0, MAGIC, VERSION, self.fmt, self.session,
+                         self.seq, timestamp_ms, w, h, len(meta), len(payload))
+
+        self._file = open('%s/f%04d.rec' % (self.dir, self.seq % RECORD_SETTINGS['max_frames']), 'wb')
+        self._parts = (self._header, meta, payload)
+        self._part = 0
+        self._offset = 0
+        self.seq += 1
+        return True
+
+    def _encode(self, img):
+        if self.fmt == FMT_JPEG:
+            jpeg = img.compressed(quality=RECORD_SETTINGS['quality'])
+            return jpeg.bytearray(), img.width(), img.height()
+        scale = RECORD_SETTINGS['scale']
+        w = max(1, int(img.width() * scale))
+        h = max(1, int(img.height() * scale))
+        pixformat = image.GRAYSCALE if self.fmt == FMT_GRAY else image.RGB565
+        if self._buf is None or self._buf.width() != w or self._buf.height() != h:
+            self._buf = image.Image(w, h, pixformat)
+        self._buf.draw_image(img, 0, 0, x_size=w, y_size=h, hint=image.AREA)
+        return self._buf.bytearray(), w, h
+
+    def poll(self):
+        """帧间调用：把正在录制的帧写出最多 chunk_bytes 字节，写完后关闭文件"""
+        if self._parts is None:
+            return
+        budget = RECORD_SETTINGS['chunk_bytes']
+        while budget > 0 and self._part < len(self._parts):
+            part = self._parts[self._part]
+            n = min(budget, len(part) - self._offset)
+            self._file.write(memoryview(part)[self._offset:self._offset + n])
+            self._offset += n
+            budget -= n
+            self.stats['bytes'] += n
+            if self._offset >= len(part):
+                self._part += 1
+                self._offset = 0
+        if self._part >= len(self._parts):
+            self._file.close()
+            self._file = None
+            self._parts = None
+            self.stats['recorded'] += 1
+
+    def flush(self):
+        """写完正在录制的帧（停止录制前调用）"""
+        while self._parts is not None:
+            self.poll()
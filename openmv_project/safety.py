@@ -1,5 +1,7 @@
 # -*- coding: utf-8 -*-
-import sensor, pyb
+import sensor, image, pyb
+from config import *
+from logger import log
 
 class SafetyMonitor:
     def __init__(self):
@@ -7,8 +9,17 @@ class SafetyMonitor:
         self.temp_sensor = pyb.ADC(pyb.Pin('P6'))
         self.alert = False
         self.alert_duration = 0  # 新增：记录警报持续时间
+        self.motion_level = 0
+        # 降采样模式下的两块预分配灰度缓冲：参考帧与工作帧，每帧交换
+        self._ref = None
+        self._work = None
+        self._has_ref = False
 
-    def check_motion(self, current_frame):
+    def check_motion(self, current_frame, ctx=None):
+        if MOTION_SETTINGS['downsampled']:
+            if ctx:
+                return self._check_motion_shared(ctx)
+            return self._check_motion_downsampled(current_frame)
         try:  # 新增：添加异常处理
             if self.prev_frame:
                 # 创建副本以避免操作原始帧
@@ -19,29 +30,92 @@ class SafetyMonitor:
                 diff = current_copy.difference(prev_copy)
                 stats = diff.get_statistics()
                 motion_level = stats.l_mean()  # 使用l_mean
+                self.motion_level = motion_level
                 
                 # 调整阈值和添加去抖动
-                if motion_level > 30:  # 稍微提高阈值
-                    self.alert_duration += 1
-                    if self.alert_duration >= 3:  # 需要连续3帧检测到运动
-                        self.alert = True
-                else:
-                    # 逐渐减少警报持续时间，而不是立即重置
-                    self.alert_duration = max(0, self.alert_duration - 1)
-                    if self.alert_duration == 0:
-                        self.alert = False
+                self._debounce(motion_level > 30)  # 稍微提高阈值
             
             # 缓存当前帧以供下次比较使用
             self.prev_frame = current_frame.copy()
             return not self.alert
             
         except Exception as e:
-            print(f"Motion detection error: {e}")
+            log.error("Motion detection error: %s", e)
             # 错误发生时，确保不会无限报警
             self.prev_frame = current_frame.copy()
             self.alert = False
             return True  # 默认返回安全
 
+    def _check_motion_downsampled(self, current_frame):
+        """在预分配的降采样灰度缓冲上做帧差，不产生新的图像分配"""
+        try:
+            scale = MOTION_SETTINGS['scale']
+            w = max(1, int(current_frame.width() * scale))
+            h = max(1, int(current_frame.height() * scale))
+            if self._ref is None or self._ref.width() != w or self._ref.height() != h:
+                self._ref = image.Image(w, h, image.GRAYSCALE)
+                self._work = image.Image(w, h, image.GRAYSCALE)
+                self._has_ref = False
+
+            # 当前帧缩小后写入工作缓冲（RGB565 -> 灰度）
+            self._work.draw_image(current_frame, 0, 0, x_scale=scale, y_scale=scale)
+            if self._has_ref:
+                # 参考帧比较完就不再需要，直接在参考缓冲里求差
+                self._ref.difference(self._work)
+                self.motion_level = self._ref.get_statistics().mean()
+                self._debounce(self.motion_level > MOTION_SETTINGS['threshold'])
+
+            # 交换缓冲：本帧成为下一帧的参考，旧参考缓冲留作下次的工作缓冲
+            self._ref, self._work = self._work, self._ref
+            self._has_ref = True
+            return not self.alert
+
+        except Exception as e:
+            log.error("Motion detection error: %s", e)
+            self._has_ref = False
+            self.alert = False
+            return True
+
+    def _check_motion_shared(self, ctx):
+        """与降采样模式相同，但直接使用每帧上下文里已绘制的缩略图，只保留一块参考缓冲"""
+        try:
+            thumb = ctx.thumbnail()
+            if self._ref is None or self._ref.width() != thumb.width() or self._ref.height() != thumb.height():
+                self._ref = image.Image(thumb.width(), thumb.height(), image.GRAYSCALE)
+                self._has_ref = False
+
+            if self._has_ref:
+                self._ref.difference(thumb)
+                self.motion_level = self._ref.get_statistics().mean()
+                self._debounce(self.motion_level > MOTION_SETTINGS['threshold'])
+
+            # 缩略图归上下文所有，拷贝一份作为下一帧的参考
+            self._ref.draw_image(thumb, 0, 0)
+            self._has_ref = True
+            return not self.alert
+
+        except Exception as e:
+            log.error("Motion detection error: %s", e)
+            self._has_ref = False
+            self.alert = False
+            return True
+
+    def _debounce(self, moving):
+        if moving:
+            self.alert_duration += 1
+            if self.alert_duration >= 3:  # 需要连续3帧检测到运动
+                self.alert = True
+        else:
+            # 逐渐减少警报持续时间，而不是立即重置
+            self.alert_duration = max(0, self.alert_duration - 1)
+            if self.alert_duration == 0:
+                self.alert = False
+
+    def state(self):
+        """运动检测的当前状态：(alert, alert_duration, 下一帧比较用的参考图像或None)"""
+        ref = self._ref if self._has_ref else self.prev_frame
+        return self.alert, self.alert_duration, ref
+
     def check_temperature(self):
         temp = self.temp_sensor.read() * 3.3 / 4096 * 100  # 转换为℃
         if temp > 60:
@@ -51,5 +125,6 @@ class SafetyMonitor:
     def reset(self):
         self.alert = False
         self.alert_duration = 0  # 新增：同时重置持续时间
+        self._has_ref = False  # 降采样模式下同样重新开始比较
         if self.prev_frame:
             self.prev_frame = None  # 清除之前的帧，强制重新开始比较
\ No newline at end of file
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+# 按时间预算调度主循环：廉价阶段（曝光、运动检测、穴位输出）每帧运行，
+# 昂贵的检测阶段按实测耗时降频，使平均帧时间落在 1000/target_fps 之内。
+#
+# 检测间隔 k 取满足  base + detect / k <= budget  的最小整数，
+# base 为每帧除检测外的平均耗时，detect 为单次检测的平均耗时，均为指数滑动平均，
+# 因此间隔随负载平滑变化，不会像逐帧 ±1 调整 frame_skip 那样来回振荡。
+import time
+from config import *
+
+class FrameScheduler:
+    def __init__(self):
+        self.budget_us = 1000000 // PERF_SETTINGS['target_fps']
+        self.interval = 1          # 当前检测间隔（帧）
+        self._since = 0            # 距上次检测的帧数
+        self._base_us = 0          # 每帧除检测外的平均耗时
+        self._detect_us = 0        # 单次检测的平均耗时
+        self._frame_start = None
+        self._frame_detect = 0     # 本帧检测耗时
+        self._t = 0
+        self.stats = {'frames': 0, 'detections': 0}
+
+    def begin_frame(self):
+        """每帧开始（snapshot 之前）调用，用相邻两帧的间隔更新基础耗时"""
+        now = time.ticks_us()
+        if self._frame_start is not None:
+            period = time.ticks_diff(now, self._frame_start)
+            self._base_us = self._ema(self._base_us, max(0, period - self._frame_detect))
+        self._frame_start = now
+        self._frame_detect = 0
+        self._since += 1
+        self.stats['frames'] += 1
+
+    def detect_due(self):
+        """本帧是否应运行检测阶段"""
+        fixed = SCHED_SETTINGS['fixed_interval']
+        return self._since >= (fixed if fixed > 0 else self.interval)
+
+    def begin_detect(self):
+        self._t = time.ticks_us()
+
+    def end_detect(self):
+        cost = max(0, time.ticks_diff(time.ticks_us(), self._t))
+        self._frame_detect = cost
+        self._detect_us = self._ema(self._detect_us, cost)
+        self._since = 0
+        self.stats['detections'] += 1
+        self._update_interval()
+
+    def _update_interval(self):
+        max_interval = SCHED_SETTINGS['max_interval']
+        spare = self.budget_us - self._base_us
+        if spare <= 0:
+            self.interval = max_interval
+        else:
+            self.interval = min(max_interval, max(1, (self._detect_us + spare - 1) // spare))
+
+    def _ema(self, old, sample):
+        if old == 0:
+            return sample
+        a = SCHED_SETTINGS['ema']
+        return int(old + a * (sample - old))
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+# 手臂跟踪：在两次完整检测之间用α-β（常速度）滤波器预测手臂端点
+import math
+from config import *
+from vision import ArmContour
+
+class ArmTracker:
+    def __init__(self, analyzer):
+        self.analyzer = analyzer
+        # 状态：[近端x, 近端y, 远端x, 远端y] 的位置与速度（像素/处理帧）
+        self.pos = None
+        self.vel = [0.0, 0.0, 0.0, 0.0]
+        self._steps = 0  # 自上次测量以来的预测步数（含 coast 外推的帧）
+        self.confidence = 0.0
+        self.since_detect = 0
+        self.thresholds = None
+        self.contour = None
+        self.is_vertical = True
+        self.frame_size = (0, 0)
+        # 统计：完整检测、跟踪成功、局部校验失败次数
+        self.stats = {'detections': 0, 'tracked': 0, 'misses': 0}
+
+    def reset(self):
+        self.pos = None
+        self.vel = [0.0, 0.0, 0.0, 0.0]
+        self._steps = 0
+        self.confidence = 0.0
+        self.since_detect = 0
+        self.contour = None
+
+    def process(self, img, roi=None, ctx=None):
+        """返回本帧的手臂结构：按计划或置信度不足时完整检测，否则预测+局部校验"""
+        if (self.pos is None or self.confidence < TRACK_SETTINGS['min_confidence']
+                or self.since_detect >= TRACK_SETTINGS['redetect_interval']):
+            return self._detect(img, roi, ctx)
+
+        self.since_detect += 1
+        prev_mid = self._midpoint()
+        self._predict()
+        measurement = self._verify(img)
+        if measurement:
+            self._correct(measurement)
+            self.confidence = min(1.0, self.confidence + 0.2)
+            self.stats['tracked'] += 1
+        else:
+            self.confidence *= TRACK_SETTINGS['miss_decay']
+            self.stats['misses'] += 1
+            if self.confidence < TRACK_SETTINGS['min_confidence']:
+                return self._detect(img, roi, ctx)
+
+        # 轮廓随中点平移，保持检测时得到的尺寸
+        mid = self._midpoint()
+        c = self.contour
+        self.contour = ArmContour(int(c.x() + mid[0] - prev_mid[0]), int(c.y() + mid[1] - prev_mid[1]),
+                                  c.w(), c.h())
+        return self._anatomy(True)
+
+    def restore(self, endpoints, frame_size):
+        """快速启动：以上次保存的端点作为初始状态，置信度为0，下一帧仍做完整检测"""
+        self.reset()
+        self.frame_size = frame_size
+        self.pos = [float(v) for v in endpoints]
+        self._clamp()
+
+    def coast(self):
+        """调度器跳过检测的帧：只做一步α-β外推，不读取图像"""
+        if self.pos is None or self.contour is None:
+            return None
+        prev_mid = self._midpoint()
+        self._predict()
+        mid = self._midpoint()
+        c = self.contour
+        self.contour = ArmContour(int(c.x() + mid[0] - prev_mid[0]), int(c.y() + mid[1] - prev_mid[1]),
+                                  c.w(), c.h())
+        return self._anatomy(True)
+
+    def _detect(self, img, roi, ctx=None):
+        anatomy = self.analyzer.detect_anatomy(img, roi, ctx)
+        self.stats['detections'] += 1
+        self.frame_size = (img.width(), img.height())
+        if not anatomy or anatomy.get('default'):
+            self.reset()  # 默认位置不作为跟踪的初始状态
+            return anatomy
+
+        p = anatomy['proximal_point']
+        d = anatomy['distal_point']
+        measurement = [p[0], p[1], d[0], d[1]]
+        if self.pos is None:
+            self.pos = [float(v) for v in measurement]
+            self.vel = [0.0, 0.0, 0.0, 0.0]
+            self._steps = 0
+        else:
+            self._predict()
+            # 检测器按上/左排序端点，方向判断翻转时端点可能互换
+            swapped = [measurement[2], measurement[3], measurement[0], measurement[1]]
+            if self._distance(swapped) < self._distance(measurement):
+                measurement = swapped
+            if self._distance(measurement) > TRACK_SETTINGS['reset_distance']:
+                self.pos = [float(v) for v in measurement]
+                self.vel = [0.0, 0.0, 0.0, 0.0]
+                self._steps = 0
+            else:
+                self._correct(measurement)
+
+        self.confidence = 1.0
+        self.since_detect = 0
+        self.is_vertical = anatomy['is_vertical']
+        self.contour = anatomy['contour']
+        self.thresholds = self.analyzer._dynamic_skin_threshold(img, ctx)
+        return self._anatomy(False)
+
+    def _predict(self):
+        for i in range(4):
+            self.pos[i] += self.vel[i]
+        self._steps += 1
+        self._clamp()
+
+    def _correct(self, measurement):
+        # 残差累积了自上次测量以来的全部外推步数，速度按每步修正，调度间隔大于1时不过冲
+        alpha = TRACK_SETTINGS['alpha']
+        beta = TRACK_SETTINGS['beta'] / max(1, self._steps)
+        for i in range(4):
+            r = measurement[i] - self.pos[i]
+            self.pos[i] += alpha * r
+            self.vel[i] += beta * r
+        self._steps = 0
+        self._clamp()
+
+    def _clamp(self):
+        # 外推不能把端点推出画面
+        w, h = self.frame_size
+        for i in (0, 2):
+            self.pos[i] = min(max(self.pos[i], 0.0), w - 1.0)
+            self.pos[i + 1] = min(max(self.pos[i + 1], 0.0), h - 1.0)
+
+    def _distance(self, measurement):
+        # 两个端点位移中的较大者
+        return max(math.sqrt((measurement[0] - self.pos[0]) ** 2 + (measurement[1] - self.pos[1]) ** 2),
+                   math.sqrt((measurement[2] - self.pos[2]) ** 2 + (measurement[3] - self.pos[3]) ** 2))
+
+    def _midpoint(self):
+        return ((self.pos[0] + self.pos[2]) / 2, (self.pos[1] + self.pos[3]) / 2)
+
+    def _verify(self, img):
+        """在预测位置附近找肤色色块，返回沿法向修正后的端点；找不到返回None"""
+        margin = TRACK_SETTINGS['search_margin']
+        x0 = max(0, int(min(self.pos[0], self.pos[2])) - margin)
+        y0 = max(0, int(min(self.pos[1], self.pos[3])) - margin)
+        x1 = min(img.width(), int(max(self.pos[0], self.pos[2])) + margin)
+        y1 = min(img.height(), int(max(self.pos[1], self.pos[3])) + margin)
+        if x1 - x0 < 4 or y1 - y0 < 4:
+            return None
+
+        blobs = img.find_blobs(self.thresholds, roi=(x0, y0, x1 - x0, y1 - y0),
+                               x_stride=4, y_stride=2,
+                               pixels_threshold=TRACK_SETTINGS['min_pixels'],
+                               area_threshold=TRACK_SETTINGS['min_pixels'],
+                               merge=True, margin=10)
+        if not blobs:
+            return None
+        blob = max(blobs, key=lambda b: b.pixels())
+
+        # 窗口会截断手臂两端，质心只在垂直于手臂的方向上可靠
+        dx = self.pos[2] - self.pos[0]
+        dy = self.pos[3] - self.pos[1]
+        length = math.sqrt(dx * dx + dy * dy)
+        if length < 1:
+            return None
+        nx, ny = -dy / length, dx / length
+        mid = self._midpoint()
+        offset = (blob.cx() - mid[0]) * nx + (blob.cy() - mid[1]) * ny
+        if abs(offset) > TRACK_SETTINGS['max_offset']:
+            return None
+        return [self.pos[0] + offset * nx, self.pos[1] + offset * ny,
+                self.pos[2] + offset * nx, self.pos[3] + offset * ny]
+
+    def _anatomy(self, tracked):
+        proximal_point = (int(self.pos[0]), int(self.pos[1]))
+        distal_point = (int(self.pos[2]), int(self.pos[3]))
+        return {
+            'proximal_point': proximal_point,
+            'distal_point': distal_point,
+            'is_vertical': self.is_vertical,
+            'arm_length': math.sqrt((distal_point[0] - proximal_point[0]) ** 2 +
+                                    (distal_point[1] - proximal_point[1]) ** 2),
+            'contour': self.contour,
+            'tracked': tracked
+        }
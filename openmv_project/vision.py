@@ -1,55 +1,82 @@
 # -*- coding: utf-8 -*-
-import sensor, image, math, pyb
+import sensor, image, math, pyb, time
 from config import *
 import ml, uos, gc
 from ulab import numpy as np
 import json  # 确保导入json模块
+from profiler import profiler, STAGE_INFER, STAGE_EDGES, STAGE_BLOBS
+from acudb import AcuTable, load_acu_table
+from overlay import overlay
+from logger import log, LOG_DEBUG
+
+# 模拟的contour对象，用于向后兼容（AI路径没有真实的blob）
+class ArmContour:
+    def __init__(self, x, y, w, h, cx=None, cy=None):
+        self._x = x
+        self._y = y
+        self._w = w
+        self._h = h
+        self._cx = x + w // 2 if cx is None else cx
+        self._cy = y + h // 2 if cy is None else cy
+
+    def x(self): return self._x
+    def y(self): return self._y
+    def w(self): return self._w
+    def h(self): return self._h
+    def cx(self): return self._cx
+    def cy(self): return self._cy
+    def rect(self): return (self._x, self._y, self._w, self._h)
+    def area(self): return self._w * self._h
 
 class ArmAnalyzer:
-    def __init__(self):
+    def __init__(self, cm_per_pixel=None, lazy_model=False):
+        # cm_per_pixel: 快速启动时由状态文件给出，省去解析 calibration.json
+        # lazy_model: 不在构造时加载模型，由 maybe_load_model() 在之后的帧加载，
+        #             加载前 detect_anatomy 使用传统肤色色块检测
         self.cm_per_pixel = 0.05
-        self.load_calibration()
+        if cm_per_pixel:
+            self.cm_per_pixel = cm_per_pixel
+        else:
+            self.load_calibration()
         # 加载Edge Impulse模型
         self.net = None
         self.labels = None
-        self.load_ei_model()
-        
-        # 定义穴位在手臂上的相对位置（比例）
-        self.acupoint_relative_positions = {
-            "LI11": 0.15,  # 肘关节附近，距离肘部约15%的手臂长度
-            "PC3": 0.25,   # 肘窝区域，距离肘部约25%的手臂长度
-            "HT7": 0.9,    # 腕关节附近，距离肘部约90%的手臂长度
-        }
+        self.model_pending = lazy_model
+        self._boot_frames = 0
+        if not lazy_model:
+            self.load_ei_model()
+
+        # 轴线估计用的预分配降采样缓冲（RGB565，按需创建）
+        self._axis_buf = None
+        # 色块检测的滤波缓冲（RGB565），只在区域超出容量时扩大
+        self._blob_buf = None
+        # 模型输入缓冲：尺寸与模型输入一致，每次推理原地重绘
+        self._input_buf = None
+
+        # 推理缓存：场景签名（降采样缩略图）未明显变化时复用上次的识别结果
+        self.infer_cache = None  # (签名, 最佳预测, 时间戳)
+        self.infer_stats = {'hits': 0, 'misses': 0}
         
-        # 内部穴位数据库，用于在config导入失败时的备选方案
-        self.internal_acu_db = {
-            "LI11": {
-                "name": "曲池",
-                "offset_cm": (0.5, 0),
-                "depth_cm": 1.2,
-                "pressure": 80
-            },
-            "PC3": {
-                "name": "曲泽",
-                "offset_cm": (0.5, 0.5),
-                "depth_cm": 0.8,
-                "pressure": 70
-            },
-            "HT7": {
-                "name": "神门",
-                "offset_cm": (0.0, -1.0),
-                "depth_cm": 0.5,
-                "pressure": 60
-            }
-        }
+        # 穴位表（相对位置、偏移、深度按分段索引），优先使用编译好的二进制表
+        self.acu_table = load_acu_table()
+
+        # 批量穴位求解用的预计算数组（按分段缓存），穴位表或 cm_per_pixel 变化时重建
+        self._geom = {}
+        self._geom_db = ACU_DB
+        self._geom_db_len = len(ACU_DB)
+        self._geom_cpp = None
 
     def load_calibration(self):
         try:
             with open('calibration.json', 'r') as f:
                 calib = json.load(f)
                 self.cm_per_pixel = calib['cm_per_pixel']
+                # 标定分辨率与运行分辨率不同时按宽度换算（旧文件没有 resolution 字段）
+                res = calib.get('resolution')
+                if res and res[0] != CAM_SETTINGS['resolution'][0]:
+                    self.cm_per_pixel *= res[0] / CAM_SETTINGS['resolution'][0]
         except Exception as e:
-            print(f"Using default calibration: {e}")
+            log.warn("Using default calibration: %s", e)
 
     def load_ei_model(self):
         # 尝试加载Edge Impulse模型和标签
@@ -57,51 +84,97 @@ class ArmAnalyzer:
             # 如果可用内存足够，加载模型到堆上，否则加载到FB
             self.net = ml.Model("trained.tflite", load_to_fb=uos.stat('trained.tflite')[6] > (gc.mem_free() - (64*1024)))
             self.labels = [line.rstrip('\n') for line in open("labels.txt")]
-            print("Edge Impulse model loaded successfully")
+            log.info("Edge Impulse model loaded successfully")
         except Exception as e:
-            print(f"Could not load Edge Impulse model: {e}")
-            print("Falling back to traditional vision methods")
+            log.warn("Could not load Edge Impulse model: %s", e)
+            log.warn("Falling back to traditional vision methods")
+
+    def maybe_load_model(self, force=False):
+        """延迟加载模型：force 为True或已处理 model_after_frames 帧后加载一次"""
+        if not self.model_pending:
+            return False
+        self._boot_frames += 1
+        if not force and self._boot_frames < BOOT_SETTINGS['model_after_frames']:
+            return False
+        self.model_pending = False
+        self.load_ei_model()
+        return True
+
+    def detect_anatomy(self, img, roi=None, ctx=None):
+        # roi: 跟踪区域 (x, y, w, h)，给定时边缘/色块检测只在该区域内进行，
+        # 返回的坐标仍然是整帧坐标
+        # ctx: 每帧共享上下文（FrameContext），给定时肤色阈值复用其亮度统计
+        if roi:
+            ox, oy, region_w, region_h = roi
+        else:
+            ox, oy, region_w, region_h = 0, 0, img.width(), img.height()
 
-    def detect_anatomy(self, img):
         # 首先尝试使用AI模型识别手臂
         arm_detected = False
         if self.net and self.labels:
             try:
-                # 使用Edge Impulse模型预测
-                predictions = self.net.predict([img])[0].flatten().tolist()
-                predictions_list = list(zip(self.labels, predictions))
-                
-                # 添加输出每个标签的置信度
-                print("AI 预测结果:")
-                for label, confidence in predictions_list:
-                    print(f"{label}: {confidence:.3f}")
-                
-                # 找出置信度最高的预测结果
-                best_prediction = max(predictions_list, key=lambda x: x[1])
+                profiler.begin(STAGE_INFER)
+                try:
+                    best_prediction = self._classify(img, roi)
+                finally:
+                    profiler.end(STAGE_INFER)
                 
                 # 如果是"arm"类别且置信度超过阈值
                 if ("arm" in best_prediction[0].lower() or "手臂" in best_prediction[0]) and best_prediction[1] > 0.6:
                     arm_detected = True
                     # 在图像上标记识别结果
-                    img.draw_string(5, 5, f"{best_prediction[0]}: {best_prediction[1]:.2f}", color=(0, 255, 0))
+                    if overlay.active:
+                        overlay.text(5, 5, f"{best_prediction[0]}: {best_prediction[1]:.2f}", (0, 255, 0))
                     
-                print(f"手臂识别状态: {arm_detected}")
+                log.debug("手臂识别状态: %s", arm_detected)
                 
             except Exception as e:
-                print(f"Error during AI inference: {e}")
+                log.error("Error during AI inference: %s", e)
         
         # 创建解剖结构字典
         anatomy = {}
         
-        if arm_detected:
+        if arm_detected and AXIS_SETTINGS['method'] == 'moments':
+            # 在降采样层上用肤色掩膜的矩估计手臂轴线，代替整帧 Canny + Hough
+            profiler.begin(STAGE_EDGES)
+            axis = self._estimate_axis(img, roi, ctx)
+            profiler.end(STAGE_EDGES)
+            if axis:
+                proximal_point, distal_point, contour = axis
+                anatomy['proximal_point'] = proximal_point
+                anatomy['distal_point'] = distal_point
+                anatomy['is_vertical'] = abs(distal_point[1] - proximal_point[1]) > abs(distal_point[0] - proximal_point[0])
+                anatomy['arm_length'] = math.sqrt((distal_point[0] - proximal_point[0])**2 +
+                                                  (distal_point[1] - proximal_point[1])**2)
+                anatomy['contour'] = contour
+                overlay.line(proximal_point[0], proximal_point[1],
+                             distal_point[0], distal_point[1], (0, 255, 0), 2)
+            elif roi:
+                return None  # ROI内没有手臂：由主循环扩大ROI，不在ROI中心假设默认位置
+            else:
+                # 没有肤色区域时与 Hough 路径一样，退回画面中心的默认位置
+                center_x = ox + region_w // 2
+                center_y = oy + region_h // 4
+                anatomy['proximal_point'] = (center_x, center_y)
+                anatomy['distal_point'] = (center_x, center_y + region_h // 2)
+                anatomy['is_vertical'] = True
+                anatomy['arm_length'] = region_h // 2
+                anatomy['contour'] = ArmContour(center_x - 20, center_y, 40, region_h // 2)
+                anatomy['default'] = True  # 假设的默认位置，不是实际检测结果
+                overlay.line(center_x, center_y, center_x, center_y + region_h // 2,
+                             (255, 0, 0), 2)
+        elif arm_detected:
             # 使用边缘检测来确定手臂方向
-            edges = img.copy()
-            edges.gaussian(1)
-            edges.find_edges(image.EDGE_CANNY, threshold=(50, 150))
-            
-            # 寻找最长的线作为手臂方向的指示
             try:
-                lines = edges.find_lines(threshold=1000, theta_margin=40, rho_margin=40)
+                profiler.begin(STAGE_EDGES)
+                try:
+                    edges = img.copy(roi=roi)
+                    edges.gaussian(1)
+                    edges.find_edges(image.EDGE_CANNY, threshold=(50, 150))
+                    # 寻找最长的线作为手臂方向的指示
+                    lines = edges.find_lines(threshold=1000, theta_margin=40, rho_margin=40)
+                finally:
+                    profiler.end(STAGE_EDGES)  # 出错时同样结束计时
                 
                 if lines and len(lines) > 0:
                     # 找出最长的线
@@ -113,19 +186,19 @@ class ArmAnalyzer:
                     # 设置手臂的端点
                     # 确保近端点是上方/左侧点，远端点是下方/右侧点
                     if (is_vertical and longest_line.y1() > longest_line.y2()) or (not is_vertical and longest_line.x1() > longest_line.x2()):
-                        proximal_point = (longest_line.x2(), longest_line.y2())
-                        distal_point = (longest_line.x1(), longest_line.y1())
+                        proximal_point = (longest_line.x2() + ox, longest_line.y2() + oy)
+                        distal_point = (longest_line.x1() + ox, longest_line.y1() + oy)
                     else:
-                        proximal_point = (longest_line.x1(), longest_line.y1())
-                        distal_point = (longest_line.x2(), longest_line.y2())
+                        proximal_point = (longest_line.x1() + ox, longest_line.y1() + oy)
+                        distal_point = (longest_line.x2() + ox, longest_line.y2() + oy)
                     
                     # 计算手臂长度
                     arm_length = math.sqrt((distal_point[0] - proximal_point[0])**2 + 
                                          (distal_point[1] - proximal_point[1])**2)
                     
                     # 在图像上绘制检测到的手臂线条
-                    img.draw_line(proximal_point[0], proximal_point[1], 
-                                distal_point[0], distal_point[1], color=(0, 255, 0), thickness=2)
+                    overlay.line(proximal_point[0], proximal_point[1], 
+                                 distal_point[0], distal_point[1], (0, 255, 0), 2)
                     
                     anatomy['proximal_point'] = proximal_point
                     anatomy['distal_point'] = distal_point
@@ -133,19 +206,6 @@ class ArmAnalyzer:
                     anatomy['arm_length'] = arm_length
                     
                     # 创建一个模拟的contour对象，用于向后兼容
-                    class ArmContour:
-                        def __init__(self, x, y, w, h):
-                            self._x = x
-                            self._y = y
-                            self._w = w
-                            self._h = h
-                            
-                        def x(self): return self._x
-                        def y(self): return self._y
-                        def w(self): return self._w
-                        def h(self): return self._h
-                        def area(self): return self._w * self._h
-                    
                     # 计算包围手臂的矩形区域
                     min_x = min(proximal_point[0], distal_point[0])
                     min_y = min(proximal_point[1], distal_point[1])
@@ -157,14 +217,16 @@ class ArmAnalyzer:
                     height = max(10, height)
                     
                     anatomy['contour'] = ArmContour(min_x, min_y, width, height)
+                elif roi:
+                    return None  # 同上：ROI内没有检测到线条
                 else:
-                    # 如果没有检测到线条，则使用图像中心区域作为默认的手臂位置
-                    img_width = img.width()
-                    img_height = img.height()
+                    # 如果没有检测到线条，则使用画面中心作为默认的手臂位置
+                    img_width = region_w
+                    img_height = region_h
                     
                     # 默认假设手臂是垂直的
-                    center_x = img_width // 2
-                    center_y = img_height // 4
+                    center_x = ox + img_width // 2
+                    center_y = oy + img_height // 4
                     
                     proximal_point = (center_x, center_y)
                     distal_point = (center_x, center_y + img_height // 2)
@@ -172,8 +234,8 @@ class ArmAnalyzer:
                     arm_length = img_height // 2
                     
                     # 在图像上绘制默认的手臂线条
-                    img.draw_line(proximal_point[0], proximal_point[1], 
-                               distal_point[0], distal_point[1], color=(255, 0, 0), thickness=2)
+                    overlay.line(proximal_point[0], proximal_point[1], 
+                                 distal_point[0], distal_point[1], (255, 0, 0), 2)
                     
                     anatomy['proximal_point'] = proximal_point
                     anatomy['distal_point'] = distal_point
@@ -182,14 +244,17 @@ class ArmAnalyzer:
                     
                     # 创建模拟的contour
                     anatomy['contour'] = ArmContour(center_x - 20, center_y, 40, arm_length)
+                    anatomy['default'] = True  # 假设的默认位置，不是实际检测结果
             except Exception as e:
-                print(f"Error detecting arm direction: {e}")
+                log.error("Error detecting arm direction: %s", e)
+                if roi:
+                    return None
                 # 使用默认的垂直手臂位置
-                img_width = img.width()
-                img_height = img.height()
+                img_width = region_w
+                img_height = region_h
                 
-                center_x = img_width // 2
-                center_y = img_height // 4
+                center_x = ox + img_width // 2
+                center_y = oy + img_height // 4
                 
                 proximal_point = (center_x, center_y)
                 distal_point = (center_x, center_y + img_height // 2)
@@ -201,16 +266,32 @@ class ArmAnalyzer:
                 anatomy['is_vertical'] = is_vertical
                 anatomy['arm_length'] = arm_length
                 anatomy['contour'] = ArmContour(center_x - 20, center_y, 40, arm_length)
+                anatomy['default'] = True  # 假设的默认位置，不是实际检测结果
         else:
             # 使用传统方法进行手臂检测
-            img.gaussian(1)
+            # ROI模式下只把跟踪区域画进预分配缓冲做滤波，不再处理整帧；
+            # 整帧检测或ROI超过半帧时直接在帧缓冲上原地滤波，缓冲最多半帧大小
+            # （模型输入已在上面生成，录制的画面在检测之前由 recorder.capture 编码）
+            profiler.begin(STAGE_BLOBS)
+            if roi and region_w * region_h * 2 <= img.width() * img.height():
+                work = self._region_buffer(img, roi)
+                work_roi = (0, 0, region_w, region_h)
+            else:
+                work = img
+                work_roi = roi
+            work.gaussian(1)
             
             # 自适应肤色检测
-            thresholds = self._dynamic_skin_threshold(img)
-            blobs = img.find_blobs(thresholds,
+            if ctx:
+                thresholds = self._dynamic_skin_threshold(img, ctx, roi)
+            else:
+                thresholds = self._dynamic_skin_threshold(work, roi=work_roi)
+            blobs = work.find_blobs(thresholds,
+                                 roi=work_roi,
                                  area_threshold=2000,
                                  merge=True,
                                  margin=10)
+            profiler.end(STAGE_BLOBS)
             
             if not blobs:
                 return None
@@ -220,6 +301,11 @@ class ArmAnalyzer:
             if arm.w() / arm.h() < 0.3 or arm.w() / arm.h() > 3:
                 return None
             
+            # 将缓冲中的色块坐标换算回整帧坐标
+            if work is not img:
+                arm = ArmContour(arm.x() + ox, arm.y() + oy, arm.w(), arm.h(),
+                                 arm.cx() + ox, arm.cy() + oy)
+            
             # 确定手臂方向
             is_vertical = arm.h() > arm.w()
             
@@ -234,9 +320,9 @@ class ArmAnalyzer:
                 arm_length = arm.w()
             
             # 在图像上绘制检测到的手臂轮廓
-            img.draw_rectangle(arm.rect(), color=(255, 0, 0))
-            img.draw_line(proximal_point[0], proximal_point[1], 
-                       distal_point[0], distal_point[1], color=(0, 255, 0), thickness=2)
+            overlay.rect(arm.rect(), (255, 0, 0))
+            overlay.line(proximal_point[0], proximal_point[1], 
+                         distal_point[0], distal_point[1], (0, 255, 0), 2)
             
             anatomy['proximal_point'] = proximal_point
             anatomy['distal_point'] = distal_point
@@ -245,28 +331,335 @@ class ArmAnalyzer:
             anatomy['contour'] = arm
             
         # 在图像上标记近端点和远端点
-        img.draw_cross(anatomy['proximal_point'][0], anatomy['proximal_point'][1], color=(255, 0, 0), size=10)
-        img.draw_cross(anatomy['distal_point'][0], anatomy['distal_point'][1], color=(0, 0, 255), size=10)
+        overlay.cross(anatomy['proximal_point'][0], anatomy['proximal_point'][1], (255, 0, 0), 10)
+        overlay.cross(anatomy['distal_point'][0], anatomy['distal_point'][1], (0, 0, 255), 10)
         
-        print(f"手臂检测结果: 近端点={anatomy['proximal_point']}, 远端点={anatomy['distal_point']}, 长度={anatomy['arm_length']}")
+        log.debug("手臂检测结果: 近端点=%s, 远端点=%s, 长度=%s",
+                  anatomy['proximal_point'], anatomy['distal_point'], anatomy['arm_length'])
         
         return anatomy
 
-    def _dynamic_skin_threshold(self, img):
+    def _estimate_axis(self, img, roi=None, ctx=None):
+        """估计手臂轴线，返回 (近端点, 远端点, 轮廓)，没有肤色区域时返回None
+
+        先把检测区域按 AXIS_SETTINGS['scale'] 缩小到预分配缓冲里找肤色色块，
+        用色块的二阶矩（主轴方向）和质心确定轴线；refine 时再在整帧分辨率下
+        只对粗略结果附近的窗口重新求一次色块。端点取轴线与色块外接矩形的交点。
+        """
+        s = AXIS_SETTINGS['scale']
+        if roi:
+            ox, oy, rw, rh = roi
+        else:
+            ox, oy, rw, rh = 0, 0, img.width(), img.height()
+        bw = max(1, int(img.width() * s))
+        bh = max(1, int(img.height() * s))
+        if self._axis_buf is None or self._axis_buf.width() != bw or self._axis_buf.height() != bh:
+            self._axis_buf = image.Image(bw, bh, image.RGB565)
+        buf = self._axis_buf
+        buf.draw_image(img, 0, 0, x_scale=s, y_scale=s, roi=roi, hint=image.AREA)  # 区域平均，抑制噪声
+
+        if ctx:
+            thresholds = self._dynamic_skin_threshold(img, ctx, roi)
+        else:
+            thresholds = self._dynamic_skin_threshold(img, roi=roi)
+        min_pixels = AXIS_SETTINGS['min_pixels']
+        blobs = buf.find_blobs(thresholds, roi=(0, 0, min(bw, max(1, int(rw * s))), min(bh, max(1, int(rh * s)))),
+                               x_stride=1, pixels_threshold=min_pixels, area_threshold=min_pixels,
+                               merge=True, margin=2)
+        if not blobs:
+            return None
+        blob = max(blobs, key=lambda b: b.pixels())
+
+        # 粗略结果换算回整帧坐标
+        x0 = ox + int(blob.x() / s)
+        y0 = oy + int(blob.y() / s)
+        rect = (x0, y0, min(img.width() - x0, int(blob.w() / s) + 1), min(img.height() - y0, int(blob.h() / s) + 1))
+        cx = ox + blob.cxf() / s
+        cy = oy + blob.cyf() / s
+        angle = blob.rotation()
+
+        if AXIS_SETTINGS['refine']:
+            margin = AXIS_SETTINGS['refine_margin']
+            window = self._clamp_roi(rect[0] - margin, rect[1] - margin,
+                                     rect[0] + rect[2] + margin, rect[1] + rect[3] + margin, img)
+            fine_pixels = int(min_pixels / (s * s))
+            fine = img.find_blobs(thresholds, roi=window, x_stride=2,
+                                  pixels_threshold=fine_pixels // 2, area_threshold=fine_pixels,
+                                  merge=True, margin=10)
+            if fine:
+                blob = max(fine, key=lambda b: b.pixels())
+                rect = blob.rect()
+                cx = blob.cxf()
+                cy = blob.cyf()
+                angle = blob.rotation()
+
+        # 过质心、沿主轴方向的直线与外接矩形求交，得到两个端点
+        dx = math.cos(angle)
+        dy = math.sin(angle)
+        x1 = rect[0] + rect[2] - 1
+        y1 = rect[1] + rect[3] - 1
+        t_pos = t_neg = 1e9
+        if abs(dx) > 1e-6:
+            a = (x1 - cx) / dx
+            b = (rect[0] - cx) / dx
+            t_pos = min(t_pos, max(a, b))
+            t_neg = min(t_neg, -min(a, b))
+        if abs(dy) > 1e-6:
+            a = (y1 - cy) / dy
+            b = (rect[1] - cy) / dy
+            t_pos = min(t_pos, max(a, b))
+            t_neg = min(t_neg, -min(a, b))
+        p = (int(cx + t_pos * dx), int(cy + t_pos * dy))
+        q = (int(cx - t_neg * dx), int(cy - t_neg * dy))
+
+        # 确保近端点是上方/左侧点，远端点是下方/右侧点
+        if abs(p[1] - q[1]) > abs(p[0] - q[0]):
+            proximal_point, distal_point = (p, q) if p[1] <= q[1] else (q, p)
+        else:
+            proximal_point, distal_point = (p, q) if p[0] <= q[0] else (q, p)
+        contour = ArmContour(rect[0], rect[1], rect[2], rect[3], int(cx), int(cy))
+        return proximal_point, distal_point, contour
+
+    def _model_input(self, img, roi=None):
+        """把检测区域按模型输入的宽高比裁剪，缩放进预分配的输入缓冲
+
+        有跟踪ROI时以ROI中心（外扩 crop_margin）裁一块与模型输入同宽高比的区域，
+        没有ROI时与 ei_image_classification.py 的开窗一致，取画面中央最大的同比例区域；
+        区域超出画面时缩小到画面能容纳的最大尺寸，因此送入模型的图像不会变形。
+        """
+        shape = self.net.input_shape[0]  # (1, 高, 宽, 通道)
+        in_h, in_w = shape[1], shape[2]
+        if self._input_buf is None:
+            self._input_buf = image.Image(in_w, in_h, image.RGB565 if shape[3] == 3 else image.GRAYSCALE)
+        img_w, img_h = img.width(), img.height()
+
+        if roi and INFER_SETTINGS['crop']:
+            margin = INFER_SETTINGS['crop_margin']
+            w = roi[2] + 2 * margin
+            h = roi[3] + 2 * margin
+            cx = roi[0] + roi[2] // 2
+            cy = roi[1] + roi[3] // 2
+        else:
+            w, h = img_w, img_h
+            cx, cy = img_w // 2, img_h // 2
+        # 扩成与模型输入相同的宽高比，再缩到画面以内
+        if w * in_h > h * in_w:
+            h = w * in_h // in_w
+        else:
+            w = h * in_w // in_h
+        if w > img_w:
+            h = h * img_w // w
+            w = img_w
+        if h > img_h:
+            w = w * img_h // h
+            h = img_h
+        x0 = min(max(0, cx - w // 2), img_w - w)
+        y0 = min(max(0, cy - h // 2), img_h - h)
+        self._input_buf.draw_image(img, 0, 0, x_size=in_w, y_size=in_h, roi=(x0, y0, w, h), hint=image.AREA)
+        return self._input_buf
+
+    def _decode_output(self, out):
+        """从输出张量取置信度最高的 (标签, 置信度)，不展开成列表"""
+        best = int(np.argmax(out))
+        if len(self.net.output_shape[0]) == 2:
+            confidence = float(out[0][best])
+        else:
+            confidence = float(out[best])
+        return (self.labels[best], confidence)
+
+    def _classify(self, img, roi=None):
+        """返回置信度最高的 (标签, 置信度)；场景未变化且未超时则直接用缓存"""
+        signature = None
+        if INFER_SETTINGS['cache']:
+            pool = INFER_SETTINGS['pool']
+            signature = img.mean_pooled(pool, pool)
+            cache = self.infer_cache
+            if cache and time.ticks_diff(time.ticks_ms(), cache[2]) < INFER_SETTINGS['ttl_ms']:
+                change = signature.copy().difference(cache[0]).get_statistics().l_mean()
+                if change < INFER_SETTINGS['change_threshold']:
+                    self.infer_stats['hits'] += 1
+                    log.debug("AI 预测结果(缓存): %s: %.3f", cache[1][0], cache[1][1])
+                    return cache[1]
+        self.infer_stats['misses'] += 1
+
+        # 使用Edge Impulse模型预测：输入为裁剪缩放后的检测区域（或原始整帧）
+        model_input = self._model_input(img, roi) if INFER_SETTINGS['preprocess'] else img
+        best_prediction = self._decode_output(self.net.predict([model_input])[0])
+        log.debug("AI 预测结果: %s: %.3f", best_prediction[0], best_prediction[1])
+        if signature:
+            self.infer_cache = (signature, best_prediction, time.ticks_ms())
+        return best_prediction
+
+    def _region_buffer(self, img, roi):
+        """把 img 的 roi 区域画到预分配缓冲的左上角并返回缓冲（缓冲按出现过的最大ROI分配，可能比区域大）"""
+        w, h = roi[2], roi[3]
+        buf = self._blob_buf
+        if buf is None or buf.width() < w or buf.height() < h:
+            if buf is not None:
+                w, h = max(w, buf.width()), max(h, buf.height())
+            buf = self._blob_buf = image.Image(w, h, image.RGB565)
+        buf.draw_image(img, 0, 0, roi=roi)
+        return buf
+
+    def _dynamic_skin_threshold(self, img, ctx=None, roi=None):
         # 根据图像亮度动态调整阈值
-        stats = img.get_statistics()
-        l_adj = max(0, 50 - (stats.l_mean() - 80))
+        l_mean = ctx.l_mean(roi) if ctx else img.get_statistics(roi=roi).l_mean()
+        l_adj = max(0, 50 - (l_mean - 80))
         return [(l_adj, 80, -20, 20, -20, 20)]
+
+    def roi_from_anatomy(self, anatomy, img):
+        """根据检测结果计算下一帧的跟踪ROI（外扩并裁剪到图像内）；默认位置不收缩ROI，返回None"""
+        if anatomy.get('default'):
+            return None
+        contour = anatomy['contour']
+        margin = ROI_SETTINGS['margin']
+        return self._clamp_roi(contour.x() - margin, contour.y() - margin,
+                               contour.x() + contour.w() + margin,
+                               contour.y() + contour.h() + margin, img)
+
+    def expand_roi(self, roi, img):
+        """未检测到手臂时向四周扩大ROI，覆盖整帧后返回None"""
+        if not roi:
+            return None
+        step = ROI_SETTINGS['expand_step']
+        x, y, w, h = roi
+        roi = self._clamp_roi(x - step, y - step, x + w + step, y + h + step, img)
+        if roi[2] >= img.width() and roi[3] >= img.height():
+            return None
+        return roi
+
+    def _clamp_roi(self, x0, y0, x1, y1, img):
+        # 保证最小尺寸，避免色块面积阈值在小区域内永远无法满足
+        min_size = ROI_SETTINGS['min_size']
+        if x1 - x0 < min_size:
+            x0 -= (min_size - (x1 - x0)) // 2
+            x1 = x0 + min_size
+        if y1 - y0 < min_size:
+            y0 -= (min_size - (y1 - y0)) // 2
+            y1 = y0 + min_size
+        x0 = max(0, x0)
+        y0 = max(0, y0)
+        x1 = min(img.width(), x1)
+        y1 = min(img.height(), y1)
+        return (x0, y0, x1 - x0, y1 - y0)
     
+    def invalidate_acu_geometry(self):
+        """原地修改 ACU_DB 条目后调用，下次批量求解时重建穴位表与预计算数组"""
+        self._geom_db = None
+
+    def _acu_geometry(self, segment):
+        # 穴位表由 ACU_DB 构建时，ACU_DB 被替换或增删后重建
+        if self.acu_table.source == 'dict' and (self._geom_db is not ACU_DB or self._geom_db_len != len(ACU_DB)):
+            self.acu_table = AcuTable.from_dict(ACU_DB)
+            self._geom_db = ACU_DB
+            self._geom_db_len = len(ACU_DB)
+            self._geom = {}
+        if self._geom_cpp != self.cm_per_pixel:
+            self._geom_cpp = self.cm_per_pixel
+            self._geom = {}
+        geom = self._geom.get(segment)
+        if geom is None:
+            table = self.acu_table
+            start, count = table.segment(segment)
+            end = start + count
+            cpp = self.cm_per_pixel
+            ids = table.ids[start:end]
+            geom = {
+                'ids': ids,
+                'rel': np.array(table.rel_pos[start:end], dtype=np.float),
+                'offset': np.array([v / cpp for v in table.offset_x[start:end]], dtype=np.float),
+                'depth': np.array([v / cpp * 0.1 for v in table.depth[start:end]], dtype=np.float),
+                'pressure': table.pressure[start:end],
+                'labels': ["%s: %s" % (ids[i], table.names[start + i]) for i in range(count)]
+            }
+            self._geom[segment] = geom
+        return geom
+
+    def _acu_info(self, acu_id):
+        # 加载了编译穴位表时以表为准（与批量求解一致）；ACU_DB 中没有的穴位同样从表取
+        table = self.acu_table
+        info = ACU_DB.get(acu_id) if table.source == 'dict' else None
+        if info is None:
+            i = table.ids.index(acu_id)
+            info = {'name': table.names[i], 'offset_cm': (table.offset_x[i], table.offset_y[i]),
+                    'depth_cm': table.depth[i], 'pressure': table.pressure[i], 'rel_pos': table.rel_pos[i]}
+        return info
+
+    def calculate_acu_points(self, anatomy):
+        """一次算出当前肢体分段的全部穴位，返回 {'ids', 'x', 'y', 'x_mm', 'y_mm', 'pressure', 'labels'}
+
+        x/y 为像素坐标、x_mm/y_mm 为发送用的毫米坐标，均为整型数组；
+        结果与逐个调用 calculate_acu_point 相同，但手臂方向、法向量只算一次，
+        各穴位的相对位置、偏移和深度补偿预先换算成像素数组，按数组整体运算。
+        分段取 anatomy['segment']，没有时用 ACUPOINT_SETTINGS['default_segment']，
+        只计算穴位表中该分段的记录。
+        """
+        if 'proximal_point' not in anatomy or 'distal_point' not in anatomy:
+            return None
+        if not ACUPOINT_SETTINGS['batch']:
+            return self._calculate_acu_points_each(anatomy)
+        geom = self._acu_geometry(anatomy.get('segment', ACUPOINT_SETTINGS['default_segment']))
+
+        proximal_x, proximal_y = anatomy['proximal_point']
+        distal_x, distal_y = anatomy['distal_point']
+        arm_dx = distal_x - proximal_x
+        arm_dy = distal_y - proximal_y
+        arm_length = math.sqrt(arm_dx * arm_dx + arm_dy * arm_dy)
+
+        # 沿手臂线性插值（各项分别取整，与逐点计算一致）
+        rel = geom['rel']
+        xs = np.array(proximal_x + rel * arm_dx, dtype=np.int16)
+        ys = np.array(proximal_y + rel * arm_dy, dtype=np.int16)
+        if arm_length >= 1:
+            # 沿法向量施加横向偏移与深度补偿
+            perp_dx = -arm_dy / arm_length
+            perp_dy = arm_dx / arm_length
+            offset = geom['offset']
+            depth = geom['depth']
+            xs = xs + np.array(offset * perp_dx, dtype=np.int16) + np.array(depth * perp_dx, dtype=np.int16)
+            ys = ys + np.array(offset * perp_dy, dtype=np.int16) + np.array(depth * perp_dy, dtype=np.int16)
+
+        mm = self.cm_per_pixel * 10
+        return {
+            'ids': geom['ids'],
+            'x': xs,
+            'y': ys,
+            'x_mm': np.array(xs * mm, dtype=np.int16),
+            'y_mm': np.array(ys * mm, dtype=np.int16),
+            'pressure': geom['pressure'],
+            'labels': geom['labels']
+        }
+
+    def _calculate_acu_points_each(self, anatomy):
+        # 逐点调用的原始实现：与批量求解使用同一穴位表和分段，结果整理成相同的结构
+        segment = anatomy.get('segment', ACUPOINT_SETTINGS['default_segment'])
+        self._acu_geometry(segment)  # ACU_DB 被替换或增删后先重建穴位表
+        table = self.acu_table
+        start, count = table.segment(segment)
+        result = {'ids': [], 'x': [], 'y': [], 'x_mm': [], 'y_mm': [], 'pressure': [], 'labels': []}
+        for i in range(start, start + count):
+            acu_id = table.ids[i]
+            pos = self.calculate_acu_point(anatomy, acu_id)
+            if pos:
+                result['ids'].append(acu_id)
+                result['x'].append(pos[0])
+                result['y'].append(pos[1])
+                result['x_mm'].append(int(pos[0] * self.cm_per_pixel * 10))
+                result['y_mm'].append(int(pos[1] * self.cm_per_pixel * 10))
+                result['pressure'].append(table.pressure[i])
+                result['labels'].append("%s: %s" % (acu_id, table.names[i]))
+        return result
+
     def calculate_acu_point(self, anatomy, acu_id):
         """根据手臂长度比例计算穴位位置"""
         if 'proximal_point' not in anatomy or 'distal_point' not in anatomy:
-            print(f"计算穴位 {acu_id} 失败: 缺少手臂端点信息")
+            log.warn("计算穴位 %s 失败: 缺少手臂端点信息", acu_id)
             return None
             
         try:
             # 获取穴位在手臂上的相对位置（从近端到远端的比例）
-            relative_pos = self.acupoint_relative_positions.get(acu_id, 0.5)  # 默认在手臂中部
+            acu_info = self._acu_info(acu_id)
+            relative_pos = acu_info.get('rel_pos', 0.5)  # 默认在手臂中部
             
             # 获取手臂的近端点和远端点
             proximal_x, proximal_y = anatomy['proximal_point']
@@ -276,13 +669,6 @@ class ArmAnalyzer:
             point_x = int(proximal_x + relative_pos * (distal_x - proximal_x))
             point_y = int(proximal_y + relative_pos * (distal_y - proximal_y))
             
-            # 尝试从全局ACU_DB获取穴位信息
-            try:
-                acu_info = ACU_DB[acu_id]
-            except (NameError, KeyError):
-                # 使用内部数据库作为备选
-                acu_info = self.internal_acu_db[acu_id]
-            
             # 计算手臂的方向向量
             arm_dx = distal_x - proximal_x
             arm_dy = distal_y - proximal_y
@@ -317,9 +703,9 @@ class ArmAnalyzer:
             final_x = point_x + dx
             final_y = point_y + dy
             
-            print(f"穴位 {acu_id} ({acu_info['name']}) 计算位置: ({final_x}, {final_y}), 相对位置: {relative_pos}")
+            log.debug("穴位 %s (%s) 计算位置: (%d, %d), 相对位置: %s", acu_id, acu_info['name'], final_x, final_y, relative_pos)
             return (final_x, final_y)
             
         except (ValueError, TypeError) as e:
-            print(f"计算穴位 {acu_id} 时出错: {e}")
+            log.error("计算穴位 %s 时出错: %s", acu_id, e)
             return None
\ No newline at end of file